@@ -0,0 +1,162 @@
+"""页面加载和脚本执行的asyncio接口
+
+把loadFinished信号和runJavaScript回调包装成协程，多步骤的抓取流程可以用
+asyncio.gather并发执行，并使用asyncio.wait_for超时和任务取消：
+
+    async def scrape(recipe, urls):
+        async def one(url):
+            page = AsyncPage()
+            try:
+                await page.load(url, timeout=30)
+                return await page.match(recipe['selectors_info'], recipe['threshold'])
+            finally:
+                page.close()
+        return await asyncio.gather(*(one(url) for url in urls), return_exceptions=True)
+
+    app = QApplication(sys.argv)
+    results = run_async(scrape(recipe, urls))
+
+安装qasync时使用其Qt事件循环；未安装时在asyncio事件循环中定时处理Qt事件。
+"""
+import asyncio
+import logging
+
+from PyQt5.QtCore import QEventLoop, QUrl
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile
+
+from metrics import metrics
+from page_scripts import DEFAULT_TEXT_MODE, build_match_js
+from selector_compiler import build_recipe_match_js
+
+log = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.67
+PUMP_INTERVAL = 0.005  # 未安装qasync时处理Qt事件的间隔（秒）
+
+
+class PageLoadError(RuntimeError):
+    """页面加载失败"""
+
+
+def qasync_available():
+    try:
+        import qasync  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def pump_qt_events(app, interval=PUMP_INTERVAL):
+    """没有qasync时，在asyncio事件循环中定时处理Qt事件（信号和脚本回调在其中触发）"""
+    while True:
+        app.processEvents(QEventLoop.AllEvents, 10)
+        await asyncio.sleep(interval)
+
+
+def run_async(coro, app=None):
+    """在Qt事件循环中运行协程直到完成并返回结果，需要先创建QApplication"""
+    if app is None:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance()
+        if app is None:
+            raise RuntimeError("需要先创建QApplication")
+
+    if qasync_available():
+        import qasync
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        with loop:
+            return loop.run_until_complete(coro)
+
+    async def main():
+        pump = asyncio.ensure_future(pump_qt_events(app))
+        try:
+            return await coro
+        finally:
+            pump.cancel()
+
+    return asyncio.run(main())
+
+
+def resolve(future, value):
+    # 超时或取消后到达的信号和回调直接忽略
+    if not future.done():
+        future.set_result(value)
+
+
+class AsyncPage:
+    """QWebEnginePage的协程包装"""
+
+    def __init__(self, profile=None, page=None):
+        """page为None时创建离屏页面；profile为None时使用默认profile"""
+        self.page = page or QWebEnginePage(profile or QWebEngineProfile.defaultProfile())
+
+    async def load(self, url, timeout=30.0):
+        """加载URL并等待loadFinished，失败时抛出PageLoadError，超时时抛出asyncio.TimeoutError"""
+        future = asyncio.get_running_loop().create_future()
+        handler = lambda ok: resolve(future, ok)  # noqa: E731
+        self.page.loadFinished.connect(handler)
+        metrics.start('page.load', id(future))
+        try:
+            self.page.setUrl(QUrl(url))
+            ok = await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.page.triggerAction(QWebEnginePage.Stop)
+            metrics.cancel('page.load', id(future))
+            raise
+        finally:
+            self.page.loadFinished.disconnect(handler)
+        metrics.finish('page.load', id(future), url=url, ok=ok)
+        if not ok:
+            raise PageLoadError(f"页面加载失败: {url}")
+
+    async def eval(self, js, timeout=None):
+        """执行JavaScript并返回结果（需要能转换为Python对象）"""
+        future = asyncio.get_running_loop().create_future()
+        self.page.runJavaScript(js, lambda result: resolve(future, result))
+        return await asyncio.wait_for(future, timeout)
+
+    async def match(self, selectors_info, threshold=DEFAULT_THRESHOLD, text_mode=DEFAULT_TEXT_MODE,
+                    timeout=None):
+        """按选择器集合匹配相似元素，返回结果列表（按总相似度从高到低）"""
+        js = build_match_js(selectors_info, threshold, text_mode, with_timings=True)
+        return await self.run_match(js, timeout, selectors=len(selectors_info), threshold=threshold)
+
+    async def match_recipe(self, recipe, timeout=None):
+        """按配方匹配，配方中有CSS选择器时使用querySelectorAll"""
+        return await self.run_match(build_recipe_match_js(recipe, with_timings=True), timeout,
+                                    selectors=len(recipe['selectors_info']))
+
+    async def run_match(self, js, timeout, **fields):
+        with metrics.span('match', **fields) as span_fields:
+            match = await self.eval(js, timeout) or {}
+            span_fields['results'] = len(match.get('results') or [])
+        for phase, duration_ms in (match.get('timings') or {}).items():
+            metrics.record(f'match.js.{phase}', duration_ms)
+        return match.get('results') or []
+
+    def url(self):
+        return self.page.url().toString()
+
+    def close(self):
+        self.page.deleteLater()
+
+
+async def scrape_urls(recipe, urls, concurrency=4, timeout=30.0, profile=None):
+    """并发加载URL并按配方匹配，返回与urls对应的列表：结果列表，或失败时的异常"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scrape(url):
+        async with semaphore:
+            page = AsyncPage(profile)
+            try:
+                await page.load(url, timeout)
+                return await page.match_recipe(recipe, timeout)
+            finally:
+                page.close()
+
+    results = await asyncio.gather(*(scrape(url) for url in urls), return_exceptions=True)
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            log.warning("抓取失败: %s: %r", url, result)
+    return results
@@ -0,0 +1,311 @@
+"""匹配算法的基准测试
+
+在离屏QWebEnginePage中加载合成页面，分阶段计时（均为页面内performance.now()）：
+  full_path   对每个元素单独调用getFullPath（清空缓存后，对应点击和悬停时的路径计算）
+  paths       walkElementPaths单次遍历计算全部路径
+  scoring     selectorSimilarity和classSimilarity打分
+  text        对通过阈值的元素提取文本
+  serialize   结果JSON.stringify
+并完整运行一次实际的匹配脚本，match为页面内耗时，marshal为runJavaScript往返耗时减去页面内耗时
+（结果从页面传回Python的开销）；css_match为把样例归纳为CSS选择器后用querySelectorAll匹配的页面内耗时。
+
+结果以JSON输出，可用 --baseline 与之前的结果对比：
+    python benchmarks/bench_match.py --nodes 1000,10000,100000 --output bench.json
+    python benchmarks/bench_match.py --nodes 1000,10000,100000 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtCore import QEventLoop, QTimer, QUrl, QT_VERSION_STR, PYQT_VERSION_STR  # noqa: E402
+from PyQt5.QtWebEngineWidgets import QWebEnginePage  # noqa: E402
+
+from page_scripts import (PATH_RUNTIME_JS, TEXT_RUNTIME_JS, SIMILARITY_RUNTIME_JS,  # noqa: E402
+                          TEXT_MODES, DEFAULT_TEXT_MODE, build_css_match_js, build_match_js)
+from selector_compiler import compile_selectors  # noqa: E402
+from synthetic_dom import write_html  # noqa: E402
+
+PHASES = ('full_path', 'paths', 'scoring', 'text', 'serialize', 'match', 'marshal', 'css_match')
+
+SAMPLES_JS = """
+(function() {
+    %(path_runtime)s
+    return Array.from(document.querySelectorAll('[data-sample]')).map(function(el) {
+        return {selector: getFullPath(el), className: el.className || ''};
+    });
+})();
+"""
+
+PHASES_JS = """
+(function() {
+    %(path_runtime)s
+    %(text_runtime)s
+    %(similarity_runtime)s
+
+    let selectorsInfo = %(selectors_info)s;
+    let THRESHOLD = %(threshold)f;
+    let TEXT_MODE = %(text_mode)s;
+    let phases = {};
+    let t;
+
+    // 每个元素单独计算路径（冷缓存）
+    let all = document.getElementsByTagName('*');
+    window.__elementPathCache = new WeakMap();
+    t = performance.now();
+    for (let i = 0; i < all.length; i++) getFullPath(all[i]);
+    phases.full_path = performance.now() - t;
+
+    // 单次遍历计算全部路径
+    window.__elementPathCache = new WeakMap();
+    let elements = [], paths = [];
+    t = performance.now();
+    walkElementPaths(function(el, path) {
+        elements.push(el);
+        paths.push(path);
+    });
+    phases.paths = performance.now() - t;
+
+    // 打分（含建立相似度索引）
+    t = performance.now();
+    let index = buildSimilarityIndex(selectorsInfo);
+    let matched = [];
+    for (let i = 0; i < elements.length; i++) {
+        let s = index.selectorSimilarity(paths[i]);
+        let c = index.classSimilarity(elements[i]);
+        if (s >= THRESHOLD || c >= THRESHOLD) matched.push([i, s, c]);
+    }
+    phases.scoring = performance.now() - t;
+
+    // 文本提取
+    t = performance.now();
+    let results = [];
+    for (let m of matched) {
+        let el = elements[m[0]];
+        let text = getElementText(el, TEXT_MODE);
+        if (!text) continue;
+        results.push({
+            selector: paths[m[0]],
+            text: text,
+            href: el.href || '',
+            selectorSimilarity: m[1],
+            classSimilarity: m[2],
+            totalSimilarity: Math.max(m[1], m[2])
+        });
+    }
+    phases.text = performance.now() - t;
+
+    t = performance.now();
+    let payload = JSON.stringify(results);
+    phases.serialize = performance.now() - t;
+
+    return {elements: elements.length, candidates: matched.length, matched: results.length,
+            payload_bytes: payload.length, phases: phases};
+})();
+"""
+
+# 计时包装实际的匹配脚本（同步模式）
+TIMED_MATCH_JS = """
+(function() {
+    let t = performance.now();
+    let results = %s;
+    window.__benchMatchMs = performance.now() - t;
+    return results;
+})();
+"""
+
+
+class Runner:
+    """在离屏页面中同步执行加载和脚本"""
+
+    def __init__(self, timeout):
+        self.page = QWebEnginePage()
+        self.timeout = int(timeout * 1000)
+
+    def wait(self, connect):
+        loop = QEventLoop()
+        result = {}
+
+        def done(value=None):
+            result['value'] = value
+            loop.quit()
+
+        connect(done)
+        QTimer.singleShot(self.timeout, loop.quit)
+        loop.exec_()
+        if 'value' not in result:
+            raise TimeoutError("基准测试超时")
+        return result['value']
+
+    def load(self, file_name):
+        def connect(done):
+            self.page.loadFinished.connect(done)
+            self.page.load(QUrl.fromLocalFile(file_name))
+        try:
+            ok = self.wait(connect)
+        finally:
+            self.page.loadFinished.disconnect()
+        if not ok:
+            raise RuntimeError(f"页面加载失败: {file_name}")
+
+    def run(self, js):
+        return self.wait(lambda done: self.page.runJavaScript(js, done))
+
+
+def bench_config(runner, config, args):
+    """对一组DOM参数运行基准测试，返回结果字典"""
+    fd, file_name = tempfile.mkstemp(suffix='.html')
+    os.close(fd)
+    try:
+        nodes = write_html(file_name, nodes=config['nodes'], depth=args.depth, fanout=args.fanout,
+                           classes=args.classes, samples=args.samples, seed=args.seed)
+        # setHtml限制为2MB，大页面需要从文件加载
+        t = time.perf_counter()
+        runner.load(file_name)
+        load_ms = (time.perf_counter() - t) * 1000
+
+        selectors_info = runner.run(SAMPLES_JS % {'path_runtime': PATH_RUNTIME_JS})
+        phases_js = PHASES_JS % {
+            'path_runtime': PATH_RUNTIME_JS,
+            'text_runtime': TEXT_RUNTIME_JS,
+            'similarity_runtime': SIMILARITY_RUNTIME_JS,
+            'selectors_info': json.dumps(selectors_info),
+            'threshold': args.threshold,
+            'text_mode': json.dumps(args.text_mode),
+        }
+        match_js = TIMED_MATCH_JS % build_match_js(selectors_info, args.threshold,
+                                                   args.text_mode).strip().rstrip(';')
+        css_selectors, _ = compile_selectors(selectors_info)
+        css_match_js = TIMED_MATCH_JS % build_css_match_js(css_selectors,
+                                                           args.text_mode).strip().rstrip(';')
+
+        runs = []
+        for _ in range(args.repeat):
+            stats = runner.run(phases_js)
+            t = time.perf_counter()
+            results = runner.run(match_js)
+            roundtrip_ms = (time.perf_counter() - t) * 1000
+            match_ms = runner.run('window.__benchMatchMs')
+            stats['phases']['match'] = match_ms
+            stats['phases']['marshal'] = max(roundtrip_ms - match_ms, 0.0)
+            stats['results'] = len(results or [])
+            runner.run(css_match_js)
+            stats['phases']['css_match'] = runner.run('window.__benchMatchMs')
+            runs.append(stats)
+    finally:
+        os.remove(file_name)
+
+    first = runs[0]
+    return {
+        'nodes': config['nodes'],
+        'elements': first['elements'],
+        'generated_nodes': nodes,
+        'candidates': first['candidates'],
+        'matched': first['matched'],
+        'results': first['results'],
+        'payload_bytes': first['payload_bytes'],
+        'load_ms': load_ms,
+        # 多次运行取中位数
+        'phases_ms': {phase: statistics.median(run['phases'][phase] for run in runs)
+                      for phase in PHASES},
+        'runs_ms': [run['phases'] for run in runs],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """与基准结果对比，输出各阶段的耗时变化"""
+    previous = {result['nodes']: result for result in baseline['results']}
+    print(f"对比 {baseline['meta'].get('revision')} -> {report['meta'].get('revision')}",
+          file=sys.stderr)
+    for result in report['results']:
+        old = previous.get(result['nodes'])
+        if not old:
+            continue
+        changes = []
+        for phase in PHASES:
+            before = old['phases_ms'].get(phase)
+            after = result['phases_ms'][phase]
+            if before:
+                changes.append(f"{phase} {after - before:+.1f}ms ({(after / before - 1):+.0%})")
+        print(f"  {result['nodes']:>7} 节点: " + ', '.join(changes), file=sys.stderr)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='匹配算法基准测试')
+    parser.add_argument('--nodes', default='1000,10000,100000',
+                        help='逗号分隔的节点数列表（1k-500k）')
+    parser.add_argument('--depth', type=int, default=12, help='最大深度')
+    parser.add_argument('--fanout', type=int, default=8, help='每个节点的最大子节点数')
+    parser.add_argument('--classes', type=int, default=50, help='类名基数')
+    parser.add_argument('--samples', type=int, default=3, help='样例元素个数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--threshold', type=float, default=0.67, help='相似度阈值')
+    parser.add_argument('--text-mode', choices=list(TEXT_MODES), default=DEFAULT_TEXT_MODE,
+                        help='文本提取策略')
+    parser.add_argument('--repeat', type=int, default=3, help='每组参数的重复次数')
+    parser.add_argument('--timeout', type=float, default=300.0, help='单步超时时间（秒）')
+    parser.add_argument('--output', help='结果输出文件（JSON），默认输出到标准输出')
+    parser.add_argument('--baseline', help='与之前的结果文件对比')
+    return parser.parse_known_args(argv[1:])
+
+
+def main(argv):
+    args, qt_args = parse_args(argv)
+    node_counts = [int(n) for n in args.nodes.split(',') if n.strip()]
+
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(argv[:1] + qt_args)  # noqa: F841
+
+    runner = Runner(args.timeout)
+    results = []
+    for nodes in node_counts:
+        print(f"运行 {nodes} 节点...", file=sys.stderr)
+        results.append(bench_config(runner, {'nodes': nodes}, args))
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'pyqt': PYQT_VERSION_STR,
+            'platform': platform.platform(),
+            'options': {key: value for key, value in vars(args).items()
+                        if key not in ('output', 'baseline')},
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,112 @@
+"""生成用于匹配基准测试的合成HTML页面
+
+节点数、最大深度、子节点数（扇出）和类名基数均可控制，相同参数和随机种子生成相同的页面。
+带 data-sample 属性的元素作为"已选元素"样例，由基准测试在页面中计算其选择器。
+"""
+import argparse
+import html
+import random
+import sys
+from collections import deque
+
+TAGS = ('div', 'div', 'div', 'span', 'li', 'a', 'p', 'section', 'ul', 'em')
+WORDS = ('商品', '价格', '标题', '评论', '更多', 'item', 'price', 'title', 'news', 'link')
+
+
+def build_tree(nodes, depth, fanout, rng):
+    """按广度优先生成树结构，返回每个节点的子节点列表和深度（节点0为body）
+
+    深度或扇出限制使节点数无法达到时，实际节点数少于nodes
+    """
+    children = [[]]
+    depths = [0]
+    queue = deque([0])
+    count = 1
+    while queue and count < nodes:
+        parent = queue.popleft()
+        if depths[parent] >= depth:
+            continue
+        # 扇出在1到fanout之间随机，使兄弟数量和nth-of-type位置有变化
+        for _ in range(rng.randint(1, fanout)):
+            if count >= nodes:
+                break
+            children.append([])
+            depths.append(depths[parent] + 1)
+            children[parent].append(count)
+            queue.append(count)
+            count += 1
+    return children, depths
+
+
+def generate_html(nodes=10000, depth=12, fanout=8, classes=50, samples=3, seed=0, text_ratio=0.5):
+    """生成合成HTML，返回 (HTML字符串, 实际元素节点数)"""
+    rng = random.Random(seed)
+    children, _ = build_tree(nodes, depth, fanout, rng)
+    count = len(children)
+    class_names = [f"c{i}" for i in range(max(classes, 1))]
+    sample_nodes = set(rng.sample(range(1, count), min(samples, count - 1))) if count > 1 else set()
+
+    parts = ['<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>benchmark</title></head>\n']
+    # 迭代式先序遍历，避免深层递归
+    stack = [(0, False)]
+    while stack:
+        node, closing = stack.pop()
+        if node == 0:
+            if closing:
+                parts.append('</body>\n')
+                continue
+            parts.append('<body>')
+        else:
+            tag = TAGS[node % len(TAGS)]
+            if closing:
+                parts.append(f'</{tag}>')
+                continue
+            attrs = ''
+            if rng.random() < 0.8:
+                names = rng.sample(class_names, min(rng.randint(1, 3), len(class_names)))
+                attrs += f' class="{" ".join(names)}"'
+            if tag == 'a':
+                attrs += f' href="https://example.com/{node}"'
+            if node in sample_nodes:
+                attrs += ' data-sample="1"'
+            parts.append(f'<{tag}{attrs}>')
+            if rng.random() < text_ratio:
+                parts.append(html.escape(f"{rng.choice(WORDS)} {node}"))
+        stack.append((node, True))
+        for child in reversed(children[node]):
+            stack.append((child, False))
+    parts.append('</html>\n')
+    return ''.join(parts), count
+
+
+def write_html(file_name, **options):
+    """生成合成HTML并写入文件，返回实际元素节点数"""
+    content, count = generate_html(**options)
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成匹配基准测试用的合成HTML页面')
+    parser.add_argument('output', help='输出HTML文件，"-"表示标准输出')
+    parser.add_argument('--nodes', type=int, default=10000, help='元素节点数')
+    parser.add_argument('--depth', type=int, default=12, help='最大深度')
+    parser.add_argument('--fanout', type=int, default=8, help='每个节点的最大子节点数')
+    parser.add_argument('--classes', type=int, default=50, help='类名基数')
+    parser.add_argument('--samples', type=int, default=3, help='样例元素个数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args(argv)
+
+    options = dict(nodes=args.nodes, depth=args.depth, fanout=args.fanout,
+                   classes=args.classes, samples=args.samples, seed=args.seed)
+    if args.output == '-':
+        content, count = generate_html(**options)
+        sys.stdout.write(content)
+    else:
+        count = write_html(args.output, **options)
+    print(f"已生成 {count} 个元素节点", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
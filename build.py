@@ -1,6 +1,7 @@
 import os
 import sys
 import shutil
+import argparse
 import PyInstaller.__main__
 from pathlib import Path
 
@@ -24,8 +25,11 @@ def format_data_path(src, dst):
     separator = ';' if sys.platform.startswith('win') else ':'
     return f"{src}{separator}{dst}"
 
-def build_exe():
-    """使用PyInstaller打包项目为EXE文件"""
+def build_exe(onedir=False):
+    """使用PyInstaller打包项目为EXE文件
+
+    onedir为True时打包为目录：启动时无需把约50MB的文件解压到临时目录，启动明显更快
+    """
     # 清理旧的构建文件
     clean_dirs()
     
@@ -49,8 +53,7 @@ def build_exe():
         'PyQt5',
         'PyQt5.QtWebEngineWidgets',
         'PyQt5.QtWebEngine',
-        'PyQt5.QtWebEngineCore',
-        'pandas'
+        'PyQt5.QtWebEngineCore'
     ]
     
     hidden_imports_args = []
@@ -62,7 +65,7 @@ def build_exe():
         'main.py',                    # 主程序文件
         '--name=WebScraper',          # 生成的EXE名称
         '--windowed',                 # 使用GUI模式
-        '--onefile',                  # 打包成单个EXE文件
+        '--onedir' if onedir else '--onefile',  # 打包为目录或单个EXE文件
         '--clean',                    # 清理临时文件
         '--icon=images/icon_app.png', # 设置程序图标
         '--noconfirm',                # 不确认覆盖
@@ -80,7 +83,8 @@ def build_exe():
     try:
         PyInstaller.__main__.run(args)
         print("\n打包成功！")
-        print(f"可执行文件位置: {os.path.abspath('dist/WebScraper.exe')}")
+        exe_path = 'dist/WebScraper/WebScraper.exe' if onedir else 'dist/WebScraper.exe'
+        print(f"可执行文件位置: {os.path.abspath(exe_path)}")
     except Exception as e:
         print(f"\n打包失败: {str(e)}")
         sys.exit(1)
@@ -90,7 +94,7 @@ def check_requirements():
     required_packages = {
         'pyinstaller': 'PyInstaller',
         'pyqt5': 'PyQt5',
-        'pandas': 'pandas'
+        'openpyxl': 'openpyxl'
     }
     
     for package, import_name in required_packages.items():
@@ -102,6 +106,11 @@ def check_requirements():
             os.system(f'{sys.executable} -m pip install {package}')
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='网页数据抓取工具打包程序')
+    parser.add_argument('--onedir', action='store_true',
+                        help='打包为目录而不是单个EXE文件，启动更快')
+    args = parser.parse_args()
+    
     print("=== 网页数据抓取工具打包程序 ===\n")
     
     # 检查Python版本
@@ -119,4 +128,4 @@ if __name__ == '__main__':
     check_requirements()
     
     # 开始打包
-    build_exe() 
\ No newline at end of file
+    build_exe(args.onedir) 
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""结果的批量清洗操作：过滤、正则提取、规范化空白、删除空行和去重，支持撤销
+
+每个操作对整列执行一次（编译一次正则，对整列求出掩码或新值），只重建一次存储的各列并通知视图一次。
+结果列是Python字符串列表，pandas的object类型字符串方法同样逐个调用正则，还要额外转换，因此不使用。
+"""
+import logging
+import re
+
+from dedup import normalize_text
+
+log = logging.getLogger(__name__)
+
+UNDO_LIMIT = 20  # 最多保留的撤销步数
+EDITABLE_COLUMNS = ('text', 'href')  # 除记录模式的字段外，可以修改的列
+COLUMN_LABELS = {
+    'text': '内容',
+    'href': '链接',
+    'selector': '选择器',
+    'className': '类名',
+}
+
+
+def compile_pattern(pattern, ignore_case=False):
+    """编译正则表达式，格式错误时抛出ValueError"""
+    try:
+        return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"正则表达式错误: {e}")
+
+
+def match_mask(values, regex):
+    """各值是否包含正则的匹配"""
+    search = regex.search
+    return [search(value) is not None for value in values]
+
+
+def length_mask(values, min_length=0, max_length=None):
+    """各值的长度是否在 [min_length, max_length] 之间（max_length为None时不限上限）"""
+    if max_length is None:
+        return [len(value) >= min_length for value in values]
+    return [min_length <= len(value) <= max_length for value in values]
+
+
+def extract_values(values, regex):
+    """按正则提取：有捕获组时把各组的非空值用空格连接，没有捕获组时取整个匹配；不匹配的值为空字符串"""
+    extracted = []
+    search = regex.search
+    for value in values:
+        match = search(value)
+        if match is None:
+            extracted.append('')
+        elif regex.groups:
+            extracted.append(' '.join(group for group in match.groups() if group))
+        else:
+            extracted.append(match.group(0))
+    return extracted
+
+
+def normalize_values(values):
+    """合并连续空白并去除首尾空白"""
+    return [normalize_text(value) for value in values]
+
+
+class BulkEditor:
+    """对ResultTableModel的整列执行批量操作，每个操作前保存一次存储的状态用于撤销。
+    操作之后结果又被修改（匹配、删除等）时，之前的撤销记录失效"""
+
+    def __init__(self, model, undo_limit=UNDO_LIMIT):
+        self.model = model
+        self.undo_limit = undo_limit
+        self.undo_stack = []  # [(操作说明, 操作前的状态, 操作后的存储版本)]
+
+    @property
+    def store(self):
+        return self.model.store
+
+    def columns(self):
+        """可以操作的列：(列名, 显示名称, 是否可以修改)"""
+        columns = [(name, COLUMN_LABELS[name], name in EDITABLE_COLUMNS) for name in COLUMN_LABELS]
+        columns.extend((name, name, True) for name in self.store.field_names)
+        return columns
+
+    def can_undo(self):
+        return bool(self.undo_stack) and self.undo_stack[-1][2] == self.store.version
+
+    def discard_stale(self):
+        if self.undo_stack and not self.can_undo():
+            self.undo_stack.clear()
+
+    def apply(self, label, operation, *args):
+        """保存撤销状态后执行存储的整表修改方法（take_rows或set_column），只刷新一次视图"""
+        self.discard_stale()
+        state = self.store.save_state(operation, *args)
+        result = self.model.reset_with(getattr(self.store, operation), *args)
+        self.undo_stack.append((label, state, self.store.version))
+        del self.undo_stack[:-self.undo_limit]
+        log.info("批量操作: %s", label)
+        return result
+
+    def keep_mask(self, label, mask):
+        """只保留mask为True的行，返回删除的行数"""
+        keep = [row for row, kept in enumerate(mask) if kept]
+        removed = len(mask) - len(keep)
+        if removed:
+            self.apply(label, 'take_rows', keep)
+        return removed
+
+    def filter_regex(self, column, pattern, ignore_case=False, invert=False):
+        """保留（invert为True时删除）该列匹配正则的行，返回删除的行数"""
+        regex = compile_pattern(pattern, ignore_case)
+        mask = match_mask(self.store.column(column), regex)
+        if invert:
+            mask = [not matched for matched in mask]
+        action = "删除" if invert else "保留"
+        return self.keep_mask(f"{action}匹配 {pattern} 的行", mask)
+
+    def filter_length(self, column, min_length=0, max_length=None):
+        """保留该列长度在范围内的行，返回删除的行数"""
+        mask = length_mask(self.store.column(column), min_length, max_length)
+        return self.keep_mask(f"按长度过滤 {min_length}-{max_length or ''}", mask)
+
+    def drop_empty_and_duplicates(self, column):
+        """删除该列为空白的行，以及该列的值相同的重复行（保留第一行）"""
+        seen = set()
+        mask = []
+        for value in self.store.column(column):
+            mask.append(bool(value.strip()) and value not in seen)
+            seen.add(value)
+        return self.keep_mask("删除空行和重复行", mask)
+
+    def set_values(self, label, column, values):
+        """整列替换，返回值发生变化的行数"""
+        old_values = self.store.column(column)
+        changed = sum(1 for old, new in zip(old_values, values) if old != new)
+        if changed:
+            self.apply(label, 'set_column', column, values)
+        return changed
+
+    def extract(self, column, pattern, ignore_case=False):
+        """把该列替换为正则提取的内容，返回修改的行数"""
+        regex = compile_pattern(pattern, ignore_case)
+        return self.set_values(f"提取 {pattern}", column, extract_values(self.store.column(column), regex))
+
+    def normalize(self, column):
+        """规范化该列的空白，返回修改的行数"""
+        return self.set_values("规范化空白", column, normalize_values(self.store.column(column)))
+
+    def undo(self):
+        """撤销最近一次批量操作，返回操作说明；没有可撤销的操作时返回None"""
+        self.discard_stale()
+        if not self.undo_stack:
+            return None
+        label, state, _ = self.undo_stack.pop()
+        self.model.reset_with(self.store.restore_state, state)
+        if self.undo_stack:
+            # 恢复后存储版本变化，更新上一步的版本，使其仍可撤销
+            previous_label, previous_state, _ = self.undo_stack[-1]
+            self.undo_stack[-1] = (previous_label, previous_state, self.store.version)
+        log.info("撤销批量操作: %s", label)
+        return label
+
+    def clear(self):
+        self.undo_stack.clear()
@@ -0,0 +1,142 @@
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import (QWidget, QGridLayout, QComboBox, QLineEdit, QCheckBox, QPushButton,
+                             QSpinBox, QLabel)
+
+from bulk_ops import BulkEditor
+
+MAX_LENGTH_LIMIT = 100000
+
+
+class BulkPanel(QWidget):
+    """结果的批量清洗面板：选择列后按正则或长度过滤、提取、规范化、去重，可撤销"""
+
+    applied = pyqtSignal(str)  # 操作结果说明，显示在状态栏
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.editor = BulkEditor(model)
+        self.setStyleSheet("font-size: 12px;")
+
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+
+        self.column_combo = QComboBox()
+        self.column_combo.setToolTip("批量操作的列")
+        layout.addWidget(self.column_combo, 0, 0)
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("正则表达式，如 (\\d+(?:\\.\\d+)?)")
+        layout.addWidget(self.pattern_input, 0, 1, 1, 3)
+        self.ignore_case_check = QCheckBox("忽略大小写")
+        layout.addWidget(self.ignore_case_check, 0, 4)
+
+        self.keep_btn = self.add_button(layout, "保留匹配", 1, 0, self.keep_matching,
+                                        "只保留该列匹配正则的行")
+        self.drop_btn = self.add_button(layout, "删除匹配", 1, 1, self.drop_matching,
+                                        "删除该列匹配正则的行")
+        self.extract_btn = self.add_button(layout, "提取", 1, 2, self.extract,
+                                           "把该列替换为正则匹配的内容（有捕获组时取各组），不匹配的为空")
+        self.normalize_btn = self.add_button(layout, "规范化", 1, 3, self.normalize,
+                                             "合并连续空白并去除首尾空白")
+        self.undo_btn = self.add_button(layout, "撤销", 1, 4, self.undo, "撤销最近一次批量操作")
+
+        layout.addWidget(QLabel("长度:"), 2, 0)
+        self.min_length_spin = QSpinBox()
+        self.min_length_spin.setRange(0, MAX_LENGTH_LIMIT)
+        layout.addWidget(self.min_length_spin, 2, 1)
+        self.max_length_spin = QSpinBox()
+        self.max_length_spin.setRange(0, MAX_LENGTH_LIMIT)
+        self.max_length_spin.setSpecialValueText("不限")  # 0表示不限上限
+        layout.addWidget(self.max_length_spin, 2, 2)
+        self.length_btn = self.add_button(layout, "按长度过滤", 2, 3, self.filter_length,
+                                          "只保留该列长度在范围内的行")
+        self.dedup_btn = self.add_button(layout, "删除空行/重复", 2, 4, self.drop_empty_and_duplicates,
+                                         "删除该列为空的行，以及该列的值相同的重复行（保留第一行）")
+
+        self.column_combo.currentIndexChanged.connect(self.update_buttons)
+        # 记录模式新增字段列或整表修改后更新列选项
+        model.columnsInserted.connect(self.refresh_columns)
+        model.modelReset.connect(self.refresh_columns)
+        self.refresh_columns()
+
+    def add_button(self, layout, text, row, column, slot, tooltip):
+        button = QPushButton(text)
+        button.setToolTip(tooltip)
+        button.clicked.connect(slot)
+        layout.addWidget(button, row, column)
+        return button
+
+    def refresh_columns(self, *args):
+        current = self.column_combo.currentData()
+        self.column_combo.blockSignals(True)
+        self.column_combo.clear()
+        for name, label, editable in self.editor.columns():
+            self.column_combo.addItem(label, (name, editable))
+        index = next((i for i in range(self.column_combo.count())
+                      if self.column_combo.itemData(i) == current), 0)
+        self.column_combo.setCurrentIndex(index)
+        self.column_combo.blockSignals(False)
+        self.update_buttons()
+
+    def update_buttons(self):
+        data = self.column_combo.currentData()
+        editable = bool(data and data[1])
+        # 选择器和类名是驻留的共享字符串，只能过滤不能修改
+        self.extract_btn.setEnabled(editable)
+        self.normalize_btn.setEnabled(editable)
+        self.undo_btn.setEnabled(self.editor.can_undo())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_buttons()
+
+    def column(self):
+        return self.column_combo.currentData()[0]
+
+    def pattern(self):
+        pattern = self.pattern_input.text()
+        if not pattern:
+            raise ValueError("请输入正则表达式")
+        return pattern
+
+    def run(self, func, message):
+        """执行一个批量操作，message为带{count}的结果说明"""
+        try:
+            count = func()
+        except ValueError as e:
+            self.applied.emit(str(e))
+            return
+        self.update_buttons()
+        self.applied.emit(message.format(count=count, total=len(self.editor.store)))
+
+    def keep_matching(self):
+        self.run(lambda: self.editor.filter_regex(self.column(), self.pattern(),
+                                                  self.ignore_case_check.isChecked()),
+                 "已删除 {count} 行不匹配的结果，剩余 {total} 行")
+
+    def drop_matching(self):
+        self.run(lambda: self.editor.filter_regex(self.column(), self.pattern(),
+                                                  self.ignore_case_check.isChecked(), invert=True),
+                 "已删除 {count} 行匹配的结果，剩余 {total} 行")
+
+    def extract(self):
+        self.run(lambda: self.editor.extract(self.column(), self.pattern(),
+                                             self.ignore_case_check.isChecked()),
+                 "已提取，修改了 {count} 行")
+
+    def normalize(self):
+        self.run(lambda: self.editor.normalize(self.column()), "已规范化 {count} 行")
+
+    def filter_length(self):
+        max_length = self.max_length_spin.value() or None
+        self.run(lambda: self.editor.filter_length(self.column(), self.min_length_spin.value(), max_length),
+                 "已删除 {count} 行长度不在范围内的结果，剩余 {total} 行")
+
+    def drop_empty_and_duplicates(self):
+        self.run(lambda: self.editor.drop_empty_and_duplicates(self.column()),
+                 "已删除 {count} 行空白或重复的结果，剩余 {total} 行")
+
+    def undo(self):
+        label = self.editor.undo()
+        self.update_buttons()
+        self.applied.emit(f"已撤销: {label}" if label else "没有可撤销的操作")
@@ -0,0 +1,19 @@
+"""抓取的默认参数和URL处理，不依赖Qt，界面启动时可直接导入"""
+import os
+
+DEFAULT_PER_HOST = None  # 同一域名同时加载的页面数，None表示不超过页面池大小
+DEFAULT_DELAY = 0.2  # 同一域名两次开始加载之间的最小间隔（秒）
+DEFAULT_RETRIES = 1
+
+
+def default_concurrency():
+    """默认页面池大小：每个页面通常对应一个渲染进程，按CPU核数留出余量，最多8个"""
+    return max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def normalize_url(url):
+    """补全URL协议（http/https）"""
+    url = url.strip()
+    if url and not url.startswith(('http://', 'https://', 'file://')):
+        url = 'https://' + url
+    return url
@@ -0,0 +1,170 @@
+import hashlib
+import re
+from array import array
+from functools import lru_cache
+from itertools import combinations
+
+
+def normalize_text(text):
+    """规范化文本：合并连续空白并去除首尾空白"""
+    return ' '.join(text.split())
+
+
+def content_digest(text, selector=None):
+    """计算规范化后完整文本（可选加上选择器）的摘要"""
+    h = hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16)
+    if selector is not None:
+        h.update(b'\0')
+        h.update(selector.encode('utf-8'))
+    return h.digest()
+
+
+class DedupIndex:
+    """增量去重索引，按完整文本摘要（可选包含选择器）计数，支持O(1)的添加、删除和查找"""
+
+    def __init__(self, include_selector=False):
+        self.include_selector = include_selector
+        self.counts = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def key(self, text, selector=''):
+        return content_digest(text, selector if self.include_selector else None)
+
+    def contains(self, text, selector=''):
+        return self.key(text, selector) in self.counts
+
+    def add(self, text, selector=''):
+        """添加一条记录，返回该内容此前是否未出现过"""
+        return self.add_key(self.key(text, selector))
+
+    def add_key(self, key):
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count == 0
+
+    def discard(self, text, selector=''):
+        self.discard_key(self.key(text, selector))
+
+    def discard_key(self, key):
+        count = self.counts.get(key, 0)
+        if count > 1:
+            self.counts[key] = count - 1
+        elif count == 1:
+            del self.counts[key]
+
+    def clear(self):
+        self.counts.clear()
+
+    def rebuild_keys(self, keys):
+        """按已计算好的摘要重建计数"""
+        self.counts.clear()
+        for key in keys:
+            self.add_key(key)
+
+    def rebuild(self, texts, selectors):
+        self.counts.clear()
+        for text, selector in zip(texts, selectors):
+            self.add(text, selector)
+
+
+FINGERPRINT_BITS = 64
+FINGERPRINT_MASK = (1 << FINGERPRINT_BITS) - 1
+SHINGLE_SIZE = 3  # 按字符切分的片段长度，中英文混排时不依赖分词
+MIN_NEAR_DUP_CUTOFF = 0.85  # 更低的相似度下不相关的短文本也会被误判为近似重复，查找也需要探查过多的段值
+MAX_LANE_COUNT = 255
+BANDS = 4
+BAND_BITS = FINGERPRINT_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+BIT_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+DIGITS_RE = re.compile(r'\d+')
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """规范化文本的64位SimHash指纹：每个字符片段的哈希按位投票，过半为1的位置1。
+    数字统一替换为0，只有时间、计数等数字不同的文本指纹相同；
+    片段哈希使用内置hash()，指纹只在同一进程内比较"""
+    text = DIGITS_RE.sub('0', normalize_text(text).lower())
+    if len(text) <= shingle_size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+    # 每个哈希展开为64个字节（每字节一位），整数相加即并行累加64个位的计数，每字节最多累加255个片段
+    lanes = [int.from_bytes(format(hash(shingle) & FINGERPRINT_MASK, '064b').encode().translate(BIT_BYTES), 'big')
+             for shingle in shingles]
+    count = len(lanes)
+    if count <= MAX_LANE_COUNT:
+        return int(sum(lanes).to_bytes(FINGERPRINT_BITS, 'big').translate(majority_table(count)), 2)
+    counts = [0] * FINGERPRINT_BITS
+    for start in range(0, count, MAX_LANE_COUNT):
+        chunk = sum(lanes[start:start + MAX_LANE_COUNT]).to_bytes(FINGERPRINT_BITS, 'big')
+        counts = [total + value for total, value in zip(counts, chunk)]
+    return int(''.join('1' if total * 2 > count else '0' for total in counts), 2)
+
+
+@lru_cache(maxsize=MAX_LANE_COUNT + 1)
+def majority_table(count):
+    """把各位的计数转换为 '1'（超过半数）或 '0' 的字节映射表"""
+    return bytes(ord('1') if value * 2 > count else ord('0') for value in range(256))
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def neighbor_masks(bits, radius):
+    """bits位的值中汉明距离不超过radius的所有异或掩码（含0）"""
+    masks = [0]
+    for distance in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in positions) for positions in combinations(range(bits), distance))
+    return masks
+
+
+class NearDupIndex:
+    """SimHash近似去重索引（按行保存指纹），cutoff为相似度下限（1 - 汉明距离/64）。
+    指纹分为4段（每段16位）分别建立哈希桶：汉明距离不超过k的两个指纹至少有一段的距离不超过k//4，
+    查找时只需在各段探查距离k//4以内的段值并比较同桶的候选，不随行数线性增长"""
+
+    def __init__(self, cutoff):
+        if not MIN_NEAR_DUP_CUTOFF <= cutoff <= 1:
+            raise ValueError(f"近似去重阈值必须在{MIN_NEAR_DUP_CUTOFF}到1之间")
+        self.cutoff = cutoff
+        self.max_distance = int((1 - cutoff) * FINGERPRINT_BITS + 1e-9)
+        self.masks = neighbor_masks(BAND_BITS, self.max_distance // BANDS)
+        self.fingerprints = array('Q')
+        self.buckets = [{} for _ in range(BANDS)]  # 每段: 段值 -> 行号列表
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def find(self, fingerprint):
+        """返回与指纹相似度达到cutoff的一行，没有时返回None"""
+        fingerprints = self.fingerprints
+        max_distance = self.max_distance
+        for band, buckets in enumerate(self.buckets):
+            value = (fingerprint >> (band * BAND_BITS)) & BAND_MASK
+            for mask in self.masks:
+                for row in buckets.get(value ^ mask, ()):
+                    if bin(fingerprints[row] ^ fingerprint).count('1') <= max_distance:
+                        return row
+        return None
+
+    def append(self, fingerprint):
+        row = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        for band, buckets in enumerate(self.buckets):
+            buckets.setdefault((fingerprint >> (band * BAND_BITS)) & BAND_MASK, []).append(row)
+
+    def rebuild(self, fingerprints):
+        """按给定的指纹（删除或修改行之后的各行）重建索引"""
+        self.clear()
+        for fingerprint in fingerprints:
+            self.append(fingerprint)
+
+    def clear(self):
+        self.fingerprints = array('Q')
+        self.buckets = [{} for _ in range(BANDS)]
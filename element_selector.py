@@ -1,34 +1,43 @@
-from PyQt5.QtCore import Qt, QEvent, QObject, pyqtSlot
-from PyQt5.QtWidgets import QLabel, QTableWidgetItem
+from PyQt5.QtCore import Qt, QEvent, QObject, pyqtSignal, pyqtSlot
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from bs4 import BeautifulSoup
+from page_scripts import (PATH_RUNTIME_JS, TEXT_RUNTIME_JS, HIGHLIGHT_RUNTIME_JS, DEFAULT_TEXT_MODE,
+                          build_outer_html_js)
+from result_model import truncate_text
+from score_cache import ScoreCache
 import json
+import logging
+
+log = logging.getLogger(__name__)
 
 class ElementSelector(QObject):
-    def __init__(self, web_view: QWebEngineView, data_table, status_bar):
+    # 流式匹配：(任务编号, 结果列表) / (任务编号, 已扫描, 总数) /
+    # (任务编号, 已扫描, 匹配数, 是否取消, 页面内各阶段耗时)
+    matchBatchReceived = pyqtSignal(int, list)
+    matchProgress = pyqtSignal(int, int, int)
+    matchFinished = pyqtSignal(int, int, int, bool, dict)
+    # 页面内WebChannel就绪：(自导航开始的毫秒数)
+    pageReady = pyqtSignal(float)
+
+    def __init__(self, web_view: QWebEngineView, result_model, status_bar):
         super().__init__()
         self.web_view = web_view
-        self.data_table = data_table
+        self.result_model = result_model
         self.status_bar = status_bar
         self.selector_mode = False
-        self.highlight_label = None
-        self.selected_elements = []
-        self.seen_elements = set()  # 用于去重
-        
-        # 初始化高亮标签
-        self.highlight_label = QLabel(web_view)
-        self.highlight_label.setStyleSheet("background-color: rgba(255, 255, 0, 0.3);")
-        self.highlight_label.hide()
+        self.selected_elements = result_model.store  # 与表格模型共用的列式存储（含去重索引）
+        self.click_handler = None  # 设置后点击的元素交给它处理（记录模式），不添加到表格
+        self.score_cache = ScoreCache()  # 上次扫描的候选元素及相似度，调整阈值时本地过滤
+        self.text_mode = DEFAULT_TEXT_MODE  # 文本提取策略
         
         # 设置web_view的属性
         self.web_view.setMouseTracking(True)
         
         # 安装事件过滤器
         self.web_view.installEventFilter(self)
-        print("ElementSelector initialized with event filter")
+        log.debug("ElementSelector initialized with event filter")
         
     def enable_selector_mode(self):
-        print("启用选择模式")
+        log.info("启用选择模式")
         self.selector_mode = True
         self.status_bar.setText("选择模式已启用，点击网页元素进行选择")
         
@@ -44,9 +53,15 @@ class ElementSelector(QObject):
                 return;
             }
             
+            %s
+            %s
+            %s
+            window.elementTextMode = %s;
+            
             // 移除已存在的事件监听器
             document.removeEventListener('click', window._elementSelectorClickHandler, true);
             document.removeEventListener('mousemove', window._elementSelectorMouseHandler, true);
+            window.removeEventListener('scroll', window._elementSelectorScrollHandler, true);
             
             // 定义点击事件处理函数
             window._elementSelectorClickHandler = function(e) {
@@ -57,8 +72,7 @@ class ElementSelector(QObject):
                 if (!element) return;
                 
                 let info = {
-                    text: (element.innerText || element.textContent || '').trim(),
-                    html: element.outerHTML || '',
+                    text: window.getElementText(element),
                     tagName: element.tagName || '',
                     className: element.className || '',
                     id: element.id || '',
@@ -70,34 +84,30 @@ class ElementSelector(QObject):
                 window.qt.elementSelector.handleElementClick(JSON.stringify(info));
             };
             
-            // 定义鼠标移动事件处理函数
-            window._elementSelectorMouseHandler = function(e) {
-                let element = e.target;
-                if (!element) return;
-                
-                // 移除之前的高亮
-                let prevHighlight = document.querySelector('.element-selector-highlight');
-                if (prevHighlight) {
-                    prevHighlight.classList.remove('element-selector-highlight');
-                }
-                
-                // 添加新的高亮
-                element.classList.add('element-selector-highlight');
-            };
-            
-            // 添加事件监听器
+            // 添加事件监听器（悬停高亮的处理函数由HIGHLIGHT_RUNTIME_JS定义）
             document.addEventListener('click', window._elementSelectorClickHandler, true);
-            document.addEventListener('mousemove', window._elementSelectorMouseHandler, true);
+            document.addEventListener('mousemove', window._elementSelectorMouseHandler, {capture: true, passive: true});
+            window.addEventListener('scroll', window._elementSelectorScrollHandler, {capture: true, passive: true});
             
             console.log('元素选择器设置完成');
         })();
-        """
+        """ % (PATH_RUNTIME_JS, TEXT_RUNTIME_JS, HIGHLIGHT_RUNTIME_JS, json.dumps(self.text_mode))
         
         self.web_view.page().runJavaScript(js)
-        print("事件监听器已安装")
+        log.debug("事件监听器已安装")
+
+    def set_text_mode(self, mode):
+        """设置点击选择时使用的文本提取策略"""
+        self.text_mode = mode
+        js = """
+        (function() {
+            window.elementTextMode = %s;
+        })();
+        """ % json.dumps(mode)
+        self.web_view.page().runJavaScript(js)
 
     def disable_selector_mode(self):
-        print("禁用选择模式")
+        log.info("禁用选择模式")
         self.selector_mode = False
         self.status_bar.setText("选择模式已禁用")
         
@@ -107,11 +117,11 @@ class ElementSelector(QObject):
             // 移除事件监听器
             document.removeEventListener('click', window._elementSelectorClickHandler, true);
             document.removeEventListener('mousemove', window._elementSelectorMouseHandler, true);
+            window.removeEventListener('scroll', window._elementSelectorScrollHandler, true);
             
-            // 移除高亮
-            let prevHighlight = document.querySelector('.element-selector-highlight');
-            if (prevHighlight) {
-                prevHighlight.classList.remove('element-selector-highlight');
+            // 隐藏高亮覆盖层
+            if (window._elementSelectorHover) {
+                window._elementSelectorHover.hide();
             }
             
             console.log('元素选择器已禁用');
@@ -121,60 +131,29 @@ class ElementSelector(QObject):
         
         # 移除事件过滤器
         self.web_view.removeEventFilter(self)
-        self.highlight_label.hide()
 
     def eventFilter(self, obj, event):
+        # 悬停高亮完全在页面内完成，这里不处理MouseMove
         if obj == self.web_view and self.selector_mode:
-            if event.type() == QEvent.MouseMove:
-                pos = event.pos()
-                self.highlight_element_at(pos)
-                return True
-                
-            elif event.type() == QEvent.MouseButtonPress:
+            if event.type() == QEvent.MouseButtonPress:
                 pos = event.pos()
-                print(f"鼠标点击位置: {pos.x()}, {pos.y()}")
+                log.debug("鼠标点击位置: %d, %d", pos.x(), pos.y())
                 js = """
                 (function() {
                     try {
+                        %s
+                        %s
+                        
                         let element = document.elementFromPoint(%d, %d);
                         if (!element) return null;
                         
-                        function getFullPath(el) {
-                            try {
-                                if (!el || !el.nodeType) return '';
-                                let path = [];
-                                while (el && el.nodeType === Node.ELEMENT_NODE) {
-                                    let selector = el.nodeName.toLowerCase();
-                                    if (el.id) {
-                                        selector += '#' + el.id;
-                                        path.unshift(selector);
-                                        break;
-                                    } else {
-                                        let sib = el, nth = 1;
-                                        while (sib.previousElementSibling) {
-                                            sib = sib.previousElementSibling;
-                                            if (sib.nodeName.toLowerCase() === selector) nth++;
-                                        }
-                                        if (nth !== 1) selector += ":nth-of-type("+nth+")";
-                                    }
-                                    path.unshift(selector);
-                                    el = el.parentNode;
-                                }
-                                return path.join(' > ');
-                            } catch (err) {
-                                console.error('获取元素路径错误:', err);
-                                return '';
-                            }
-                        }
-                        
                         let info = {
-                            text: (element.innerText || element.textContent || '').trim(),
-                            html: element.outerHTML || '',
+                            text: window.getElementText(element, %s),
                             tagName: element.tagName || '',
                             className: element.className || '',
                             id: element.id || '',
                             href: element.href || '',
-                            selector: getFullPath(element)
+                            selector: window.getFullPath(element)
                         };
                         
                         return info;
@@ -183,91 +162,54 @@ class ElementSelector(QObject):
                         return null;
                     }
                 })();
-                """ % (pos.x(), pos.y())
+                """ % (PATH_RUNTIME_JS, TEXT_RUNTIME_JS, pos.x(), pos.y(), json.dumps(self.text_mode))
                 
                 def handle_element_info(result):
                     if result:
                         try:
-                            print("\n选中元素信息:")
-                            print(f"标签: {result['tagName']}")
-                            print(f"文本: {result['text']}")
-                            print(f"选择器: {result['selector']}")
-                            if result['id']:
-                                print(f"ID: {result['id']}")
-                            if result['className']:
-                                print(f"类名: {result['className']}")
-                            if result['href']:
-                                print(f"链接: {result['href']}")
+                            self.log_element_info(result)
                             
-                            # 将信息添加到表格
-                            if result['text']:  # 只有当有文本内容时才添加
-                                row = self.data_table.rowCount()
-                                self.data_table.insertRow(row)
-                                self.data_table.setItem(row, 0, QTableWidgetItem(result['selector']))
-                                self.data_table.setItem(row, 1, QTableWidgetItem(result['text']))
-                                self.selected_elements.append({
-                                    'selector': result['selector'],
-                                    'text': result['text'],
-                                    'href': result.get('href', '')
-                                })
-                                self.status_bar.setText(f"已选择元素: {result['selector']}")
-                        except Exception as e:
-                            print(f"处理元素信息时出错: {str(e)}")
-                            import traceback
-                            traceback.print_exc()
+                            if self.click_handler:
+                                self.click_handler(result)
+                            # 将信息添加到表格（带去重）
+                            elif result['text']:  # 只有当有文本内容时才添加
+                                self.add_element(result['selector'], result['text'],
+                                                 result.get('className', ''), result.get('href', ''))
+                        except Exception:
+                            log.exception("处理元素信息时出错")
                 
                 self.web_view.page().runJavaScript(js, handle_element_info)
                 return True
                 
         return super().eventFilter(obj, event)
 
-    def highlight_element_at(self, pos):
-        js = """
-        (function() {
-            try {
-                let element = document.elementFromPoint(%d, %d);
-                if (!element) return;
-                
-                // 移除之前的高亮
-                let prevHighlight = document.querySelector('.element-selector-highlight');
-                if (prevHighlight) {
-                    prevHighlight.classList.remove('element-selector-highlight');
-                }
-                
-                // 添加新的高亮
-                element.classList.add('element-selector-highlight');
-            } catch (err) {
-                console.error('高亮元素错误:', err);
-            }
-        })();
-        """ % (pos.x(), pos.y())
-        
-        self.web_view.page().runJavaScript(js)
+    def log_element_info(self, info):
+        log.info("选中元素: 标签=%s 选择器=%s", info['tagName'], info['selector'])
+        log.debug("元素信息: 文本=%r ID=%r 类名=%r 链接=%r",
+                  info['text'], info['id'], info['className'], info['href'])
 
     def add_element(self, selector, text, className='', href=''):
         """添加元素到表格，包含去重功能"""
-        key = (selector, text)
-        if key not in self.seen_elements:
-            self.seen_elements.add(key)
-            row = self.data_table.rowCount()
-            self.data_table.insertRow(row)
-            # 在表格中显示截断的文本
-            truncated_text = text if len(text) <= 50 else text[:50] + "..."
-            item = QTableWidgetItem(truncated_text)
-            item.setToolTip(text)  # 设置完整文本作为工具提示
-            self.data_table.setItem(row, 0, item)
-            self.selected_elements.append({
-                'selector': selector,
-                'text': text,
-                'className': className,
-                'href': href
-            })
+        added = self.result_model.append_rows([{
+            'selector': selector,
+            'text': text,
+            'className': className,
+            'href': href
+        }], skip_near_duplicates=False)  # 点击选择是明确的操作，只排除完全相同的元素
+        if added:
+            # 表格中显示截断的文本，完整文本作为工具提示
+            truncated_text = truncate_text(text)
             # 更新状态栏显示截断的文本
             status_text = f"已选择元素: {truncated_text}"
             self.status_bar.setText(status_text)
             return True
         return False
 
+    def fetch_html(self, row, callback):
+        """按需获取某行元素在当前页面中的outerHTML，元素已不存在时callback收到None"""
+        selector = self.selected_elements.selector(row)
+        self.web_view.page().runJavaScript(build_outer_html_js(selector), callback)
+
     @pyqtSlot(str)
     def handleElementClick(self, element_info_str):
         """处理从JavaScript传来的元素点击信息"""
@@ -276,16 +218,10 @@ class ElementSelector(QObject):
             if not self.selector_mode:  # 如果选择模式未启用，不处理点击事件
                 return
                 
-            print("\n选中元素信息:")
-            print(f"标签: {element_info['tagName']}")
-            print(f"文本: {element_info['text']}")
-            print(f"选择器: {element_info['selector']}")
-            if element_info['id']:
-                print(f"ID: {element_info['id']}")
-            if element_info['className']:
-                print(f"类名: {element_info['className']}")
-            if element_info['href']:
-                print(f"链接: {element_info['href']}")
+            self.log_element_info(element_info)
+            if self.click_handler:
+                self.click_handler(element_info)
+                return
             
             # 将信息添加到表格（带去重）
             if element_info['text']:  # 只有当有文本内容时才添加
@@ -295,18 +231,42 @@ class ElementSelector(QObject):
                     element_info.get('className', ''),
                     element_info.get('href', '')
                 ):
-                    print("元素已添加到表格")
+                    log.debug("元素已添加到表格")
                 else:
-                    print("元素已存在，已跳过")
+                    log.debug("元素已存在，已跳过")
                     self.status_bar.setText("元素已存在，已跳过")
                     
-        except Exception as e:
-            print(f"处理元素信息时出错: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            log.exception("处理元素信息时出错")
+
+    @pyqtSlot(float)
+    def notifyPageReady(self, elapsed_ms):
+        """页面在文档创建时建立WebChannel后调用"""
+        if self.selector_mode:
+            # 页面跳转后重新安装选择模式的事件监听器
+            self.enable_selector_mode()
+        self.pageReady.emit(elapsed_ms)
+
+    @pyqtSlot(int, str)
+    def receiveMatchBatch(self, job_id, batch_json):
+        """接收JavaScript分批回传的匹配结果"""
+        try:
+            self.matchBatchReceived.emit(job_id, json.loads(batch_json))
+        except Exception:
+            log.exception("处理匹配结果时出错")
+
+    @pyqtSlot(int, int, int)
+    def reportMatchProgress(self, job_id, processed, total):
+        self.matchProgress.emit(job_id, processed, total)
+
+    @pyqtSlot(int, int, int, bool, str)
+    def finishMatch(self, job_id, processed, matched, cancelled, timings_json):
+        try:
+            timings = json.loads(timings_json)
+        except ValueError:
+            timings = {}
+        self.matchFinished.emit(job_id, processed, matched, cancelled, timings)
 
     def clear_data(self):
         """清空所有数据"""
-        self.selected_elements.clear()
-        self.seen_elements.clear()
-        self.data_table.setRowCount(0)
+        self.result_model.clear()
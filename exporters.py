@@ -0,0 +1,271 @@
+import csv
+import json
+import os
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+EXPORT_FIELDS = ('text', 'selector', 'href')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Exporter:
+    """流式导出器基类：按批写入行，不在内存中构建完整的数据表"""
+
+    extension = ''
+    label = ''
+    supports_append = False
+    batch_size = DEFAULT_BATCH_SIZE
+
+    def __init__(self, file_name, fields=EXPORT_FIELDS, append=False):
+        if append and not self.supports_append:
+            raise ValueError(f"{self.label}格式不支持追加写入")
+        self.file_name = file_name
+        self.fields = list(fields)
+        self.append = append and os.path.exists(file_name) and os.path.getsize(file_name) > 0
+
+    def open(self):
+        pass
+
+    def write_rows(self, rows):
+        """写入一批行，每行是与fields对应的元组"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @classmethod
+    def available(cls):
+        """可选依赖是否已安装"""
+        return True
+
+
+class CsvExporter(Exporter):
+    extension = '.csv'
+    label = 'CSV'
+    supports_append = True
+
+    def open(self):
+        if self.append:
+            with open(self.file_name, encoding='utf-8-sig', newline='') as file:
+                header = next(csv.reader(file), None)
+            if header != self.fields:
+                raise ValueError("现有文件的列与当前结果不一致，无法追加，请覆盖保存")
+        # 带BOM的UTF-8便于Excel打开；追加时TextIOWrapper不会再次写入BOM
+        self.file = open(self.file_name, 'a' if self.append else 'w',
+                         encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        if not self.append:
+            self.writer.writerow(self.fields)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesExporter(Exporter):
+    extension = '.jsonl'
+    label = 'JSON Lines'
+    supports_append = True
+
+    def open(self):
+        self.file = open(self.file_name, 'a' if self.append else 'w', encoding='utf-8')
+
+    def write_rows(self, rows):
+        fields = self.fields
+        self.file.writelines(
+            json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n' for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class JsonExporter(Exporter):
+    """JSON数组，逐条写入；追加时去掉文件末尾的]后继续写入"""
+
+    extension = '.json'
+    label = 'JSON'
+    supports_append = True
+
+    def open(self):
+        self.has_rows = False
+        if not self.append:
+            self.file = open(self.file_name, 'w', encoding='utf-8')
+            self.file.write('[')
+            return
+
+        self.file = open(self.file_name, 'r+b')
+        self.file.seek(0, os.SEEK_END)
+        end = self.file.tell()
+        tail_start = max(0, end - 4096)
+        self.file.seek(tail_start)
+        tail = self.file.read().rstrip()
+        if not tail.endswith(b']'):
+            self.file.close()
+            raise ValueError("现有文件不是JSON数组，无法追加")
+        self.has_rows = not tail[:-1].rstrip().endswith(b'[')
+        self.file.seek(tail_start + len(tail) - 1)
+        self.file.truncate()
+
+    def write_rows(self, rows):
+        fields = self.fields
+        parts = []
+        for row in rows:
+            parts.append(',\n  ' if self.has_rows else '\n  ')
+            parts.append(json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+            self.has_rows = True
+        data = ''.join(parts)
+        self.file.write(data.encode('utf-8') if 'b' in self.file.mode else data)
+
+    def close(self):
+        data = '\n]\n' if self.has_rows else ']\n'
+        self.file.write(data.encode('utf-8') if 'b' in self.file.mode else data)
+        self.file.close()
+
+
+class XlsxExporter(Exporter):
+    """使用openpyxl的只写模式，内存占用与行数无关"""
+
+    extension = '.xlsx'
+    label = 'Excel'
+
+    def open(self):
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(self.fields)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.file_name)
+
+    @classmethod
+    def available(cls):
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+class ParquetExporter(Exporter):
+    """Parquet列式格式（需要安装pyarrow），每批写入一个行组"""
+
+    extension = '.parquet'
+    label = 'Parquet'
+    batch_size = 50000
+
+    def open(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([(field, pa.string()) for field in self.fields])
+        self.writer = pq.ParquetWriter(self.file_name, self.schema)
+
+    def write_rows(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * len(self.fields)
+        table = self.pa.Table.from_arrays(
+            [self.pa.array(column, type=self.pa.string()) for column in columns],
+            schema=self.schema
+        )
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+    @classmethod
+    def available(cls):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+EXPORTERS = [CsvExporter, JsonLinesExporter, JsonExporter, XlsxExporter, ParquetExporter]
+
+
+def available_exporters():
+    return [exporter for exporter in EXPORTERS if exporter.available()]
+
+
+def file_filter():
+    """文件对话框使用的格式过滤器"""
+    return ';;'.join(f"{exporter.label} Files (*{exporter.extension})"
+                     for exporter in available_exporters())
+
+
+def get_exporter(file_name):
+    """按扩展名选择导出器，不支持的格式返回None"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.ndjson':
+        extension = '.jsonl'
+    for exporter in EXPORTERS:
+        if exporter.extension == extension:
+            return exporter
+    return None
+
+
+def export_rows(file_name, rows, fields=EXPORT_FIELDS, append=False, progress=None, cancelled=None):
+    """流式导出行数据（与fields对应的元组序列），返回写入的行数
+
+    progress(已写入, 总数) 在每批写入后调用；cancelled() 返回True时提前结束
+    """
+    exporter_class = get_exporter(file_name)
+    if exporter_class is None:
+        raise ValueError(f"不支持的文件格式: {file_name}")
+    if not exporter_class.available():
+        raise ValueError(f"导出{exporter_class.label}需要安装额外的依赖")
+
+    exporter = exporter_class(file_name, fields, append)
+    total = len(rows)
+    batch_size = exporter.batch_size
+    written = 0
+    exporter.open()
+    try:
+        for start in range(0, total, batch_size):
+            if cancelled and cancelled():
+                break
+            batch = rows[start:start + batch_size]
+            exporter.write_rows(batch)
+            written += len(batch)
+            if progress:
+                progress(written, total)
+    finally:
+        exporter.close()
+    return written
+
+
+class ExportWorker(QThread):
+    """在后台线程中导出，避免阻塞界面"""
+
+    progress = pyqtSignal(int, int)  # (已写入, 总数)
+    succeeded = pyqtSignal(str, int)  # (文件名, 写入行数)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_name, rows, fields=EXPORT_FIELDS, append=False, parent=None):
+        """rows应为导出时刻的快照，后台线程中界面仍可修改结果"""
+        super().__init__(parent)
+        self.file_name = file_name
+        self.rows = rows
+        self.fields = fields
+        self.append = append
+
+    def run(self):
+        try:
+            written = export_rows(self.file_name, self.rows, self.fields, self.append,
+                                  self.progress.emit, self.isInterruptionRequested)
+            self.succeeded.emit(self.file_name, written)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            # 数据库快照持有读事务，导出结束后立即释放
+            close = getattr(self.rows, 'close', None)
+            if close is not None:
+                close()
+            self.rows = None
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+
+from dedup import MIN_NEAR_DUP_CUTOFF, DedupIndex, NearDupIndex, simhash
+from page_scripts import TEXT_MODES, DEFAULT_TEXT_MODE
+from record_mode import RecordSchema
+from selector_compiler import DEFAULT_MATCH_MODE, MATCH_MODES, resolve_match_mode
+from crawl_config import DEFAULT_DELAY, DEFAULT_PER_HOST, DEFAULT_RETRIES, normalize_url
+from scheduler import ScrapeScheduler
+from sqlite_store import SqliteResultStore
+from snapshot_cache import configure_http_cache, default_cache_dir
+from request_filter import DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_HOSTS, install_interceptor, load_block_rules
+
+log = logging.getLogger(__name__)
+
+RECIPE_VERSION = 1
+DEFAULT_THRESHOLD = 0.67
+
+
+def save_recipe(file_name, selectors_info, threshold, text_mode=DEFAULT_TEXT_MODE,
+                match_mode=DEFAULT_MATCH_MODE, css_selectors=None, record=None):
+    """保存选择器配方，供无界面模式复用；css_selectors为由样例归纳出的CSS选择器，
+    record为记录模式的定义（RecordSchema.to_dict()）"""
+    recipe = {
+        'version': RECIPE_VERSION,
+        'selectors_info': selectors_info,
+        'threshold': threshold,
+        'text_mode': text_mode,
+        'match_mode': match_mode,
+        'css_selectors': css_selectors or [],
+    }
+    if record:
+        recipe['record'] = record
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(recipe, f, ensure_ascii=False, indent=2)
+
+
+def load_recipe(file_name):
+    """读取选择器配方，返回包含selectors_info、threshold、text_mode、match_mode、css_selectors
+    和record（记录模式的定义，没有时为None）的字典"""
+    with open(file_name, 'r', encoding='utf-8') as f:
+        recipe = json.load(f)
+
+    record = recipe.get('record')
+    if record:
+        RecordSchema.from_dict(record)
+
+    selectors_info = recipe.get('selectors_info') or []
+    if not selectors_info and not record:
+        raise ValueError(f"配方中没有选择器: {file_name}")
+    for info in selectors_info:
+        if 'selector' not in info:
+            raise ValueError(f"配方格式错误，缺少selector字段: {info}")
+        info.setdefault('className', '')
+
+    threshold = float(recipe.get('threshold', DEFAULT_THRESHOLD))
+    if not 0 <= threshold <= 1:
+        raise ValueError("相似度阈值必须在0到1之间")
+
+    text_mode = recipe.get('text_mode', DEFAULT_TEXT_MODE)
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"未知的文本提取策略: {text_mode}")
+
+    match_mode = recipe.get('match_mode', 'similarity')  # 旧版配方只有相似度匹配
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"未知的匹配方式: {match_mode}")
+
+    return {
+        'selectors_info': selectors_info,
+        'threshold': threshold,
+        'text_mode': text_mode,
+        'match_mode': match_mode,
+        'css_selectors': list(recipe.get('css_selectors') or []),
+        'record': record,
+    }
+
+
+def load_urls(file_name):
+    """读取URL列表，每行一个，忽略空行和#注释"""
+    urls = []
+    with open(file_name, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(normalize_url(line))
+    return urls
+
+
+class HeadlessScraper(QObject):
+    """无窗口批量抓取：用页面池并发加载URL，按配方匹配元素并逐行输出JSON（按页面完成顺序）"""
+
+    finished = pyqtSignal()
+
+    def __init__(self, recipe, urls, output, timeout=30.0, concurrency=None,
+                 per_host=DEFAULT_PER_HOST, delay=DEFAULT_DELAY, retries=DEFAULT_RETRIES,
+                 near_dup_cutoff=None, store=None):
+        """output为None时不输出JSON Lines；store为SqliteResultStore时结果同时写入数据库"""
+        super().__init__()
+        self.output = output
+        self.store = store
+        self.near_dup_cutoff = near_dup_cutoff  # 近似去重的相似度下限，None表示只去除完全相同的结果
+        self.scheduler = ScrapeScheduler(QWebEngineProfile.defaultProfile(), recipe,
+                                         self.handle_results, concurrency, per_host, delay,
+                                         timeout, retries, parent=self)
+        self.scheduler.add_urls(urls)
+        self.scheduler.progress.connect(log.debug)
+        self.scheduler.finished.connect(lambda ok, failed: self.finished.emit())
+
+    @property
+    def ok_count(self):
+        return self.scheduler.ok_count
+
+    @property
+    def failed_count(self):
+        return self.scheduler.failed_count
+
+    @property
+    def result_count(self):
+        return self.scheduler.result_count
+
+    def start(self):
+        log.info("开始抓取 %d 个URL，并发页面数 %d", self.scheduler.total, len(self.scheduler.slots))
+        self.scheduler.start()
+
+    def handle_results(self, url, results):
+        # 同一页面内按完整文本去重，与界面中的去重规则保持一致
+        index = DedupIndex()
+        near_dup = NearDupIndex(self.near_dup_cutoff) if self.near_dup_cutoff is not None else None
+        records = []
+        for result in results:
+            if not index.add(result['text']):
+                continue
+            if near_dup is not None:
+                fingerprint = simhash(result['text'])
+                if near_dup.find(fingerprint) is not None:
+                    continue
+                near_dup.append(fingerprint)
+            record = {'url': url}
+            record.update(result)
+            records.append(record)
+        if self.store is not None:
+            # 每个页面的结果在一个事务中写入
+            self.store.extend(records)
+        if self.output is not None:
+            for record in records:
+                self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.output.flush()
+        count = len(records)
+        log.info("找到 %d 个匹配元素: %s", count, url)
+        return count
+
+
+def run_headless(args, qt_argv):
+    """无界面模式入口，返回进程退出码"""
+    if not args.recipe or not args.urls:
+        log.error("无界面模式需要同时指定 --recipe 和 --urls")
+        return 2
+
+    try:
+        recipe = load_recipe(args.recipe)
+        urls = load_urls(args.urls)
+        block_rules = (load_block_rules(args.block_rules) if args.block_rules
+                       else (DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_HOSTS))
+    except (OSError, ValueError) as e:
+        log.error("读取输入失败: %s", e)
+        return 2
+
+    if args.near_dup is not None and not MIN_NEAR_DUP_CUTOFF <= args.near_dup <= 1:
+        log.error("近似去重阈值必须在%s到1之间", MIN_NEAR_DUP_CUTOFF)
+        return 2
+
+    if args.threshold is not None and not 0 <= args.threshold <= 1:
+        log.error("相似度阈值必须在0到1之间")
+        return 2
+
+    if args.threshold is not None:
+        recipe['threshold'] = args.threshold
+    if args.text_mode is not None:
+        recipe['text_mode'] = args.text_mode
+    if args.match_mode is not None:
+        recipe['match_mode'] = args.match_mode
+        if args.match_mode != 'similarity':
+            _, recipe['css_selectors'] = resolve_match_mode(args.match_mode, recipe['selectors_info'])
+
+    # 没有显示器时使用offscreen平台
+    if not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(qt_argv)
+
+    # 只提取文本和链接，默认拦截图片、字体、广告等请求
+    profile = QWebEngineProfile.defaultProfile()
+    request_filter = install_interceptor(profile, *block_rules, enabled=not args.no_block)
+    # 多次运行之间复用HTTP磁盘缓存
+    configure_http_cache(profile, args.cache_dir or default_cache_dir())
+
+    store = None
+    if args.db:
+        try:
+            store = SqliteResultStore(args.db)
+        except sqlite3.Error as e:
+            log.error("打开结果数据库失败: %s", e)
+            return 2
+
+    # 写入数据库时只在指定了--output时输出JSON Lines
+    if args.output:
+        output = open(args.output, 'w', encoding='utf-8')
+    else:
+        output = None if store is not None else sys.stdout
+    try:
+        scraper = HeadlessScraper(recipe, urls, output, args.timeout, args.concurrency,
+                                  args.per_host, args.delay, args.retries, args.near_dup, store)
+        scraper.finished.connect(app.quit)
+        scraper.start()
+        app.exec_()
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+        if store is not None:
+            store.close()
+
+    log.info("抓取完成: 成功 %d 个页面，失败 %d 个页面，共 %d 条结果",
+             scraper.ok_count, scraper.failed_count, scraper.result_count)
+    if request_filter.enabled:
+        log.info(request_filter.summary())
+    return 0 if scraper.failed_count == 0 else 1
@@ -1,127 +1,118 @@
 import sys
+import time
+STARTUP_TIME = time.perf_counter()  # 启动计时从导入模块之前开始
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLineEdit, QPushButton, QTextEdit,
-                            QTableWidget, QTableWidgetItem, QLabel, QFileDialog, QMenu)
+                            QTableView, QHeaderView, QAbstractItemView, QLabel, QFileDialog,
+                            QMenu, QAction, QComboBox, QProgressBar, QInputDialog,
+                            QMessageBox, QSlider)
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineSettings
 from PyQt5.QtCore import QUrl, Qt
 from PyQt5.QtWebChannel import QWebChannel
 from PyQt5.QtGui import QIcon
-import pandas as pd
 from element_selector import ElementSelector
-from PyQt5.QtCore import QTimer, QObject, pyqtSlot
-import json
+from page_scripts import (TEXT_MODES, DEFAULT_TEXT_MODE, build_match_js, build_css_match_js, build_cancel_match_js, build_element_texts_js,
+                          build_record_container_js, build_relative_path_js,
+                          build_find_next_js, install_bootstrap_scripts)
+from result_model import ResultTableModel, truncate_text
+from record_mode import RecordSchema
+from selector_compiler import DEFAULT_MATCH_MODE, MATCH_MODES, resolve_match_mode
+from score_cache import SCORE_FLOOR, selectors_key
+from score_histogram import ScoreHistogram
+from snapshot_cache import SnapshotCache, configure_http_cache, default_cache_dir
+from startup_profile import StartupProfile
+from metrics import LOG_LEVELS, metrics, setup_logging
+from dedup import MIN_NEAR_DUP_CUTOFF
+from crawl_config import DEFAULT_DELAY, DEFAULT_RETRIES, default_concurrency, normalize_url
+from request_filter import DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_HOSTS, install_interceptor, load_block_rules
+from datetime import datetime
+import argparse
+import logging
 import os
 
+MAX_SNAPSHOT_MENU_ITEMS = 20
+
+log = logging.getLogger(__name__)
+
 class WebScraperApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, block_rules=None, cache_dir=None, startup_profile=None, result_store=None):
+        """block_rules: 请求拦截规则 (资源类型列表, 域名模式列表)，为None时使用默认规则
+        cache_dir: HTTP缓存和页面快照目录，为None时使用系统缓存目录
+        startup_profile: 记录启动各阶段耗时的StartupProfile
+        result_store: 结果存储（如SqliteResultStore），为None时使用内存中的ResultStore"""
         super().__init__()
+        self.result_store = result_store
+        self.startup_profile = startup_profile or StartupProfile(time.perf_counter())
+        self.block_rules = block_rules or (DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_HOSTS)
+        self.cache_dir = cache_dir or default_cache_dir()
         self.initUI()
-        self.data = []
         self.selector_mode = False
+        self.match_job_id = 0
+        self.match_state = None  # 当前流式匹配任务的状态
+        self.match_added_keys = set()  # 上次匹配新增到表格的结果摘要，调整阈值时据此增删
+        self.paginator = None  # 自动翻页任务
+        self.scheduler = None  # 批量抓取任务
+        self.record_schema = RecordSchema()  # 记录模式的容器和字段
+        self.export_worker = None  # 后台导出任务
         
         # 设置应用图标
         self.setWindowIcon(QIcon('images/icon_app.png'))
         
         # 设置WebChannel
         self.channel = QWebChannel()
-        self.selector = ElementSelector(self.browser, self.data_table, self.status_bar)
+        self.selector = ElementSelector(self.browser, self.result_model, self.status_bar)
         self.channel.registerObject('elementSelector', self.selector)
         self.browser.page().setWebChannel(self.channel)
         
-        # 在页面加载完成后初始化WebChannel
+        # 在文档创建时注入WebChannel、选择器样式和页面运行时
+        install_bootstrap_scripts(self.browser.page())
+        self.selector.pageReady.connect(self.onPageReady)
+        
+        # 流式匹配结果
+        self.selector.matchBatchReceived.connect(self.handle_match_batch)
+        self.selector.matchProgress.connect(self.handle_match_progress)
+        self.selector.matchFinished.connect(self.handle_match_finished)
+        
+        self.browser.loadStarted.connect(self.onLoadStarted)
         self.browser.loadFinished.connect(self.onLoadFinished)
+        self.startup_profile.mark('WebChannel和页面脚本')
+        self.startup_profile.watch_first_paint(self)
+        
+    def onLoadStarted(self):
+        metrics.start('page.load')
+        # 页面跳转后进行中的匹配任务不会再回传结果
+        if self.match_state:
+            self.finish_match(self.match_state['job_id'], cancelled=True)
+        # 缓存的分数属于上一个页面
+        self.selector.score_cache.clear()
+        self.match_added_keys = set()
+        self.update_score_histogram()
         
     def onLoadFinished(self, ok):
-        if ok:
-            print("页面加载完成，开始初始化WebChannel")
-            # 先注入QWebChannel.js
-            self.browser.page().runJavaScript("""
-                if (!window.QWebChannel) {
-                    var script = document.createElement('script');
-                    script.src = 'qrc:///qtwebchannel/qwebchannel.js';
-                    document.head.appendChild(script);
-                }
-            """)
-            
-            # 等待一段时间后初始化WebChannel
-            QTimer.singleShot(500, self.initializeWebChannel)
-        else:
-            print("页面加载失败")
-            
-    def initializeWebChannel(self):
-        js = """
-        (function() {
-            if (typeof QWebChannel === 'undefined') {
-                console.error('QWebChannel not loaded yet');
-                return;
-            }
+        # WebChannel、样式和页面运行时已在文档创建时注入，无需在此等待
+        url = self.browser.url().toString()
+        metrics.finish('page.load', url=url, ok=ok)
+        self.selector.selected_elements.url = url
+        with metrics.span('page.on_load_finished'):
+            if ok:
+                log.info("页面加载完成: %s", url)
+                if self.request_filter.enabled:
+                    log.info(self.request_filter.summary())
+                if self.auto_snapshot_action.isChecked() and self.browser.url().scheme() in ('http', 'https'):
+                    self.snapshot_cache.save_page(self.browser.page())
+            else:
+                log.warning("页面加载失败: %s", url)
             
-            new QWebChannel(qt.webChannelTransport, function(channel) {
-                window.qt = channel.objects;
-                console.log('QWebChannel initialized');
-                
-                // 添加样式
-                if (!document.getElementById('element-selector-style')) {
-                    const style = document.createElement('style');
-                    style.id = 'element-selector-style';
-                    style.textContent = `
-                        .element-selector-highlight {
-                            outline: 2px solid rgba(255, 165, 0, 0.5) !important;
-                            outline-offset: -2px !important;
-                            cursor: pointer !important;
-                            background-color: rgba(255, 255, 0, 0.1) !important;
-                        }
-                    `;
-                    document.head.appendChild(style);
-                }
-                
-                // 添加全局函数
-                window.getFullPath = function(el) {
-                    if (!el || !el.nodeType) return '';
-                    let path = [];
-                    while (el && el.nodeType === Node.ELEMENT_NODE) {
-                        let selector = el.nodeName.toLowerCase();
-                        if (el.id) {
-                            selector += '#' + el.id;
-                            path.unshift(selector);
-                            break;
-                        } else {
-                            let sib = el, nth = 1;
-                            while (sib.previousElementSibling) {
-                                sib = sib.previousElementSibling;
-                                if (sib.nodeName.toLowerCase() === selector) nth++;
-                            }
-                            if (nth !== 1) selector += ":nth-of-type("+nth+")";
-                        }
-                        path.unshift(selector);
-                        el = el.parentNode;
-                    }
-                    return path.join(' > ');
-                };
-            });
-        })();
-        """
-        self.browser.page().runJavaScript(js)
-        print("WebChannel初始化完成")
-        
-    def checkWebChannelStatus(self):
-        js = """
-        (function() {
-            if (window.qt && window.qt.elementSelector) {
-                console.log('QWebChannel 状态检查: 已初始化');
-                return true;
-            } else {
-                console.log('QWebChannel 状态检查: 未初始化');
-                return false;
-            }
-        })();
-        """
-        def callback(result):
-            if not result:
-                print("QWebChannel未正确初始化，尝试重新初始化...")
-                self.onLoadFinished(True)
-                
-        self.browser.page().runJavaScript(js, callback)
+    def onPageReady(self, elapsed_ms):
+        """页面内WebChannel就绪，选择和匹配可用"""
+        # 页面内performance.now()测得的自导航开始到WebChannel就绪的耗时
+        metrics.record('page.channel_ready', elapsed_ms)
+        log.info("页面可交互，用时 %.0f ms", elapsed_ms)
+        status = f"页面可交互，用时 {elapsed_ms:.0f} ms"
+        if self.request_filter.enabled:
+            status += f"，{self.request_filter.summary()}"
+        self.update_status(status)
         
     def initUI(self):
         # 主窗口设置
@@ -151,11 +142,27 @@ class WebScraperApp(QMainWindow):
         self.preview_btn.clicked.connect(self.load_url)
         url_layout.addWidget(self.preview_btn)
         
+        self.block_btn = QPushButton("精简加载")
+        self.block_btn.setCheckable(True)
+        self.block_btn.setChecked(True)
+        self.block_btn.setToolTip("拦截图片、字体、音视频和广告统计请求，只加载提取文本和链接所需的资源")
+        self.block_btn.toggled.connect(self.toggle_request_filter)
+        url_layout.addWidget(self.block_btn)
+        
+        self.snapshot_btn = QPushButton("快照")
+        self.snapshot_btn.setToolTip("保存或打开页面快照，可离线重新匹配")
+        snapshot_menu = QMenu(self.snapshot_btn)
+        snapshot_menu.aboutToShow.connect(self.update_snapshot_menu)
+        self.snapshot_btn.setMenu(snapshot_menu)
+        url_layout.addWidget(self.snapshot_btn)
+        
         left_panel.addLayout(url_layout)
         
         # 网页预览窗口
+        self.startup_profile.mark('initUI（预览之前）')
         self.browser = QWebEngineView()
         self.browser.setPage(QWebEnginePage())
+        self.startup_profile.mark('创建QWebEngineView')
         
         # 启用必要的设置
         settings = self.browser.page().settings()
@@ -172,6 +179,19 @@ class WebScraperApp(QMainWindow):
         profile = self.browser.page().profile()
         profile.setHttpUserAgent("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
         
+        # 抓取模式的请求拦截器，自动翻页的离屏页面共用同一个profile
+        self.request_filter = install_interceptor(profile, *self.block_rules)
+        
+        # 持久的HTTP磁盘缓存和页面快照
+        configure_http_cache(profile, self.cache_dir)
+        self.snapshot_cache = SnapshotCache(self.cache_dir, parent=self)
+        self.snapshot_cache.saved.connect(self.handle_snapshot_saved)
+        self.snapshot_cache.failed.connect(
+            lambda url, reason: self.update_status(f"保存快照失败: {reason}"))
+        self.auto_snapshot_action = QAction("预览后自动保存快照", self)
+        self.auto_snapshot_action.setCheckable(True)
+        self.auto_snapshot_action.setChecked(True)
+        
         left_panel.addWidget(self.browser)
         
         # 右侧面板（数据展示）
@@ -181,29 +201,30 @@ class WebScraperApp(QMainWindow):
         right_widget.setLayout(right_panel)
         
         # 数据展示区域
-        self.data_table = QTableWidget()
-        self.data_table.setColumnCount(1)  # 只显示内容列
-        self.data_table.setHorizontalHeaderLabels(['内容'])
-        self.data_table.setSelectionBehavior(QTableWidget.SelectRows)  # 整行选择
-        self.data_table.setEditTriggers(QTableWidget.NoEditTriggers)  # 禁止编辑
+        self.result_model = ResultTableModel(self.result_store)  # 只显示内容列
+        self.data_table = QTableView()
+        self.data_table.setModel(self.result_model)
+        self.data_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # 整行选择
+        self.data_table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 禁止编辑
         self.data_table.setContextMenuPolicy(Qt.CustomContextMenu)  # 启用自定义右键菜单
         self.data_table.customContextMenuRequested.connect(self.show_context_menu)  # 连接右键菜单信号
         # 设置表格列宽自动调整
         self.data_table.horizontalHeader().setStretchLastSection(True)
         # 设置表格行高
         self.data_table.verticalHeader().setDefaultSectionSize(30)  # 设置默认行高
+        self.data_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # 固定行高，避免逐行计算
         # 设置表格样式
         self.data_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background-color: white;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
                 border-bottom: 1px solid #eee;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #e6f3ff;
                 color: black;
             }
@@ -263,10 +284,84 @@ class WebScraperApp(QMainWindow):
                 border-color: #99ccff;
             }
         """)
+        self.similarity_input.editingFinished.connect(self.sync_threshold_slider)
         similarity_layout.addWidget(self.similarity_input)
+        
+        # 近似去重阈值：留空关闭，只有数字、空白等细微差别的结果只保留一个
+        near_dup_label = QLabel("近似:")
+        near_dup_label.setStyleSheet("font-size: 12px;")
+        similarity_layout.addWidget(near_dup_label)
+        
+        self.near_dup_input = QLineEdit()
+        self.near_dup_input.setPlaceholderText("关闭")
+        self.near_dup_input.setMaximumWidth(45)
+        self.near_dup_input.setToolTip(f"近似去重的文本相似度下限（{MIN_NEAR_DUP_CUTOFF}-1，如0.9），留空关闭。\n"
+                                       "按SimHash指纹跳过与已有结果近似重复的匹配结果（数字视为相同）")
+        self.near_dup_input.setStyleSheet(self.similarity_input.styleSheet())
+        self.near_dup_input.editingFinished.connect(self.apply_near_dup_cutoff)
+        similarity_layout.addWidget(self.near_dup_input)
+        
+        # 文本提取策略
+        text_mode_label = QLabel("文本:")
+        text_mode_label.setStyleSheet("font-size: 12px;")
+        similarity_layout.addWidget(text_mode_label)
+        
+        self.text_mode_combo = QComboBox()
+        for mode, label in TEXT_MODES.items():
+            self.text_mode_combo.addItem(label, mode)
+        self.text_mode_combo.setCurrentIndex(self.text_mode_combo.findData(DEFAULT_TEXT_MODE))
+        self.text_mode_combo.setToolTip("可见文本: 仅对匹配结果计算innerText\n"
+                                        "全部文本: textContent，不触发布局计算\n"
+                                        "自身文本: 仅元素自身的文本节点")
+        self.text_mode_combo.setStyleSheet("font-size: 12px;")
+        self.text_mode_combo.currentIndexChanged.connect(self.change_text_mode)
+        similarity_layout.addWidget(self.text_mode_combo)
+        
+        # 匹配方式
+        match_mode_label = QLabel("匹配:")
+        match_mode_label.setStyleSheet("font-size: 12px;")
+        similarity_layout.addWidget(match_mode_label)
+        
+        self.match_mode_combo = QComboBox()
+        for mode, label in MATCH_MODES.items():
+            self.match_mode_combo.addItem(label, mode)
+        self.match_mode_combo.setCurrentIndex(self.match_mode_combo.findData(DEFAULT_MATCH_MODE))
+        self.match_mode_combo.setToolTip("自动: 样例足以归纳出通用CSS选择器时使用CSS选择器，否则按相似度匹配\n"
+                                         "CSS选择器: 去掉样例路径中不同的序号，用querySelectorAll直接匹配\n"
+                                         "相似度: 对页面中每个元素计算与样例的相似度")
+        self.match_mode_combo.setStyleSheet("font-size: 12px;")
+        similarity_layout.addWidget(self.match_mode_combo)
         similarity_layout.addStretch()  # 添加弹性空间
         
+        self.stats_btn = QPushButton("统计")
+        self.stats_btn.setCheckable(True)
+        self.stats_btn.setToolTip("显示页面加载、匹配、结果处理和导出等各阶段的耗时统计")
+        self.stats_btn.setStyleSheet("font-size: 12px; padding: 2px 6px;")
+        similarity_layout.addWidget(self.stats_btn)
+        
+        self.bulk_btn = QPushButton("清洗")
+        self.bulk_btn.setCheckable(True)
+        self.bulk_btn.setToolTip("批量过滤、正则提取、规范化和去重结果（可撤销）")
+        self.bulk_btn.setStyleSheet("font-size: 12px; padding: 2px 6px;")
+        similarity_layout.addWidget(self.bulk_btn)
+        
         right_panel.addLayout(similarity_layout)
+        
+        # 阈值滑块和相似度分布：匹配后拖动滑块在本地按缓存的分数重新过滤
+        threshold_layout = QHBoxLayout()
+        threshold_layout.setContentsMargins(0, 0, 0, 0)
+        self.threshold_slider = QSlider(Qt.Horizontal)
+        self.threshold_slider.setRange(0, 100)
+        self.threshold_slider.setValue(67)
+        self.threshold_slider.setToolTip("拖动调整相似度阈值，上次匹配的结果按缓存的分数即时过滤")
+        self.threshold_slider.valueChanged.connect(self.change_threshold)
+        self.syncing_threshold = False  # 由输入框同步滑块时，滑块不回写输入框
+        self.active_threshold = self.threshold_slider.value() / 100  # 当前用于本地过滤的阈值
+        threshold_layout.addWidget(self.threshold_slider, 1)
+        self.score_histogram = ScoreHistogram()
+        self.score_histogram.set_threshold(0.67)
+        threshold_layout.addWidget(self.score_histogram, 2)
+        right_panel.addLayout(threshold_layout)
         right_panel.addSpacing(5)  # 减小垂直间距
         
         # 创建按钮并添加到布局
@@ -283,20 +378,54 @@ class WebScraperApp(QMainWindow):
         self.match_btn.clicked.connect(self.match_elements)
         btn_layout.addWidget(self.match_btn)
         
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setStyleSheet(button_style)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_match)
+        btn_layout.addWidget(self.cancel_btn)
+        
         self.save_btn = QPushButton("保存")  # 缩短按钮文本
         self.save_btn.setIcon(QIcon('images/icon_save.png'))
         self.save_btn.setStyleSheet(button_style)
         self.save_btn.clicked.connect(self.save_data)
         btn_layout.addWidget(self.save_btn)
         
+        self.recipe_btn = QPushButton("配方")
+        self.recipe_btn.setIcon(QIcon('images/icon_save.png'))
+        self.recipe_btn.setStyleSheet(button_style)
+        self.recipe_btn.setToolTip("导出选择器配方，供无界面批量抓取使用")
+        self.recipe_btn.clicked.connect(self.export_recipe)
+        btn_layout.addWidget(self.recipe_btn)
+        
         self.next_btn = QPushButton("下一页")
         self.next_btn.setIcon(QIcon('images/icon_next.png'))
         self.next_btn.setStyleSheet(button_style)
         self.next_btn.clicked.connect(self.next_page)
         btn_layout.addWidget(self.next_btn)
         
+        self.batch_btn = QPushButton("批量")
+        self.batch_btn.setStyleSheet(button_style)
+        self.batch_btn.setToolTip("从URL列表文件并发抓取多个页面，按当前选择器和相似度阈值匹配")
+        self.batch_btn.clicked.connect(self.batch_scrape)
+        btn_layout.addWidget(self.batch_btn)
+        
+        self.record_btn = QPushButton("记录")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setStyleSheet(button_style)
+        self.record_btn.setToolTip("记录模式：先点击一个容器（如列表中的一项），再点击其中的字段，\n"
+                                   "匹配时一次提取所有同类容器，每个容器一行，每个字段一列")
+        self.record_btn.toggled.connect(self.toggle_record_mode)
+        btn_layout.addWidget(self.record_btn)
+        
         right_panel.addLayout(btn_layout)
         
+        # 匹配进度
+        self.match_progress = QProgressBar()
+        self.match_progress.setMaximumHeight(12)
+        self.match_progress.setTextVisible(False)
+        self.match_progress.hide()
+        right_panel.addWidget(self.match_progress)
+        
         # 状态栏
         self.status_bar = QLabel("就绪")
         self.status_bar.setStyleSheet("""
@@ -311,278 +440,883 @@ class WebScraperApp(QMainWindow):
         self.status_bar.setWordWrap(True)  # 允许文本换行
         right_panel.addWidget(self.status_bar)
         
+        # 性能统计面板和批量清洗面板，第一次打开时才创建
+        self.stats_panel = None
+        self.bulk_panel = None
+        self.tool_panels = QVBoxLayout()
+        self.tool_panels.setContentsMargins(0, 0, 0, 0)
+        self.stats_btn.toggled.connect(self.toggle_stats_panel)
+        self.bulk_btn.toggled.connect(self.toggle_bulk_panel)
+        right_panel.addLayout(self.tool_panels)
+        
         # 添加左右面板到主布局
         main_layout.addWidget(left_widget, 8)  # 设置比例为8
         main_layout.addWidget(right_widget, 2)  # 设置比例为2
         main_layout.setSpacing(10)  # 设置面板间距
         main_layout.setContentsMargins(10, 10, 10, 10)  # 设置外边距
+        self.startup_profile.mark('initUI（其余部分）')
+        
+    def toggle_stats_panel(self, visible):
+        if self.stats_panel is None:
+            from stats_panel import StatsPanel
+            self.stats_panel = StatsPanel()
+            self.stats_panel.setMaximumHeight(180)
+            self.tool_panels.insertWidget(0, self.stats_panel)
+        self.stats_panel.setVisible(visible)
+        
+    def toggle_bulk_panel(self, visible):
+        if self.bulk_panel is None:
+            from bulk_panel import BulkPanel
+            self.bulk_panel = BulkPanel(self.result_model)
+            self.bulk_panel.applied.connect(self.update_status)
+            self.tool_panels.addWidget(self.bulk_panel)
+        self.bulk_panel.setVisible(visible)
         
     def load_url(self):
-        url = self.url_input.text()
+        url = normalize_url(self.url_input.text())
         if url:
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            print(f"开始加载URL: {url}")
+            log.info("开始加载URL: %s", url)
             self.browser.setUrl(QUrl(url))
             self.status_bar.setText(f"正在加载: {url}")
             
+    def update_snapshot_menu(self):
+        """重建快照菜单：保存当前页面、当前URL和其他页面的最近快照"""
+        menu = self.snapshot_btn.menu()
+        menu.clear()
+        save_action = menu.addAction("保存当前页面快照")
+        save_action.setEnabled(self.browser.url().scheme() in ('http', 'https'))
+        save_action.triggered.connect(lambda: self.snapshot_cache.save_page(self.browser.page()))
+        menu.addAction(self.auto_snapshot_action)
+        menu.addSeparator()
+        
+        snapshots = self.snapshot_cache.snapshots()
+        if not snapshots:
+            menu.addAction("没有快照").setEnabled(False)
+            return
+        for entry in snapshots[:MAX_SNAPSHOT_MENU_ITEMS]:
+            saved_at = datetime.fromtimestamp(entry['timestamp']).strftime('%m-%d %H:%M')
+            action = menu.addAction(f"{saved_at}  {self.truncate_text(entry['url'])}")
+            action.setToolTip(entry['url'])
+            action.triggered.connect(lambda checked, entry=entry: self.open_snapshot(entry))
+        menu.addSeparator()
+        menu.addAction("清空快照").triggered.connect(self.clear_snapshots)
+        
+    def open_snapshot(self, entry):
+        """离线打开页面快照，之后可直接匹配"""
+        path = self.snapshot_cache.open(entry)
+        self.browser.setUrl(QUrl.fromLocalFile(path))
+        self.update_status(f"已打开快照: {entry['url']}")
+        
+    def handle_snapshot_saved(self, entry):
+        log.info("快照已保存: %s (%d 字节)", entry['url'], entry['size'])
+        
+    def clear_snapshots(self):
+        self.snapshot_cache.clear()
+        self.update_status("快照已清空")
+        
     def save_data(self):
-        if not self.selector.selected_elements:
+        from exporters import EXPORT_FIELDS, ExportWorker, available_exporters, file_filter, get_exporter
+        if not self.selector.selected_elements and not self.record_mode_active():
             self.status_bar.setText("没有数据可保存")
             return
+        if self.export_worker and self.export_worker.isRunning():
+            self.update_status("正在导出，请稍候")
+            return
             
         # 生成带时间戳的默认文件名
-        from datetime import datetime
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         default_filename = f"scraped_data_{timestamp}"
         
-        options = QFileDialog.Options()
+        options = QFileDialog.Options() | QFileDialog.DontConfirmOverwrite  # 覆盖或追加由下面询问
         file_name, file_type = QFileDialog.getSaveFileName(
             self,
             "保存文件",
             default_filename,
-            "CSV Files (*.csv);;JSON Files (*.json);;Excel Files (*.xlsx)",
+            file_filter(),
             options=options
         )
-        
-        if file_name:
-            try:
-                # 准备数据
-                data = []
-                for element in self.selector.selected_elements:
-                    data.append({
-                        'text': element['text'],
-                        'selector': element['selector'],
-                        'href': element.get('href', '')
-                    })
-                
-                # 根据文件类型保存
-                if file_name.endswith('.csv'):
-                    df = pd.DataFrame(data)
-                    df.to_csv(file_name, index=False, encoding='utf-8-sig')  # 使用带BOM的UTF-8编码
-                elif file_name.endswith('.json'):
-                    with open(file_name, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                elif file_name.endswith('.xlsx'):
-                    df = pd.DataFrame(data)
-                    df.to_excel(file_name, index=False)
+        if not file_name:
+            return
+            
+        exporter = get_exporter(file_name)
+        if exporter is None:
+            # 未输入扩展名时使用所选的格式
+            for candidate in available_exporters():
+                if candidate.extension in file_type:
+                    exporter = candidate
+                    file_name += candidate.extension
+                    break
+        if exporter is None:
+            self.update_status(f"不支持的文件格式: {file_name}")
+            return
+            
+        append = False
+        if os.path.exists(file_name):
+            if exporter.supports_append:
+                answer = QMessageBox.question(
+                    self, "保存文件",
+                    f"{os.path.basename(file_name)} 已存在。\n"
+                    "选择\"是\"追加本次会话中尚未导出到该文件的结果，选择\"否\"覆盖。",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                )
+                if answer == QMessageBox.Cancel:
+                    return
+                append = answer == QMessageBox.Yes
+            elif QMessageBox.question(self, "保存文件",
+                                      f"{os.path.basename(file_name)} 已存在，是否覆盖？") != QMessageBox.Yes:
+                return
                 
-                self.status_bar.setText(f"数据已保存到: {file_name}")
-            except Exception as e:
-                self.status_bar.setText(f"保存失败: {str(e)}")
-                print(f"保存数据时出错: {str(e)}")
+        # 导出时刻的快照（内存存储只复制列的引用，SQLite存储在后台线程中按批查询），导出期间界面仍可修改结果
+        store = self.selector.selected_elements
+        # 记录模式提取的字段追加在固定列之后
+        fields = EXPORT_FIELDS + tuple(store.field_names)
+        keep = None
+        path = os.path.abspath(file_name)
+        if append:
+            # 增量导出：跳过本次会话中已导出到该文件的结果
+            keep = store.unexported_rows(path)
+            if not keep:
+                self.update_status("没有新的结果需要追加")
+                return
+        marks = store.export_marks(keep)
+        rows = store.snapshot(fields, keep)
                 
+        self.export_worker = ExportWorker(file_name, rows, fields, append, self)
+        self.export_worker.progress.connect(self.handle_export_progress)
+        self.export_worker.succeeded.connect(
+            lambda name, written: self.handle_export_succeeded(path, marks, append, name, written))
+        self.export_worker.failed.connect(self.handle_export_failed)
+        self.save_btn.setEnabled(False)
+        self.match_progress.setMaximum(max(len(rows), 1))
+        self.match_progress.setValue(0)
+        self.match_progress.show()
+        self.update_status(f"正在导出 {len(rows)} 条结果...")
+        metrics.start('export', format=exporter.label, rows=len(rows), append=append)
+        self.export_worker.start()
+        
+    def handle_export_progress(self, written, total):
+        self.match_progress.setValue(written)
+        self.update_status(f"正在导出: {written}/{total}")
+        
+    def handle_export_succeeded(self, path, marks, append, file_name, written):
+        metrics.finish('export', written=written)
+        self.selector.selected_elements.mark_exported(path, marks, append)
+        self.finish_export()
+        action = "追加" if append else "保存"
+        self.status_bar.setText(f"已{action} {written} 条数据到: {file_name}")
+        
+    def handle_export_failed(self, message):
+        metrics.finish('export', error=message)
+        self.finish_export()
+        self.status_bar.setText(f"保存失败: {message}")
+        log.error("保存数据时出错: %s", message)
+        
+    def finish_export(self):
+        self.save_btn.setEnabled(True)
+        if not self.match_state:
+            self.match_progress.hide()
+            
     def next_page(self):
-        self.status_bar.setText("下一页功能待实现")
+        """自动翻页：检测（或由用户指定）下一页控件，按当前选择器和阈值逐页匹配"""
+        if self.paginator and self.paginator.is_running():
+            self.paginator.cancel()
+            return
+            
+        if not self.selector.selected_elements and not self.record_mode_active():
+            self.update_status("没有选择器可匹配")
+            return
+            
+        threshold = self.get_threshold()
+        if threshold is None:
+            return
+            
+        recipe = self.build_recipe(threshold)
+        self.browser.page().runJavaScript(build_find_next_js(),
+                                          lambda info: self.start_pagination(recipe, info))
+        
+    def start_pagination(self, recipe, detected):
+        from paginator import AutoPaginator, DEFAULT_MAX_PAGES
+        if detected:
+            hint = f"自动检测到下一页: {detected.get('text') or detected.get('selector')}"
+        else:
+            hint = "未自动检测到下一页"
+        next_selector, ok = QInputDialog.getText(
+            self, "自动翻页",
+            f"{hint}\n留空使用自动检测，或输入下一页按钮的CSS选择器:"
+        )
+        if not ok:
+            return
+        next_selector = next_selector.strip()
+        
+        max_pages, ok = QInputDialog.getInt(self, "自动翻页", "最多抓取页数:",
+                                            DEFAULT_MAX_PAGES, 1, 10000)
+        if not ok:
+            return
+            
+        current_url = self.browser.url().toString()
+        if not next_selector and detected and detected.get('href'):
+            # 直接从下一页开始，当前页视为已处理
+            start_url, skip_first = detected['href'], False
+        elif current_url:
+            # 重新加载当前页，仅用于查找（或点击）下一页
+            start_url, skip_first = current_url, True
+        else:
+            self.update_status("请先加载网页")
+            return
+            
+        self.paginator = AutoPaginator(self.browser.page().profile(), recipe,
+                                       self.handle_page_results, max_pages,
+                                       next_selector, parent=self)
+        self.paginator.progress.connect(self.update_status)
+        self.paginator.finished.connect(self.handle_pagination_finished)
+        self.next_btn.setText("停止")
+        self.paginator.start(start_url, skip_first)
+        
+    def handle_page_results(self, url, results):
+        """处理自动翻页中每一页的匹配结果，返回新增条数"""
+        for item in results:
+            item['url'] = url  # SQLite存储按来源页面保存
+        return len(self.result_model.append_rows(results))
+        
+    def handle_pagination_finished(self, page_count, reason):
+        self.next_btn.setText("下一页")
+        self.update_status(f"自动翻页结束: 共 {page_count} 页，{reason}")
+        # 每次翻页都新建两个离屏页面，结束后释放
+        self.paginator.close()
+        self.paginator = None
+        
+    def batch_scrape(self):
+        """批量抓取：页面池并发加载URL列表中的页面，按当前选择器和阈值匹配"""
+        from headless import load_urls
+        from scheduler import ScrapeScheduler
+        if self.scheduler and self.scheduler.is_running():
+            self.scheduler.cancel()
+            return
+            
+        if not self.selector.selected_elements and not self.record_mode_active():
+            self.update_status("没有选择器可匹配")
+            return
+            
+        threshold = self.get_threshold()
+        if threshold is None:
+            return
+            
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "选择URL列表", "", "Text Files (*.txt);;All Files (*)"
+        )
+        if not file_name:
+            return
+        try:
+            urls = load_urls(file_name)
+        except OSError as e:
+            self.update_status(f"读取URL列表失败: {str(e)}")
+            return
+        if not urls:
+            self.update_status("URL列表为空")
+            return
+            
+        concurrency, ok = QInputDialog.getInt(self, "批量抓取", f"共 {len(urls)} 个URL，并发页面数:",
+                                              default_concurrency(), 1, 32)
+        if not ok:
+            return
+            
+        recipe = self.build_recipe(threshold)
+        # 与预览共用profile，请求拦截规则和HTTP缓存同样生效
+        self.scheduler = ScrapeScheduler(self.browser.page().profile(), recipe,
+                                         self.handle_page_results, concurrency, parent=self)
+        self.scheduler.add_urls(urls)
+        self.scheduler.progress.connect(self.update_status)
+        self.scheduler.finished.connect(self.handle_batch_finished)
+        self.batch_btn.setText("停止")
+        self.update_status(f"批量抓取: 正在加载 {len(urls)} 个页面...")
+        self.scheduler.start()
+        
+    def handle_batch_finished(self, ok_count, failed_count):
+        self.batch_btn.setText("批量")
+        self.update_status(f"批量抓取结束: 成功 {ok_count} 个页面，失败 {failed_count} 个，"
+                           f"新增 {self.scheduler.result_count} 条")
+        # 每次批量抓取都新建页面池，结束后释放
+        self.scheduler.close()
+        self.scheduler = None
+        
+    def toggle_record_mode(self, checked):
+        """进入记录模式时重新定义容器和字段，点击的元素不再添加到表格"""
+        if checked:
+            self.record_schema = RecordSchema()
+            self.selector.click_handler = self.handle_record_click
+            if not self.select_btn.isChecked():
+                self.select_btn.setChecked(True)
+                self.toggle_select_mode()
+            self.update_status("记录模式: 请点击一个容器元素（如列表中的一项）")
+        else:
+            self.selector.click_handler = None
+            self.update_status("已退出记录模式")
+            
+    def record_mode_active(self):
+        return self.record_btn.isChecked() and self.record_schema.is_ready()
+            
+    def handle_record_click(self, info):
+        """记录模式下的点击：第一次点击确定容器，之后点击容器内的字段"""
+        schema = self.record_schema
+        page = self.browser.page()
+        if not schema.has_container():
+            def handle_container(result):
+                if not result:
+                    self.update_status("无法识别该容器，请重新点击")
+                    return
+                schema.container_path = info['selector']
+                schema.container_selector = result['selector']
+                self.update_status(f"已选择容器，页面中共 {result['count']} 个同类容器，请点击容器内的字段")
+            page.runJavaScript(build_record_container_js(info['selector']), handle_container)
+            return
+            
+        def handle_path(path):
+            if path is None:
+                self.update_status("字段必须位于所选容器内")
+                return
+            name, ok = QInputDialog.getText(self, "记录字段", "字段名:",
+                                            text=f"字段{len(schema.fields) + 1}")
+            if not ok:
+                return
+            name = name.strip()
+            error = schema.validate_name(name)
+            if error:
+                self.update_status(error)
+                return
+            schema.add_field(name, path)
+            self.update_status(f"已添加字段 {name}（共 {len(schema.fields)} 个），点击匹配提取所有记录")
+        page.runJavaScript(build_relative_path_js(schema.container_path, info['selector']), handle_path)
+        
+    def toggle_request_filter(self, checked):
+        """切换请求拦截，对之后加载的页面生效"""
+        self.request_filter.enabled = checked
+        if checked:
+            self.update_status("已启用精简加载，刷新页面后生效")
+        else:
+            self.update_status(f"已关闭精简加载（{self.request_filter.summary()}）")
         
     def toggle_select_mode(self):
         if self.select_btn.isChecked():
             # 确保浏览器窗口已加载完成
             if self.browser.page():
                 self.selector.enable_selector_mode()
-                print("选择模式已启用")
+                log.debug("选择模式已启用")
         else:
             self.selector.disable_selector_mode()
-            print("选择模式已禁用")
+            log.debug("选择模式已禁用")
                 
-    def check_mouse_position(self):
-        if self.browser.page() and self.select_btn.isChecked():
-            # 获取当前鼠标位置
-            pos = self.browser.mapFromGlobal(self.browser.cursor().pos())
-            if self.browser.rect().contains(pos):
-                self.selector.highlight_element_at(pos)
-                print(f"Mouse position checked: {pos.x()}, {pos.y()}")
-        
     def show_context_menu(self, pos):
         menu = QMenu()
         delete_action = menu.addAction("删除")
+        html_action = menu.addAction("复制HTML")
+        row = self.data_table.indexAt(pos).row()
+        html_action.setEnabled(row >= 0)
         action = menu.exec_(self.data_table.mapToGlobal(pos))
         
         if action == delete_action:
             self.delete_selected_rows()
+        elif action == html_action:
+            self.copy_element_html(row)
+            
+    def copy_element_html(self, row):
+        """从当前页面按需获取元素的HTML并复制到剪贴板"""
+        def handle_html(html):
+            if html is None:
+                self.update_status("当前页面中找不到该元素")
+                return
+            QApplication.clipboard().setText(html)
+            self.update_status(f"已复制元素HTML（{len(html)} 个字符）")
+        self.selector.fetch_html(row, handle_html)
             
     def delete_selected_rows(self):
-        rows = set()
-        for item in self.data_table.selectedItems():
-            rows.add(item.row())
-        
-        # 从大到小删除行，避免索引变化
-        for row in sorted(rows, reverse=True):
-            self.data_table.removeRow(row)
-            if row < len(self.selector.selected_elements):
-                self.selector.selected_elements.pop(row)
+        rows = [index.row() for index in self.data_table.selectionModel().selectedRows()]
+        
+        # 一次性批量删除
+        self.result_model.remove_rows(rows)
                 
     def truncate_text(self, text, max_length=50):
         """截断文本，保留指定长度"""
-        if len(text) <= max_length:
-            return text
-        return text[:max_length] + "..."
+        return truncate_text(text, max_length)
 
     def update_status(self, text):
         """更新状态栏显示"""
         self.status_bar.setText(self.truncate_text(text))
 
-    def match_elements(self):
-        if not self.selector.selected_elements:
-            self.update_status("没有选择器可匹配")
-            return
-            
-        # 获取用户输入的相似度阈值
+    def get_match_mode(self):
+        """当前选择的匹配方式"""
+        return self.match_mode_combo.currentData()
+
+    def build_recipe(self, threshold):
+        """当前的选择器、阈值、文本提取策略和匹配方式（含归纳出的CSS选择器）"""
+        selectors_info = self.build_selectors_info()
+        match_mode = self.get_match_mode()
+        _, css_selectors = resolve_match_mode(match_mode, selectors_info)
+        return {
+            'selectors_info': selectors_info,
+            'threshold': threshold,
+            'text_mode': self.get_text_mode(),
+            'match_mode': match_mode,
+            'css_selectors': css_selectors,
+            'record': self.record_schema.to_dict() if self.record_mode_active() else None,
+        }
+
+    def get_text_mode(self):
+        """当前选择的文本提取策略"""
+        return self.text_mode_combo.currentData()
+
+    def change_text_mode(self):
+        self.selector.set_text_mode(self.get_text_mode())
+
+    def get_threshold(self):
+        """读取相似度阈值，无效时更新状态栏并返回None"""
         try:
             threshold = float(self.similarity_input.text())
             if not 0 <= threshold <= 1:
                 self.update_status("相似度阈值必须在0到1之间")
-                return
+                return None
         except ValueError:
             self.update_status("请输入有效的相似度阈值（0-1之间的小数）")
+            return None
+        return threshold
+
+    def build_selectors_info(self):
+        """收集所有已选元素的选择器和类名（相同的组合只保留一个）"""
+        return self.selector.selected_elements.selectors_info()
+
+    def export_recipe(self):
+        """导出选择器配方（选择器和相似度阈值）"""
+        from headless import save_recipe
+        if not self.selector.selected_elements and not self.record_mode_active():
+            self.update_status("没有选择器可导出")
+            return
+            
+        threshold = self.get_threshold()
+        if threshold is None:
+            return
+            
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "导出配方", "recipe.json", "JSON Files (*.json)"
+        )
+        if file_name:
+            try:
+                recipe = self.build_recipe(threshold)
+                save_recipe(file_name, recipe['selectors_info'], threshold, recipe['text_mode'],
+                            recipe['match_mode'], recipe['css_selectors'], recipe['record'])
+                self.update_status(f"配方已保存到: {file_name}")
+            except Exception as e:
+                self.update_status(f"保存配方失败: {str(e)}")
+                log.exception("保存配方时出错")
+
+    def match_elements(self):
+        if not self.selector.selected_elements and not self.record_mode_active():
+            self.update_status("没有选择器可匹配")
+            return
+            
+        # 获取用户输入的相似度阈值
+        threshold = self.get_threshold()
+        if threshold is None:
             return
             
         # 收集所有选择器和类名
-        selectors_info = []
-        for item in self.selector.selected_elements:
-            selector = item['selector']
-            class_name = ''
-            if 'className' in item:
-                class_name = item['className']
-            selectors_info.append({
-                'selector': selector,
-                'className': class_name
-            })
-        
-        # 构建JavaScript代码来匹配元素
-        js = """
-        (function() {
-            let results = [];
-            let selectorsInfo = %s;
-            let SIMILARITY_THRESHOLD = %f;  // 从Python传入相似度阈值
-            
-            // 计算两个选择器的相似度
-            function calculateSelectorSimilarity(selector1, selector2) {
-                let parts1 = selector1.split('>').map(s => s.trim());
-                let parts2 = selector2.split('>').map(s => s.trim());
-                
-                // 计算相同部分的数量
-                let commonParts = 0;
-                let totalParts = Math.max(parts1.length, parts2.length);
-                
-                // 从后往前比较，因为后面的选择器部分通常更重要
-                for (let i = 1; i <= Math.min(parts1.length, parts2.length); i++) {
-                    if (parts1[parts1.length - i] === parts2[parts2.length - i]) {
-                        commonParts++;
-                    } else {
-                        break;  // 一旦不同就停止比较
-                    }
-                }
-                
-                return commonParts / totalParts;
-            }
+        selectors_info = self.build_selectors_info()
+        text_mode = self.get_text_mode()
+        
+        match_mode, css_selectors = resolve_match_mode(self.get_match_mode(), selectors_info)
+        record = self.record_schema if self.record_mode_active() else None
+        if record:
+            match_mode, css_selectors = 'record', []
+        cache = self.selector.score_cache
+        key = None
+        scan_threshold = threshold
+        self.match_job_id += 1
+        job_id = self.match_job_id
+        
+        if record:
+            # 一次遍历所有同类容器，每个容器提取一行多字段的记录
+            log.info("使用记录模式匹配: %s，字段 %s", record.container_selector, ', '.join(record.field_names()))
+            js = record.build_match_js(text_mode, with_timings=True)
+            cache.clear()
+        elif match_mode == 'css':
+            # 归纳出的CSS选择器与阈值无关，由querySelectorAll直接匹配（同步返回全部结果）
+            log.info("使用CSS选择器匹配: %s", ', '.join(css_selectors))
+            js = build_css_match_js(css_selectors, text_mode, with_timings=True)
+            cache.clear()
+        else:
+            # 相同选择器集合的分数已缓存时，由页面核对DOM版本，未变化则直接本地过滤
+            key = selectors_key(selectors_info, text_mode)
+            cached_version = cache.dom_version if cache.matches(key) and cache.covers(threshold) else None
+            # 按缓存下限扫描，之后在下限以上调整阈值都不必重新遍历页面；
+            # 低于当前阈值的候选只回传分数，不在页面中提取文本
+            scan_threshold = min(threshold, SCORE_FLOOR)
             
-            // 计算两个类名字符串的相似度
-            function calculateClassSimilarity(classes1, classes2) {
-                if (!classes1 || !classes2) return 0;
-                
-                // 将类名字符串转换为数组并排序
-                let set1 = new Set(classes1.split(/\\s+/).filter(c => c.length > 0).sort());
-                let set2 = new Set(classes2.split(/\\s+/).filter(c => c.length > 0).sort());
-                
-                if (set1.size === 0 || set2.size === 0) return 0;
-                
-                // 计算交集
-                let intersection = new Set([...set1].filter(x => set2.has(x)));
+            # 构建JavaScript代码来匹配元素（流式分批回传）
+            js = build_match_js(selectors_info, threshold, text_mode, job_id, with_timings=True,
+                                cached_version=cached_version, floor=scan_threshold)
+        
+        self.match_state = {
+            'job_id': job_id,
+            'mode': match_mode,
+            'css_selectors': css_selectors,
+            'threshold': threshold,
+            'new_count': 0,
+            'key': key,
+            'scan_threshold': scan_threshold,
+            'text_mode': text_mode,
+            'scanning': False,  # 是否已开始接收扫描结果（写入分数缓存）
+            'added_keys': set(),
+            'near_duplicates': self.result_model.near_duplicate_count,
+        }
+        self.set_matching(True)
+        self.update_status("正在匹配...")
+        metrics.start('match', job_id, selectors=len(selectors_info), threshold=threshold,
+                      mode=match_mode)
+        
+        def handle_started(result):
+            if not self.match_state or self.match_state['job_id'] != job_id:
+                return
+            result = result if isinstance(result, dict) else {'results': result or []}
+            if result.get('cached'):
+                self.fetch_cached_texts(threshold, lambda fetched: handle_cached(fetched))
+                return
+            self.begin_score_cache(result.get('domVersion'))
+            if result.get('streaming'):
+                self.match_progress.setMaximum(max(result.get('total', 0), 1))
+                return
+            # QWebChannel不可用时脚本同步执行并直接返回全部结果
+            self.add_match_results(result.get('results') or [])
+            self.record_match_timings(result.get('timings') or {})
+            self.finish_match(job_id)
+        
+        def handle_cached(fetched):
+            if not self.match_state or self.match_state['job_id'] != job_id:
+                return
+            if fetched:
+                self.apply_cached_scores(threshold)
+                self.finish_match(job_id)
+            else:
+                # 取文本前页面已变化，缓存已清空，重新扫描
+                self.finish_match(job_id)
+                self.match_elements()
+        
+        self.browser.page().runJavaScript(js, handle_started)
+        
+    def set_matching(self, matching):
+        """切换匹配中的界面状态"""
+        self.match_btn.setEnabled(not matching)
+        self.cancel_btn.setEnabled(matching)
+        self.match_progress.setValue(0)
+        self.match_progress.setVisible(matching)
+        
+    def cancel_match(self):
+        if self.match_state:
+            self.browser.page().runJavaScript(build_cancel_match_js(self.match_state['job_id']))
+            self.update_status("正在取消匹配...")
+            
+    def begin_score_cache(self, dom_version=None):
+        """开始把本次扫描的全部候选写入分数缓存（分批结果可能先于脚本返回值到达）"""
+        state = self.match_state
+        cache = self.selector.score_cache
+        if state['mode'] != 'similarity':
+            return
+        if not state['scanning']:
+            state['scanning'] = True
+            cache.begin(dom_version, state['key'], state['scan_threshold'], state['text_mode'])
+        elif dom_version is not None:
+            cache.dom_version = dom_version
+            
+    def add_match_results(self, results):
+        """添加匹配结果到表格（按完整文本的去重索引跳过已有结果）"""
+        state = self.match_state
+        if state['mode'] == 'similarity':
+            self.selector.score_cache.add(results)
+        # 扫描按缓存下限进行，表格中只添加达到当前阈值的结果（低于阈值的候选没有文本）
+        threshold = state['threshold']
+        results = [item for item in results if item['totalSimilarity'] >= threshold]
+        # 整批插入表格，工具提示由模型按需生成
+        with metrics.span('match.results', rows=len(results)) as fields:
+            new_items = self.result_model.append_rows(results)
+            fields['added'] = len(new_items)
+        store = self.selector.selected_elements
+        if new_items:
+            state['added_keys'].update(store.keys[-len(new_items):])
+        state['new_count'] += len(new_items)
+        
+    def apply_cached_scores(self, threshold):
+        """DOM未变化：直接按缓存的分数添加结果"""
+        items, keys = self.selector.score_cache.filter(threshold)
+        index = self.selector.selected_elements.index
+        present = {key for key in keys if key in index}
+        with metrics.span('match.results', rows=len(items), cached=True) as fields:
+            new_items = self.result_model.append_rows(items, keys=keys)
+            fields['added'] = len(new_items)
+        self.match_state['added_keys'] = set(keys) - present
+        self.match_state['new_count'] = len(new_items)
+        self.match_state['cached'] = True
+        
+    def record_match_timings(self, timings):
+        """记录页面内performance.now()测得的匹配各阶段耗时"""
+        for phase, duration_ms in timings.items():
+            metrics.record(f'match.js.{phase}', duration_ms)
                 
-                // 计算相似度
-                return intersection.size / Math.max(set1.size, set2.size);
-            }
+    def handle_match_batch(self, job_id, results):
+        if self.match_state and self.match_state['job_id'] == job_id:
+            self.begin_score_cache()
+            self.add_match_results(results)
             
-            // 遍历所有元素
-            function getAllElements() {
-                return document.getElementsByTagName('*');
-            }
+    def handle_match_progress(self, job_id, processed, total):
+        if self.match_state and self.match_state['job_id'] == job_id:
+            self.match_progress.setMaximum(max(total, 1))
+            self.match_progress.setValue(min(processed, total))
+            self.update_status(f"匹配中: 已扫描 {processed}/{total} 个元素，"
+                               f"新增 {self.match_state['new_count']} 个")
             
-            let elements = getAllElements();
-            for (let element of elements) {
-                try {
-                    let elementSelector = getFullPath(element);
-                    let elementClasses = element.className;
-                    let text = (element.innerText || element.textContent || '').trim();
-                    
-                    if (!text) continue;  // 跳过没有文本的元素
-                    
-                    // 检查是否与任何一个选择器匹配
-                    for (let info of selectorsInfo) {
-                        let selectorSimilarity = calculateSelectorSimilarity(elementSelector, info.selector);
-                        let classSimilarity = calculateClassSimilarity(elementClasses, info.className);
-                        
-                        // 新的匹配逻辑：选择器或类名超过阈值即匹配
-                        if (selectorSimilarity >= SIMILARITY_THRESHOLD || classSimilarity >= SIMILARITY_THRESHOLD) {
-                            results.push({
-                                selector: elementSelector,
-                                text: text,
-                                href: element.href || '',
-                                selectorSimilarity: selectorSimilarity,
-                                classSimilarity: classSimilarity,
-                                totalSimilarity: Math.max(selectorSimilarity, classSimilarity)  // 使用最大值作为总相似度
-                            });
-                            break;  // 找到一个匹配就跳出内层循环
-                        }
-                    }
-                } catch (err) {
-                    console.error('匹配元素错误:', err);
-                }
-            }
+    def handle_match_finished(self, job_id, processed, matched, cancelled, timings):
+        if self.match_state and self.match_state['job_id'] == job_id:
+            self.record_match_timings(timings)
+        self.finish_match(job_id, cancelled)
+        
+    def finish_match(self, job_id, cancelled=False):
+        state = self.match_state
+        if not state or state['job_id'] != job_id:
+            return
+        self.match_state = None
+        self.set_matching(False)
+        
+        cache = self.selector.score_cache
+        if state['scanning']:
+            if cancelled:
+                # 不完整的扫描结果不能用于本地过滤
+                cache.clear()
+            else:
+                index = self.selector.selected_elements.index
+                with metrics.span('match.cache', candidates=len(cache.pending)):
+                    cache.finish(lambda item: index.key(item['text'], item['selector']))
+        self.match_added_keys = state['added_keys']
+        self.update_score_histogram()
+        
+        new_count = state['new_count']
+        metrics.finish('match', job_id, new=new_count, cancelled=cancelled,
+                       cached=state.get('cached', False),
+                       near_duplicates=self.result_model.near_duplicate_count - state['near_duplicates'])
+        log.info("匹配%s: 新增 %d 个元素", "已取消" if cancelled else "完成", new_count)
+        if state['mode'] == 'css':
+            source = f"（CSS选择器: {', '.join(state['css_selectors'])}）"
+        elif state['mode'] == 'record':
+            source = f"（记录模式: {len(self.record_schema.fields)} 个字段）"
+        else:
+            source = "（使用缓存的分数）" if state.get('cached') else ""
+        near_duplicates = self.result_model.near_duplicate_count - state['near_duplicates']
+        if near_duplicates:
+            source += f"，跳过 {near_duplicates} 个近似重复"
+        if cancelled:
+            self.update_status(f"匹配已取消，已添加 {new_count} 个新的匹配元素")
+        elif new_count > 0:
+            if state['mode'] in ('css', 'record'):
+                self.update_status(f"找到 {new_count} 个新的匹配元素{source}")
+            else:
+                self.update_status(f"找到 {new_count} 个新的匹配元素 (相似度阈值: {state['threshold']:.0%}){source}")
+        else:
+            self.update_status(f"未找到新的匹配元素{source}")
+            
+    def update_score_histogram(self):
+        cache = self.selector.score_cache
+        if cache.complete:
+            self.score_histogram.set_data(cache.histogram(), cache.floor)
+        else:
+            self.score_histogram.set_data([], cache.floor)
+            
+    def apply_near_dup_cutoff(self):
+        """近似去重阈值编辑完成：对之后添加的匹配结果生效，已有结果作为比较的基准"""
+        text = self.near_dup_input.text().strip()
+        store = self.selector.selected_elements
+        if not text:
+            if store.near_dup is not None:
+                store.set_near_dup_cutoff(None)
+                self.update_status("已关闭近似去重")
+            return
+        try:
+            cutoff = float(text)
+            if not MIN_NEAR_DUP_CUTOFF <= cutoff <= 1:
+                raise ValueError
+        except ValueError:
+            self.update_status(f"近似去重阈值必须在{MIN_NEAR_DUP_CUTOFF}到1之间，留空关闭")
+            return
+        if store.near_dup is not None and store.near_dup.cutoff == cutoff:
+            return
+        with metrics.span('near_dup.index', rows=len(store)):
+            store.set_near_dup_cutoff(cutoff)
+        self.update_status(f"已启用近似去重（相似度 ≥ {cutoff:.2f}），之后的匹配结果中近似重复的将被跳过")
+        
+    def sync_threshold_slider(self):
+        """阈值输入框编辑完成后同步滑块，按输入的阈值（不按滑块的0.01精度取整）本地过滤"""
+        threshold = self.get_threshold()
+        if threshold is None:
+            return
+        self.syncing_threshold = True
+        try:
+            self.threshold_slider.setValue(round(threshold * 100))
+        finally:
+            self.syncing_threshold = False
+        if threshold != self.active_threshold:
+            self.apply_threshold(threshold)
             
-            // 按总相似度排序
-            results.sort((a, b) => b.totalSimilarity - a.totalSimilarity);
-            return results;
-        })();
-        """ % (json.dumps(selectors_info), threshold)
+    def change_threshold(self, value):
+        """拖动滑块：把滑块的阈值写回输入框"""
+        if self.syncing_threshold:
+            return
+        threshold = value / 100
+        self.similarity_input.setText(f"{threshold:.2f}")
+        self.apply_threshold(threshold)
         
-        def handle_results(results):
-            if not results:
-                self.update_status("未找到新的匹配元素")
+    def apply_threshold(self, threshold):
+        self.active_threshold = threshold
+        self.score_histogram.set_threshold(threshold)
+        if self.match_state or not self.selector.score_cache.complete:
+            return
+        self.refilter_matches(threshold)
+        
+    def fetch_cached_texts(self, threshold, callback):
+        """缓存中达到阈值但扫描时低于当时阈值的候选没有文本，按选择器从页面取得后调用callback(True)；
+        页面已变化时清空缓存并调用callback(False)"""
+        cache = self.selector.score_cache
+        rows = cache.missing_texts(threshold)
+        if not rows:
+            callback(True)
+            return
+        items = cache.items
+        index = self.selector.selected_elements.index
+        metrics.start('match.texts', threshold, rows=len(rows))
+        
+        def handle_texts(texts):
+            metrics.finish('match.texts', threshold, fetched=texts is not None)
+            if cache.items is not items:
+                return  # 期间缓存已被新的扫描替换
+            if texts is None:
+                cache.clear()
+                self.update_score_histogram()
+                callback(False)
                 return
-                
-            # 获取当前已有的文本集合（用于去重）
-            existing_texts = {self.data_table.item(row, 0).text() 
-                            for row in range(self.data_table.rowCount())}
-            
-            # 添加新的匹配结果（去重）
-            new_count = 0
-            for result in results:
-                text = result['text']
-                truncated_text = self.truncate_text(text)
-                
-                # 检查是否已存在（使用截断后的文本比较）
-                if truncated_text not in existing_texts:
-                    existing_texts.add(truncated_text)
-                    row = self.data_table.rowCount()
-                    self.data_table.insertRow(row)
-                    # 在表格中显示截断的文本
-                    self.data_table.setItem(row, 0, QTableWidgetItem(truncated_text))
-                    # 设置完整文本作为工具提示
-                    tooltip_text = (
-                        f"文本: {text}\n"
-                        f"选择器相似度: {result['selectorSimilarity']:.2%}\n"
-                        f"类名相似度: {result['classSimilarity']:.2%}\n"
-                        f"最大相似度: {result['totalSimilarity']:.2%}"
-                    )
-                    self.data_table.item(row, 0).setToolTip(tooltip_text)
-                    self.selector.selected_elements.append(result)
-                    new_count += 1
-            
-            if new_count > 0:
-                self.update_status(f"找到 {new_count} 个新的匹配元素 (相似度阈值: {threshold:.0%})")
+            cache.set_texts(rows, texts, lambda item: index.key(item['text'], item['selector']))
+            callback(True)
+        
+        js = build_element_texts_js([cache.items[row]['selector'] for row in rows],
+                                    cache.text_mode, cache.dom_version)
+        self.browser.page().runJavaScript(js, handle_texts)
+        
+    def refilter_matches(self, threshold):
+        """按缓存的分数调整上次匹配的结果：移除低于新阈值的，补充达到新阈值的"""
+        cache = self.selector.score_cache
+        if not cache.covers(threshold):
+            self.update_status(f"阈值低于缓存的分数下限 {cache.floor:.2f}，请点击匹配重新扫描页面")
+            return
+        
+        def handle_fetched(fetched):
+            # 取文本期间开始了新的匹配或阈值又被调整时，由之后的调用处理
+            if self.match_state or self.active_threshold != threshold:
+                return
+            if fetched:
+                self.apply_refilter(threshold)
             else:
-                self.update_status("未找到新的匹配元素")
+                self.update_status("页面内容已变化，请点击匹配重新扫描页面")
+        
+        self.fetch_cached_texts(threshold, handle_fetched)
         
-        self.browser.page().runJavaScript(js, handle_results)
+    def apply_refilter(self, threshold):
+        cache = self.selector.score_cache
+        store = self.selector.selected_elements
+        with metrics.span('match.refilter', threshold=threshold) as fields:
+            items, keys = cache.filter(threshold)
+            desired = set(keys)
+            removed = self.match_added_keys - desired
+            if removed:
+                self.result_model.remove_rows(store.rows_with_keys(removed))
+            present = {key for key in keys if key in store.index}
+            new_items = self.result_model.append_rows(items, keys=keys)
+            self.match_added_keys = (self.match_added_keys & desired) | (desired - present)
+            fields.update(added=len(new_items), removed=len(removed))
+        self.update_status(f"相似度阈值 {threshold:g}: 本次匹配共 {len(self.match_added_keys)} 个结果"
+                           f"（新增 {len(new_items)}，移除 {len(removed)}）")
         
+def parse_args(argv):
+    """解析命令行参数，未识别的参数交给Qt处理"""
+    parser = argparse.ArgumentParser(description='网页数据抓取工具')
+    parser.add_argument('--headless', action='store_true',
+                        help='无界面批量抓取模式')
+    parser.add_argument('--recipe', help='选择器配方文件（在界面中通过"配方"按钮导出）')
+    parser.add_argument('--urls', help='URL列表文件，每行一个')
+    parser.add_argument('--output', help='结果输出文件（JSON Lines），默认输出到标准输出')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='覆盖配方中的相似度阈值')
+    parser.add_argument('--text-mode', choices=list(TEXT_MODES), default=None,
+                        help='覆盖配方中的文本提取策略')
+    parser.add_argument('--match-mode', choices=list(MATCH_MODES), default=None,
+                        help='覆盖配方中的匹配方式（auto/css/similarity）')
+    parser.add_argument('--near-dup', type=float, default=None,
+                        help=f'近似去重的文本相似度下限（{MIN_NEAR_DUP_CUTOFF}-1），同一页面中近似重复的结果只输出一个')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='单个页面加载超时时间（秒）')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='无界面模式同时加载的页面数（默认按CPU核数，最多8个）')
+    parser.add_argument('--per-host', type=int, default=None,
+                        help='同一域名同时加载的页面数（默认不超过并发页面数）')
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY,
+                        help='同一域名两次开始加载之间的最小间隔（秒）')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='页面加载失败或超时后的重试次数')
+    parser.add_argument('--block-rules',
+                        help='请求拦截规则文件（JSON，包含block_types和block_hosts）')
+    parser.add_argument('--no-block', action='store_true',
+                        help='不拦截图片、字体、广告等资源请求')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='输出启动各阶段（导入、QApplication、initUI、QWebEngineView、首次绘制）的耗时')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO',
+                        help='日志级别（DEBUG时输出每个计时区间）')
+    parser.add_argument('--metrics',
+                        help='把各阶段计时以JSON Lines格式追加写入该文件')
+    parser.add_argument('--db', default=None,
+                        help='把结果写入SQLite数据库（边匹配边写入，已有的数据库继续使用）；'
+                             '无界面模式下指定后只在同时指定--output时输出JSON Lines')
+    parser.add_argument('--cache-dir', default=None,
+                        help='HTTP缓存和页面快照目录，默认使用系统缓存目录')
+    return parser.parse_known_args(argv[1:])
+
 if __name__ == '__main__':
+    startup_profile = StartupProfile(STARTUP_TIME)
+    startup_profile.mark('导入模块')
+    args, qt_args = parse_args(sys.argv)
+    startup_profile.enabled = args.startup_profile
+    setup_logging(args.log_level, args.metrics)
+    if args.headless:
+        from headless import run_headless
+        sys.exit(run_headless(args, sys.argv[:1] + qt_args))
+        
     # 确保images目录存在
     if not os.path.exists('images'):
         os.makedirs('images')
         
-    app = QApplication(sys.argv)
-    window = WebScraperApp()
+    block_rules = None
+    if args.block_rules:
+        try:
+            block_rules = load_block_rules(args.block_rules)
+        except (OSError, ValueError) as e:
+            log.error("读取拦截规则失败: %s", e)
+            sys.exit(2)
+        
+    result_store = None
+    if args.db:
+        import sqlite3
+        from sqlite_store import SqliteResultStore
+        try:
+            result_store = SqliteResultStore(args.db)
+        except sqlite3.Error as e:
+            log.error("打开结果数据库失败: %s", e)
+            sys.exit(2)
+        
+    startup_profile.mark('读取参数')
+    app = QApplication(sys.argv[:1] + qt_args)
+    startup_profile.mark('创建QApplication')
+    window = WebScraperApp(block_rules, args.cache_dir, startup_profile, result_store)
+    if args.no_block:
+        window.block_btn.setChecked(False)
     window.show()
     sys.exit(app.exec_())
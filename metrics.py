@@ -0,0 +1,103 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+log = logging.getLogger(__name__)
+
+
+def setup_logging(level='INFO', metrics_file=None):
+    """配置日志输出到标准错误；指定metrics_file时同时把计时区间写入JSON Lines文件"""
+    logging.basicConfig(level=getattr(logging, level.upper(), logging.INFO),
+                        format=LOG_FORMAT, stream=sys.stderr)
+    if metrics_file:
+        metrics.open(metrics_file)
+
+
+class SpanStats:
+    """单个计时区间的累计统计"""
+
+    __slots__ = ('count', 'total_ms', 'last_ms', 'max_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.last_ms = duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class Metrics(QObject):
+    """计时区间记录：同步代码用span()，跨回调的异步阶段用start()/finish()。
+    每个区间更新累计统计、输出DEBUG日志，并可写入JSON Lines指标文件"""
+
+    recorded = pyqtSignal(str, float)  # (区间名称, 耗时毫秒)
+
+    def __init__(self):
+        super().__init__()
+        self.stats = {}
+        self.active = {}  # (区间名称, 键) -> (开始时间, 附加字段)
+        self.file = None
+
+    def open(self, file_name):
+        self.close()
+        self.file = open(file_name, 'a', encoding='utf-8')
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def record(self, name, duration_ms, **fields):
+        """记录一个已完成的区间（也用于页面内performance.now()测得的耗时）"""
+        self.stats.setdefault(name, SpanStats()).add(duration_ms)
+        log.debug("%s %.1f ms %s", name, duration_ms, fields or '')
+        if self.file:
+            record = {'ts': time.time(), 'span': name, 'ms': round(duration_ms, 3)}
+            record.update(fields)
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+        self.recorded.emit(name, duration_ms)
+
+    @contextmanager
+    def span(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield fields  # 区间内可补充附加字段
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, **fields)
+
+    def start(self, name, key=None, **fields):
+        """开始一个异步区间；同名同键的区间重新开始时覆盖之前的"""
+        self.active[(name, key)] = (time.perf_counter(), fields)
+
+    def finish(self, name, key=None, **fields):
+        """结束异步区间并返回耗时毫秒，区间不存在时返回None"""
+        entry = self.active.pop((name, key), None)
+        if entry is None:
+            return None
+        start, start_fields = entry
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.record(name, duration_ms, **dict(start_fields, **fields))
+        return duration_ms
+
+    def cancel(self, name, key=None):
+        self.active.pop((name, key), None)
+
+
+metrics = Metrics()
@@ -0,0 +1,938 @@
+import json
+
+from PyQt5.QtCore import QFile, QIODevice
+from PyQt5.QtWebEngineWidgets import QWebEngineScript
+
+# 元素路径运行时（页面内共享）：
+# getFullPath 带WeakMap缓存，悬停和点击可直接复用匹配时计算的路径；
+# walkElementPaths 自顶向下单次遍历，由父路径和同类型兄弟计数推导子元素路径
+PATH_RUNTIME_JS = """
+if (!window.__elementPathRuntime) {
+    window.__elementPathRuntime = true;
+    window.__elementPathCache = new WeakMap();
+
+    // DOM结构或id变化时清空路径缓存
+    if (window.MutationObserver) {
+        new MutationObserver(function() {
+            window.__elementPathCache = new WeakMap();
+        }).observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ['id']});
+    }
+
+    window.getFullPath = function(el) {
+        if (!el || el.nodeType !== Node.ELEMENT_NODE) return '';
+        let cache = window.__elementPathCache;
+        let chain = [];
+        let path = '';
+
+        // 向上查找，直到命中缓存、遇到带id的元素或到达根节点
+        while (el && el.nodeType === Node.ELEMENT_NODE) {
+            let cached = cache.get(el);
+            if (cached !== undefined) {
+                path = cached;
+                break;
+            }
+            chain.push(el);
+            if (el.id) break;
+            el = el.parentNode;
+        }
+
+        // 自上而下补全并缓存路径
+        for (let i = chain.length - 1; i >= 0; i--) {
+            let node = chain[i];
+            let selector = node.nodeName.toLowerCase();
+            if (node.id) {
+                path = selector + '#' + node.id;
+            } else {
+                let sib = node, nth = 1;
+                while ((sib = sib.previousElementSibling)) {
+                    if (sib.nodeName.toLowerCase() === selector) nth++;
+                }
+                if (nth !== 1) selector += ":nth-of-type(" + nth + ")";
+                path = path ? path + ' > ' + selector : selector;
+            }
+            cache.set(node, path);
+        }
+        return path;
+    };
+
+    // 可分段执行的自顶向下遍历器，next() 依次返回 [元素, 路径]，结束时返回null。
+    // 显式栈实现先序遍历，顺序与getElementsByTagName('*')一致
+    window.createPathWalker = function() {
+        let root = document.documentElement;
+        let stack = root ? [[root, window.getFullPath(root)]] : [];
+
+        return {
+            next: function() {
+                let item = stack.pop();
+                if (!item) return null;
+                let el = item[0], path = item[1];
+
+                let counters = Object.create(null);
+                let children = [];
+                for (let child = el.firstElementChild; child; child = child.nextElementSibling) {
+                    let tag = child.nodeName.toLowerCase();
+                    let nth = (counters[tag] || 0) + 1;
+                    counters[tag] = nth;
+                    let childPath;
+                    if (child.id) {
+                        childPath = tag + '#' + child.id;
+                    } else {
+                        childPath = path + ' > ' + (nth !== 1 ? tag + ":nth-of-type(" + nth + ")" : tag);
+                    }
+                    // 分段执行期间缓存可能被清空，路径同时保存在栈中
+                    window.__elementPathCache.set(child, childPath);
+                    children.push([child, childPath]);
+                }
+                for (let i = children.length - 1; i >= 0; i--) {
+                    stack.push(children[i]);
+                }
+                return item;
+            }
+        };
+    };
+
+    window.walkElementPaths = function(visit) {
+        let walker = window.createPathWalker();
+        let item;
+        while ((item = walker.next())) {
+            visit(item[0], item[1]);
+        }
+    };
+}
+"""
+
+# DOM版本：页面内容（结构、id、class、文本）变化时递增，与随机生成的文档标识组成版本号，
+# 用于判断Python端缓存的相似度分数是否仍然有效。选择器自身的样式和覆盖层不计入
+DOM_VERSION_RUNTIME_JS = """
+if (!window.__domVersionRuntime) {
+    window.__domVersionRuntime = true;
+    window.__domToken = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    window.__domVersion = 0;
+
+    function isOwnNode(node) {
+        return node.nodeName === 'ELEMENT-SELECTOR-OVERLAY' || node.id === 'element-selector-style';
+    }
+
+    if (window.MutationObserver) {
+        new MutationObserver(function(records) {
+            for (let record of records) {
+                if (isOwnNode(record.target)) continue;
+                if (record.type === 'childList' &&
+                    Array.prototype.every.call(record.addedNodes, isOwnNode) &&
+                    Array.prototype.every.call(record.removedNodes, isOwnNode)) continue;
+                window.__domVersion++;
+                return;
+            }
+        }).observe(document, {childList: true, subtree: true, characterData: true,
+                              attributes: true, attributeFilter: ['id', 'class']});
+    }
+
+    window.getDomVersion = function() {
+        return window.__domToken + ':' + window.__domVersion;
+    };
+}
+"""
+
+# 悬停高亮：页面内单一路径，鼠标移动只记录目标元素，每帧最多一次（requestAnimationFrame）
+# 移动一个绝对定位的覆盖层，不修改页面元素的class，避免触发页面自身CSS的样式重算。
+# 覆盖层使用自定义标签并挂在<html>下，不影响页面元素的 :nth-of-type 路径
+HIGHLIGHT_RUNTIME_JS = """
+if (!window._elementSelectorHover) {
+    window._elementSelectorHover = {
+        target: null,
+        pending: false,
+        overlay: null,
+
+        getOverlay: function() {
+            if (!this.overlay || !this.overlay.isConnected) {
+                let overlay = document.createElement('element-selector-overlay');
+                overlay.id = 'element-selector-overlay';
+                overlay.style.cssText = 'position: fixed; left: 0; top: 0; display: none; ' +
+                    'pointer-events: none; z-index: 2147483647; box-sizing: border-box; ' +
+                    'outline: 2px solid rgba(255, 165, 0, 0.5); outline-offset: -2px; ' +
+                    'background-color: rgba(255, 255, 0, 0.1); will-change: transform;';
+                document.documentElement.appendChild(overlay);
+                this.overlay = overlay;
+            }
+            return this.overlay;
+        },
+
+        schedule: function(target) {
+            this.target = target;
+            if (this.pending) return;
+            this.pending = true;
+            requestAnimationFrame(() => this.update());
+        },
+
+        update: function() {
+            this.pending = false;
+            let overlay = this.getOverlay();
+            let target = this.target;
+            if (!target || target === overlay || !target.getBoundingClientRect) {
+                overlay.style.display = 'none';
+                return;
+            }
+            let rect = target.getBoundingClientRect();
+            overlay.style.width = rect.width + 'px';
+            overlay.style.height = rect.height + 'px';
+            overlay.style.transform = 'translate(' + rect.left + 'px, ' + rect.top + 'px)';
+            overlay.style.display = 'block';
+        },
+
+        hide: function() {
+            this.target = null;
+            if (this.overlay) this.overlay.style.display = 'none';
+        }
+    };
+
+    window._elementSelectorMouseHandler = function(e) {
+        window._elementSelectorHover.schedule(e.target);
+    };
+
+    // 滚动时目标元素位置变化，同样在下一帧更新覆盖层
+    window._elementSelectorScrollHandler = function() {
+        let hover = window._elementSelectorHover;
+        if (hover.target) hover.schedule(hover.target);
+    };
+}
+"""
+
+# 文本提取策略：innerText 依赖布局，仅对最终匹配的元素计算；
+# textContent 和 ownText（仅元素自身的文本节点）不触发样式和布局计算
+TEXT_MODES = {
+    'innerText': '可见文本',
+    'textContent': '全部文本',
+    'ownText': '自身文本',
+}
+DEFAULT_TEXT_MODE = 'innerText'
+
+TEXT_RUNTIME_JS = """
+if (!window.getElementText) {
+    window.elementTextMode = window.elementTextMode || 'innerText';
+
+    window.getElementText = function(el, mode) {
+        mode = mode || window.elementTextMode;
+        if (mode === 'textContent') {
+            return (el.textContent || '').trim();
+        }
+        if (mode === 'ownText') {
+            let parts = [];
+            for (let node = el.firstChild; node; node = node.nextSibling) {
+                if (node.nodeType === Node.TEXT_NODE) parts.push(node.nodeValue);
+            }
+            return parts.join('').replace(/\\s+/g, ' ').trim();
+        }
+        return (el.innerText || el.textContent || '').trim();
+    };
+}
+"""
+
+# 相似度索引：
+# 选择器相似度是按 '>' 分段的公共后缀长度 / 两者中较长的段数。已选路径编译为反向分段的
+# 后缀树，每个节点记录经过该节点的样例中最短的路径段数，元素只需沿树下降一次即可得到
+# 与所有样例的最大相似度；类名相似度通过倒排索引（类名 -> 样例编号）计算。
+# 匹配代价与样例数量无关。
+SIMILARITY_RUNTIME_JS = """
+if (!window.buildSimilarityIndex) {
+    window.splitSelector = function(selector) {
+        return selector.split('>').map(s => s.trim());
+    };
+
+    window.splitClasses = function(classes) {
+        return classes ? classes.split(/\\s+/).filter(c => c.length > 0) : [];
+    };
+
+    window.buildSimilarityIndex = function(selectorsInfo) {
+        let trie = {children: new Map(), minLength: Infinity};
+        let classIndex = new Map();  // 类名 -> 样例编号列表
+        let classCounts = [];        // 样例编号 -> 去重后的类名数量
+
+        selectorsInfo.forEach(function(info, id) {
+            // 从最后一段开始插入后缀树
+            let parts = splitSelector(info.selector || '');
+            let node = trie;
+            for (let i = parts.length - 1; i >= 0; i--) {
+                let child = node.children.get(parts[i]);
+                if (!child) {
+                    child = {children: new Map(), minLength: Infinity};
+                    node.children.set(parts[i], child);
+                }
+                child.minLength = Math.min(child.minLength, parts.length);
+                node = child;
+            }
+
+            let classes = new Set(splitClasses(info.className));
+            classCounts[id] = classes.size;
+            for (let c of classes) {
+                let ids = classIndex.get(c);
+                if (!ids) {
+                    ids = [];
+                    classIndex.set(c, ids);
+                }
+                ids.push(id);
+            }
+        });
+
+        return {
+            // 与所有样例的最大选择器相似度
+            selectorSimilarity: function(selector) {
+                let parts = splitSelector(selector);
+                let best = 0;
+                let node = trie;
+                for (let depth = 1; depth <= parts.length; depth++) {
+                    node = node.children.get(parts[parts.length - depth]);
+                    if (!node) break;
+                    let score = depth / Math.max(parts.length, node.minLength);
+                    if (score > best) best = score;
+                }
+                return best;
+            },
+
+            // 与所有样例的最大类名相似度
+            classSimilarity: function(element) {
+                if (classIndex.size === 0) return 0;
+                let className = typeof element.className === 'string'
+                    ? element.className : (element.getAttribute('class') || '');
+                let classes = new Set(splitClasses(className));
+                if (classes.size === 0) return 0;
+
+                let common = new Map();  // 样例编号 -> 相同类名数量
+                for (let c of classes) {
+                    let ids = classIndex.get(c);
+                    if (!ids) continue;
+                    for (let id of ids) common.set(id, (common.get(id) || 0) + 1);
+                }
+
+                let best = 0;
+                for (let [id, count] of common) {
+                    let score = count / Math.max(classes.size, classCounts[id]);
+                    if (score > best) best = score;
+                }
+                return best;
+            }
+        };
+    };
+}
+"""
+
+# 流式匹配时每批回传的结果数量和每段遍历的最长耗时（毫秒）
+MATCH_BATCH_SIZE = 500
+MATCH_CHUNK_MS = 15
+
+# 相似元素匹配脚本。
+# 指定任务编号且QWebChannel可用时分段遍历，通过 elementSelector.receiveMatchBatch
+# 分批回传结果（按文档顺序），每段之间让出事件循环，可通过 build_cancel_match_js 取消；
+# 否则同步执行并返回按相似度排序的结果数组。
+MATCH_JS_TEMPLATE = """
+(function() {
+    %(path_runtime)s
+    %(text_runtime)s
+    %(similarity_runtime)s
+    %(dom_version_runtime)s
+
+    // 页面内容自上次匹配以来没有变化时，直接使用Python端缓存的分数
+    let CACHED_VERSION = %(cached_version)s;
+    let domVersion = getDomVersion();
+    if (CACHED_VERSION !== null && CACHED_VERSION === domVersion) {
+        return {cached: true, domVersion: domVersion};
+    }
+
+    let selectorsInfo = %(selectors_info)s;
+    let SIMILARITY_THRESHOLD = %(threshold)f;  // 从Python传入相似度阈值
+    let SCORE_FLOOR = %(floor)f;  // 分数缓存的下限，不高于阈值
+    let TEXT_MODE = %(text_mode)s;
+    let JOB_ID = %(job_id)s;
+    let BATCH_SIZE = %(batch_size)d;
+    let CHUNK_MS = %(chunk_ms)d;
+
+    let WITH_TIMINGS = %(with_timings)s;
+    let jobStart = performance.now();
+    // 页面内各阶段耗时（毫秒）：scan为遍历和打分（含text），text为文本提取，
+    // serialize为结果序列化，bridge为WebChannel调用
+    let timings = {index: 0, scan: 0, text: 0, serialize: 0, bridge: 0, total: 0};
+
+    let similarityIndex = buildSimilarityIndex(selectorsInfo);
+    timings.index = performance.now() - jobStart;
+
+    // 计算单个元素的匹配结果，不匹配时返回null
+    function matchElement(element, elementSelector) {
+        try {
+            let selectorSimilarity = similarityIndex.selectorSimilarity(elementSelector);
+            let classSimilarity = similarityIndex.classSimilarity(element);
+
+            // 选择器或类名与任一样例的相似度超过阈值即匹配，使用最大值作为总相似度
+            let totalSimilarity = Math.max(selectorSimilarity, classSimilarity);
+            if (totalSimilarity >= SCORE_FLOOR) {
+                let result = {
+                    selector: elementSelector,
+                    href: element.href || '',
+                    selectorSimilarity: selectorSimilarity,
+                    classSimilarity: classSimilarity,
+                    totalSimilarity: totalSimilarity
+                };
+                // 低于当前阈值的候选只回传分数供Python端缓存，调低阈值时再按选择器取文本
+                if (totalSimilarity < SIMILARITY_THRESHOLD) return result;
+
+                // 通过相似度过滤后才提取文本
+                let t = performance.now();
+                result.text = getElementText(element, TEXT_MODE);
+                timings.text += performance.now() - t;
+                if (!result.text) return null;  // 跳过没有文本的元素
+                return result;
+            }
+        } catch (err) {
+            console.error('匹配元素错误:', err);
+        }
+        return null;
+    }
+
+    let bridge = window.qt && window.qt.elementSelector;
+    if (JOB_ID === null || !bridge || !bridge.receiveMatchBatch) {
+        // 同步匹配：单次遍历所有元素
+        let results = [];
+        let t = performance.now();
+        walkElementPaths(function(element, elementSelector) {
+            let result = matchElement(element, elementSelector);
+            if (result) results.push(result);
+        });
+
+        // 按总相似度排序
+        results.sort((a, b) => b.totalSimilarity - a.totalSimilarity);
+        timings.scan = performance.now() - t;
+        timings.total = performance.now() - jobStart;
+        return WITH_TIMINGS ? {results: results, timings: timings, domVersion: domVersion} : results;
+    }
+
+    // 流式匹配
+    window.__matchJobs = window.__matchJobs || {};
+    let job = {cancelled: false};
+    window.__matchJobs[JOB_ID] = job;
+
+    let walker = createPathWalker();
+    let total = document.getElementsByTagName('*').length;
+    let processed = 0;
+    let matched = 0;
+    let batch = [];
+
+    function flush() {
+        if (batch.length) {
+            let t = performance.now();
+            let json = JSON.stringify(batch);
+            let t2 = performance.now();
+            bridge.receiveMatchBatch(JOB_ID, json);
+            timings.serialize += t2 - t;
+            timings.bridge += performance.now() - t2;
+            batch = [];
+        }
+    }
+
+    function finish(cancelled) {
+        delete window.__matchJobs[JOB_ID];
+        timings.total = performance.now() - jobStart;
+        bridge.finishMatch(JOB_ID, processed, matched, cancelled, JSON.stringify(timings));
+    }
+
+    function step() {
+        if (job.cancelled) {
+            finish(true);
+            return;
+        }
+
+        let stepStart = performance.now();
+        let deadline = stepStart + CHUNK_MS;
+        let item;
+        let flushed = timings.serialize + timings.bridge;
+        while ((item = walker.next())) {
+            processed++;
+            let result = matchElement(item[0], item[1]);
+            if (result) {
+                batch.push(result);
+                matched++;
+                if (batch.length >= BATCH_SIZE) flush();
+            }
+            // 每256个元素检查一次时间片
+            if ((processed & 255) === 0 && performance.now() > deadline) break;
+        }
+        // 遍历耗时不含本时间片内的回传
+        timings.scan += performance.now() - stepStart - (timings.serialize + timings.bridge - flushed);
+
+        flush();
+        if (!item) {
+            finish(false);
+            return;
+        }
+        bridge.reportMatchProgress(JOB_ID, processed, total);
+        setTimeout(step, 0);
+    }
+
+    setTimeout(step, 0);
+    return {streaming: true, total: total, domVersion: domVersion};
+})();
+"""
+
+# CSS选择器匹配：由样例归纳出的选择器直接交给querySelectorAll（按文档顺序、自动去重），
+# 只对命中的元素计算路径和文本。同步返回，格式与相似度匹配的同步模式相同
+CSS_MATCH_JS_TEMPLATE = """
+(function() {
+    %(path_runtime)s
+    %(text_runtime)s
+
+    let CSS_SELECTORS = %(css_selectors)s;
+    let TEXT_MODE = %(text_mode)s;
+    let WITH_TIMINGS = %(with_timings)s;
+    let timings = {scan: 0, text: 0};
+    let start = performance.now();
+
+    let elements;
+    try {
+        elements = document.querySelectorAll(CSS_SELECTORS.join(', '));
+    } catch (err) {
+        console.error('CSS选择器无效:', err);
+        elements = [];
+    }
+    timings.scan = performance.now() - start;
+
+    let results = [];
+    for (let i = 0; i < elements.length; i++) {
+        let element = elements[i];
+        let t = performance.now();
+        let text = getElementText(element, TEXT_MODE);
+        timings.text += performance.now() - t;
+        if (!text) continue;
+        results.push({
+            selector: getFullPath(element),
+            text: text,
+            href: element.href || '',
+            selectorSimilarity: 1,
+            classSimilarity: 0,
+            totalSimilarity: 1
+        });
+    }
+    timings.total = performance.now() - start;
+    return WITH_TIMINGS ? {results: results, timings: timings} : results;
+})();
+"""
+
+# 记录模式：由一个样例容器得到同一父元素下所有同类容器的选择器
+RECORD_CONTAINER_JS_TEMPLATE = """
+(function() {
+    %(path_runtime)s
+    try {
+        let el = document.querySelector(%(container)s);
+        if (!el || !el.parentElement) return null;
+        let tag = el.nodeName.toLowerCase();
+        let selector = getFullPath(el.parentElement) + ' > ' + tag;
+        return {selector: selector, count: document.querySelectorAll(selector).length};
+    } catch (err) {
+        console.error('识别记录容器错误:', err);
+        return null;
+    }
+})();
+"""
+
+# 记录模式：字段相对容器的路径（只用标签和同类型序号，使其对每个容器都适用）。
+# 字段即容器本身时返回空字符串，不在容器内时返回null
+RELATIVE_PATH_JS_TEMPLATE = """
+(function() {
+    try {
+        let container = document.querySelector(%(container)s);
+        let el = document.querySelector(%(field)s);
+        if (!container || !el || !container.contains(el)) return null;
+        let parts = [];
+        for (; el !== container; el = el.parentElement) {
+            let tag = el.nodeName.toLowerCase();
+            let nth = 1;
+            for (let sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.nodeName.toLowerCase() === tag) nth++;
+            }
+            parts.unshift(nth !== 1 ? tag + ':nth-of-type(' + nth + ')' : tag);
+        }
+        return parts.join(' > ');
+    } catch (err) {
+        console.error('计算字段路径错误:', err);
+        return null;
+    }
+})();
+"""
+
+# 记录模式匹配：一次遍历所有容器，按相对路径提取各字段，text为各字段拼接的文本（用于显示和去重），
+# href取字段中的第一个链接，否则取容器内的第一个链接。同步返回，格式与其他匹配方式的同步模式相同
+RECORD_MATCH_JS_TEMPLATE = """
+(function() {
+    %(path_runtime)s
+    %(text_runtime)s
+
+    let CONTAINER = %(container)s;
+    let FIELDS = %(fields)s;
+    let TEXT_MODE = %(text_mode)s;
+    let WITH_TIMINGS = %(with_timings)s;
+    let timings = {scan: 0, text: 0};
+    let start = performance.now();
+
+    let containers;
+    try {
+        containers = document.querySelectorAll(CONTAINER);
+    } catch (err) {
+        console.error('记录容器选择器无效:', err);
+        containers = [];
+    }
+    timings.scan = performance.now() - start;
+
+    let results = [];
+    for (let i = 0; i < containers.length; i++) {
+        let container = containers[i];
+        let fields = {};
+        let parts = [];
+        let href = '';
+        let t = performance.now();
+        for (let field of FIELDS) {
+            let el = container;
+            if (field.path) {
+                try {
+                    el = container.querySelector(':scope > ' + field.path);
+                } catch (err) {
+                    el = null;
+                }
+            }
+            let value = el ? getElementText(el, TEXT_MODE) : '';
+            fields[field.name] = value;
+            if (value) parts.push(value);
+            if (!href && el) {
+                let link = el.closest('a[href]');
+                if (link && container.contains(link)) href = link.href;
+            }
+        }
+        timings.text += performance.now() - t;
+        if (!parts.length) continue;  // 跳过所有字段都为空的容器
+        if (!href) {
+            let link = container.matches('a[href]') ? container : container.querySelector('a[href]');
+            if (link) href = link.href;
+        }
+        results.push({
+            selector: getFullPath(container),
+            text: parts.join(' | '),
+            href: href,
+            fields: fields,
+            selectorSimilarity: 1,
+            classSimilarity: 0,
+            totalSimilarity: 1
+        });
+    }
+    timings.total = performance.now() - start;
+    return WITH_TIMINGS ? {results: results, timings: timings} : results;
+})();
+"""
+
+# 调低阈值时按选择器提取缓存中没有文本的候选的文本，DOM已变化时选择器可能指向其他元素，返回null
+ELEMENT_TEXTS_JS_TEMPLATE = """
+(function() {
+    %(text_runtime)s
+    %(dom_version_runtime)s
+
+    if (getDomVersion() !== %(dom_version)s) return null;
+    let TEXT_MODE = %(text_mode)s;
+    return %(selectors)s.map(function(selector) {
+        try {
+            let element = document.querySelector(selector);
+            return element ? getElementText(element, TEXT_MODE) : '';
+        } catch (err) {
+            return '';
+        }
+    });
+})();
+"""
+
+# 取消流式匹配任务
+CANCEL_MATCH_JS_TEMPLATE = """
+(function() {
+    let job = window.__matchJobs && window.__matchJobs[%(job_id)d];
+    if (job) job.cancelled = true;
+})();
+"""
+
+
+def build_match_js(selectors_info, threshold, text_mode=DEFAULT_TEXT_MODE, job_id=None,
+                   with_timings=False, cached_version=None, floor=None):
+    """根据选择器信息、相似度阈值和文本提取策略生成匹配脚本，
+    指定job_id时以流式方式分批回传结果（页面内耗时随finishMatch回传）；
+    同步执行且with_timings为True时返回 {results, timings, domVersion}。
+    cached_version与页面当前的DOM版本相同时不扫描页面，返回 {cached: true}。
+    floor低于阈值时，总相似度在 [floor, threshold) 的元素也回传，但不提取文本（没有text）"""
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"未知的文本提取策略: {text_mode}")
+    return MATCH_JS_TEMPLATE % {
+        'path_runtime': PATH_RUNTIME_JS,
+        'text_runtime': TEXT_RUNTIME_JS,
+        'similarity_runtime': SIMILARITY_RUNTIME_JS,
+        'dom_version_runtime': DOM_VERSION_RUNTIME_JS,
+        'cached_version': json.dumps(cached_version),
+        'text_mode': json.dumps(text_mode),
+        'selectors_info': json.dumps(selectors_info),
+        'threshold': threshold,
+        'floor': threshold if floor is None else min(floor, threshold),
+        'job_id': json.dumps(job_id),
+        'with_timings': json.dumps(with_timings),
+        'batch_size': MATCH_BATCH_SIZE,
+        'chunk_ms': MATCH_CHUNK_MS,
+    }
+
+
+def build_css_match_js(css_selectors, text_mode=DEFAULT_TEXT_MODE, with_timings=False):
+    """生成用querySelectorAll匹配CSS选择器的脚本，with_timings为True时返回 {results, timings}"""
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"未知的文本提取策略: {text_mode}")
+    return CSS_MATCH_JS_TEMPLATE % {
+        'path_runtime': PATH_RUNTIME_JS,
+        'text_runtime': TEXT_RUNTIME_JS,
+        'css_selectors': json.dumps(css_selectors),
+        'text_mode': json.dumps(text_mode),
+        'with_timings': json.dumps(with_timings),
+    }
+
+
+def build_record_container_js(container):
+    """生成识别同类记录容器的脚本，返回 {selector, count}"""
+    return RECORD_CONTAINER_JS_TEMPLATE % {
+        'path_runtime': PATH_RUNTIME_JS,
+        'container': json.dumps(container),
+    }
+
+
+def build_relative_path_js(container, field):
+    """生成计算字段相对容器路径的脚本"""
+    return RELATIVE_PATH_JS_TEMPLATE % {
+        'container': json.dumps(container),
+        'field': json.dumps(field),
+    }
+
+
+def build_record_match_js(container_selector, fields, text_mode=DEFAULT_TEXT_MODE, with_timings=False):
+    """生成记录模式的匹配脚本，fields为 [{name, path}]，path为相对容器的路径"""
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"未知的文本提取策略: {text_mode}")
+    return RECORD_MATCH_JS_TEMPLATE % {
+        'path_runtime': PATH_RUNTIME_JS,
+        'text_runtime': TEXT_RUNTIME_JS,
+        'container': json.dumps(container_selector),
+        'fields': json.dumps(fields, ensure_ascii=False),
+        'text_mode': json.dumps(text_mode),
+        'with_timings': json.dumps(with_timings),
+    }
+
+
+def build_element_texts_js(selectors, text_mode, dom_version):
+    """生成按选择器提取文本的脚本，返回与selectors对应的文本列表（元素不存在时为空字符串）；
+    页面的DOM版本已不是dom_version时返回null"""
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"未知的文本提取策略: {text_mode}")
+    return ELEMENT_TEXTS_JS_TEMPLATE % {
+        'text_runtime': TEXT_RUNTIME_JS,
+        'dom_version_runtime': DOM_VERSION_RUNTIME_JS,
+        'dom_version': json.dumps(dom_version),
+        'selectors': json.dumps(selectors),
+        'text_mode': json.dumps(text_mode),
+    }
+
+
+def build_cancel_match_js(job_id):
+    """生成取消流式匹配任务的脚本"""
+    return CANCEL_MATCH_JS_TEMPLATE % {'job_id': job_id}
+
+
+# 查找“下一页”控件：优先使用用户指定的CSS选择器，否则依次尝试 rel="next" 和常见的按钮文本。
+# 返回 {href, selector, text}，href为空表示只能通过点击翻页
+FIND_NEXT_JS_TEMPLATE = """
+(function() {
+    %(path_runtime)s
+
+    let NEXT_SELECTOR = %(next_selector)s;
+    let NEXT_TEXT = /^(下一页|下一頁|下页|后页|next|next page|next ›|next »|›|»|>|>>|→)$/i;
+    let NEXT_LABEL = /下一页|下一頁|next page/i;
+
+    function isDisabled(el) {
+        let className = typeof el.className === 'string' ? el.className : '';
+        return el.disabled || el.getAttribute('aria-disabled') === 'true' || /(^|\\s)disabled(\\s|$)/i.test(className);
+    }
+
+    function describe(el) {
+        if (!el || isDisabled(el)) return null;
+        let href = typeof el.href === 'string' ? el.href : '';
+        // 指向当前页面或javascript:的链接只能点击
+        if (/^javascript:/i.test(href) || href.split('#')[0] === location.href.split('#')[0]) {
+            href = '';
+        }
+        return {
+            href: href,
+            selector: el.tagName === 'LINK' ? '' : getFullPath(el),
+            text: (el.textContent || el.value || '').trim().slice(0, 50)
+        };
+    }
+
+    try {
+        if (NEXT_SELECTOR) {
+            return describe(document.querySelector(NEXT_SELECTOR));
+        }
+
+        let rel = document.querySelector('a[rel~="next"], link[rel~="next"]');
+        if (rel) return describe(rel);
+
+        let candidates = document.querySelectorAll(
+            'a, button, [role="button"], input[type="button"], input[type="submit"]');
+        for (let el of candidates) {
+            let label = (el.textContent || el.value || '').trim();
+            let hint = (el.getAttribute('aria-label') || '') + ' ' + (el.getAttribute('title') || '');
+            if (NEXT_TEXT.test(label) || NEXT_LABEL.test(hint)) {
+                let info = describe(el);
+                if (info) return info;
+            }
+        }
+    } catch (err) {
+        console.error('查找下一页错误:', err);
+    }
+    return null;
+})();
+"""
+
+# 点击指定元素（用于没有链接地址的“下一页”按钮）
+CLICK_JS_TEMPLATE = """
+(function() {
+    let el = document.querySelector(%(selector)s);
+    if (!el) return false;
+    el.click();
+    return true;
+})();
+"""
+
+# 按需获取元素的outerHTML（点击选择时不再随结果传回）
+OUTER_HTML_JS_TEMPLATE = """
+(function() {
+    try {
+        let el = document.querySelector(%(selector)s);
+        return el ? el.outerHTML : null;
+    } catch (err) {
+        return null;
+    }
+})();
+"""
+
+
+def build_find_next_js(next_selector=''):
+    """生成查找“下一页”控件的脚本，next_selector为空时自动检测"""
+    return FIND_NEXT_JS_TEMPLATE % {
+        'path_runtime': PATH_RUNTIME_JS,
+        'next_selector': json.dumps(next_selector or ''),
+    }
+
+
+def build_click_js(selector):
+    """生成点击指定元素的脚本"""
+    return CLICK_JS_TEMPLATE % {'selector': json.dumps(selector)}
+
+
+def build_outer_html_js(selector):
+    """生成获取指定元素outerHTML的脚本，元素不存在时返回null"""
+    return OUTER_HTML_JS_TEMPLATE % {'selector': json.dumps(selector)}
+
+
+# 选择器样式：文档创建时<html>可能尚未生成，此时等待DOMContentLoaded
+SELECTOR_STYLE_JS = """
+(function() {
+    function addStyle() {
+        if (document.getElementById('element-selector-style')) return;
+        const style = document.createElement('style');
+        style.id = 'element-selector-style';
+        style.textContent = `
+            #element-selector-overlay {
+                position: fixed !important;
+                left: 0 !important;
+                top: 0 !important;
+                margin: 0 !important;
+                padding: 0 !important;
+                pointer-events: none !important;
+                z-index: 2147483647 !important;
+                box-sizing: border-box !important;
+                outline: 2px solid rgba(255, 165, 0, 0.5) !important;
+                outline-offset: -2px !important;
+                background-color: rgba(255, 255, 0, 0.1) !important;
+                transition: none !important;
+            }
+        `;
+        (document.head || document.documentElement).appendChild(style);
+    }
+
+    if (document.documentElement) {
+        addStyle();
+    } else {
+        document.addEventListener('DOMContentLoaded', addStyle);
+    }
+})();
+"""
+
+# 建立WebChannel连接，就绪后通知Python（参数为自导航开始的毫秒数）
+CHANNEL_BOOTSTRAP_JS = """
+(function() {
+    function connect() {
+        if (typeof QWebChannel === 'undefined' || !window.qt || !window.qt.webChannelTransport) {
+            return false;
+        }
+        new QWebChannel(qt.webChannelTransport, function(channel) {
+            window.qt = channel.objects;
+            console.log('QWebChannel initialized');
+            if (channel.objects.elementSelector) {
+                channel.objects.elementSelector.notifyPageReady(performance.now());
+            }
+        });
+        return true;
+    }
+
+    // 传输对象尚未就绪时在DOMContentLoaded再尝试一次
+    if (!connect()) {
+        document.addEventListener('DOMContentLoaded', function() {
+            if (!connect()) console.error('QWebChannel不可用');
+        });
+    }
+})();
+"""
+
+BOOTSTRAP_SCRIPT_PREFIX = 'element-selector-'
+
+
+def read_qwebchannel_js():
+    """从Qt资源中读取qwebchannel.js"""
+    f = QFile(':/qtwebchannel/qwebchannel.js')
+    if not f.open(QIODevice.ReadOnly):
+        raise RuntimeError("无法读取 qwebchannel.js")
+    try:
+        return bytes(f.readAll()).decode('utf-8')
+    finally:
+        f.close()
+
+
+def create_script(name, source, injection_point=QWebEngineScript.DocumentCreation):
+    """创建注入主世界、仅作用于主框架的页面脚本"""
+    script = QWebEngineScript()
+    script.setName(BOOTSTRAP_SCRIPT_PREFIX + name)
+    script.setSourceCode(source)
+    script.setInjectionPoint(injection_point)
+    script.setWorldId(QWebEngineScript.MainWorld)
+    script.setRunsOnSubFrames(False)
+    return script
+
+
+def install_bootstrap_scripts(page):
+    """在文档创建时注入WebChannel、页面运行时和选择器样式，
+    页面的DOM一就绪即可进行选择和匹配，不再依赖加载完成后的定时器"""
+    scripts = page.scripts()
+    for script in scripts.toList():
+        if script.name().startswith(BOOTSTRAP_SCRIPT_PREFIX):
+            scripts.remove(script)
+
+    runtime = (PATH_RUNTIME_JS + TEXT_RUNTIME_JS + SIMILARITY_RUNTIME_JS +
+               DOM_VERSION_RUNTIME_JS + HIGHLIGHT_RUNTIME_JS)
+    for name, source in (
+        ('qwebchannel', read_qwebchannel_js()),
+        ('runtime', runtime),
+        ('style', SELECTOR_STYLE_JS),
+        ('channel', CHANNEL_BOOTSTRAP_JS),
+    ):
+        scripts.insert(create_script(name, source))
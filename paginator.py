@@ -0,0 +1,209 @@
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+from page_scripts import build_find_next_js, build_click_js
+from selector_compiler import build_recipe_match_js
+
+DEFAULT_MAX_PAGES = 10
+CLICK_SETTLE_MS = 1500  # 点击翻页后未发生跳转时，等待页面内容更新的时间
+
+
+class AutoPaginator(QObject):
+    """流水线式自动翻页：两个离屏页面交替使用，
+    第k页匹配和导出的同时在另一个页面中预加载第k+1页"""
+
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(int, str)  # (已抓取页数, 结束原因)
+
+    def __init__(self, profile, recipe, result_handler, max_pages=DEFAULT_MAX_PAGES,
+                 next_selector='', timeout=30.0, parent=None):
+        """result_handler(url, results) 处理每页的匹配结果并返回新增的条数"""
+        super().__init__(parent)
+
+        self.match_js = build_recipe_match_js(recipe)
+        self.find_next_js = build_find_next_js(next_selector)
+        self.result_handler = result_handler
+        self.max_pages = max_pages
+
+        self.pages = [QWebEnginePage(profile, self), QWebEnginePage(profile, self)]
+        self.urls = ['', '']
+        self.loaded = [None, None]  # None: 加载中，True/False: 加载结果
+        self.timers = []
+        for i, page in enumerate(self.pages):
+            page.loadStarted.connect(lambda i=i: self.on_load_started(i))
+            page.loadFinished.connect(lambda ok, i=i: self.on_load_finished(i, ok))
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(int(timeout * 1000))
+            timer.timeout.connect(lambda i=i: self.on_timeout(i))
+            self.timers.append(timer)
+
+        self.running = False
+        self.current = 0
+        self.page_count = 0
+        self.visited = set()
+        self.skip_first = False
+        self.reset_page_state()
+
+    def reset_page_state(self):
+        self.processing = False
+        self.match_done = False
+        self.next_done = False
+        self.next_url = ''
+        self.click_selector = ''
+        self.stop_reason = ''
+        self.clicking = False
+        self.click_navigated = False
+
+    def is_running(self):
+        return self.running
+
+    def start(self, url, skip_first=False):
+        """从url开始翻页；skip_first为True时第一页只用于查找下一页，不匹配"""
+        self.running = True
+        self.skip_first = skip_first
+        self.progress.emit("自动翻页: 正在加载第一页...")
+        self.load(self.current, url)
+
+    def cancel(self):
+        if self.running:
+            self.finish("已取消")
+
+    def close(self):
+        """停止翻页并释放两个离屏页面（各占用渲染进程），之后不能再使用"""
+        self.cancel()
+        for page in self.pages:
+            page.deleteLater()
+        self.pages = []
+        self.deleteLater()
+
+    def load(self, i, url):
+        self.urls[i] = url
+        self.loaded[i] = None
+        self.visited.add(url)
+        self.timers[i].start()
+        self.pages[i].setUrl(QUrl(url))
+
+    def on_load_started(self, i):
+        if self.running and i == self.current and self.clicking:
+            self.click_navigated = True
+
+    def on_load_finished(self, i, ok):
+        if not self.running or self.loaded[i] is not None:
+            return
+        self.timers[i].stop()
+        self.loaded[i] = ok
+
+        if i == self.current:
+            if self.clicking:
+                self.clicking = False
+                self.urls[i] = self.pages[i].url().toString()
+            if not self.processing:
+                self.process_current()
+        else:
+            self.maybe_advance()
+
+    def on_timeout(self, i):
+        if self.running and self.loaded[i] is None:
+            self.pages[i].triggerAction(self.pages[i].Stop)
+            self.on_load_finished(i, False)
+
+    def process_current(self):
+        """处理当前页：先查找下一页以便尽早预加载，再执行匹配"""
+        i = self.current
+        if not self.loaded[i]:
+            self.finish(f"页面加载失败: {self.urls[i]}")
+            return
+
+        self.reset_page_state()
+        self.processing = True
+        page = self.pages[i]
+        page.runJavaScript(self.find_next_js, self.on_next_found)
+
+        if self.skip_first:
+            self.skip_first = False
+            self.match_done = True
+        else:
+            url = self.urls[i]
+            page.runJavaScript(self.match_js, lambda results: self.on_matched(url, results))
+
+    def on_next_found(self, info):
+        if not self.running:
+            return
+        self.next_done = True
+        if info and info.get('href'):
+            href = info['href']
+            if href in self.visited:
+                self.stop_reason = "下一页已抓取过"
+            elif self.page_count + (0 if self.match_done else 1) < self.max_pages:
+                # 预加载下一页，与当前页的匹配并行
+                self.next_url = href
+                self.load(1 - self.current, href)
+        elif info and info.get('selector'):
+            self.click_selector = info['selector']
+        self.maybe_advance()
+
+    def on_matched(self, url, results):
+        if not self.running:
+            return
+        self.page_count += 1
+        new_count = self.result_handler(url, results or [])
+        self.progress.emit(f"自动翻页: 第 {self.page_count}/{self.max_pages} 页，新增 {new_count} 条")
+        if new_count == 0:
+            self.stop_reason = "没有新的匹配结果"
+        self.match_done = True
+        self.maybe_advance()
+
+    def maybe_advance(self):
+        if not self.running or not (self.match_done and self.next_done):
+            return
+
+        if self.stop_reason:
+            self.finish(self.stop_reason)
+        elif self.page_count >= self.max_pages:
+            self.finish("已达到最大页数")
+        elif self.next_url:
+            other = 1 - self.current
+            if self.loaded[other] is None:
+                return  # 等待预加载完成
+            self.current = other
+            self.processing = False
+            self.process_current()
+        elif self.click_selector:
+            # 没有链接地址时只能在当前页点击，无法预加载
+            selector = self.click_selector
+            self.click_selector = ''
+            self.processing = False
+            self.clicking = True
+            self.click_navigated = False
+            self.loaded[self.current] = None
+            self.timers[self.current].start()
+            self.pages[self.current].runJavaScript(build_click_js(selector), self.on_clicked)
+        else:
+            self.finish("没有找到下一页")
+
+    def on_clicked(self, clicked):
+        if not self.running:
+            return
+        if not clicked:
+            self.clicking = False
+            self.timers[self.current].stop()
+            self.finish("没有找到下一页")
+            return
+        QTimer.singleShot(CLICK_SETTLE_MS, self.on_click_settled)
+
+    def on_click_settled(self):
+        # 点击后没有发生页面跳转，视为页面内容已在原地更新
+        if self.running and self.clicking and not self.click_navigated:
+            self.clicking = False
+            self.timers[self.current].stop()
+            self.loaded[self.current] = True
+            self.process_current()
+
+    def finish(self, reason):
+        self.running = False
+        for i, page in enumerate(self.pages):
+            self.timers[i].stop()
+            if self.loaded[i] is None and self.urls[i]:
+                page.triggerAction(page.Stop)
+        self.finished.emit(self.page_count, reason)
@@ -0,0 +1,58 @@
+from page_scripts import build_record_match_js
+
+# 与结果的固定列同名的字段会在导出时冲突
+RESERVED_FIELD_NAMES = ('text', 'selector', 'href', 'className',
+                        'selectorSimilarity', 'classSimilarity', 'totalSimilarity')
+
+
+class RecordSchema:
+    """记录模式的定义：一个样例容器（如列表中的一项）和容器内的若干字段。
+    匹配时一次遍历所有同类容器，按字段相对容器的路径提取，每个容器得到一行多列的记录"""
+
+    def __init__(self, container_path='', container_selector='', fields=None):
+        self.container_path = container_path  # 样例容器的完整路径
+        self.container_selector = container_selector  # 匹配所有同类容器的选择器
+        self.fields = list(fields or [])  # [{'name': 字段名, 'path': 相对容器的路径}]
+
+    def has_container(self):
+        return bool(self.container_selector)
+
+    def is_ready(self):
+        return self.has_container() and bool(self.fields)
+
+    def field_names(self):
+        return [field['name'] for field in self.fields]
+
+    def validate_name(self, name):
+        """检查字段名，有问题时返回错误信息"""
+        if not name:
+            return "字段名不能为空"
+        if name in RESERVED_FIELD_NAMES:
+            return f"字段名不能使用保留名称: {name}"
+        if name in self.field_names():
+            return f"字段名已存在: {name}"
+        return None
+
+    def add_field(self, name, path):
+        self.fields.append({'name': name, 'path': path})
+
+    def to_dict(self):
+        return {
+            'container_path': self.container_path,
+            'container_selector': self.container_selector,
+            'fields': self.fields,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从配方中读取，格式错误时抛出ValueError"""
+        fields = data.get('fields') or []
+        if not data.get('container_selector') or not fields:
+            raise ValueError("记录定义缺少容器或字段")
+        for field in fields:
+            if not field.get('name') or 'path' not in field:
+                raise ValueError(f"记录字段格式错误: {field}")
+        return cls(data.get('container_path', ''), data['container_selector'], fields)
+
+    def build_match_js(self, text_mode, with_timings=False):
+        return build_record_match_js(self.container_selector, self.fields, text_mode, with_timings)
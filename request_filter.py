@@ -0,0 +1,163 @@
+import json
+from fnmatch import fnmatch
+
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+
+# 可拦截的资源类型（规则文件中使用的名称 -> Qt枚举名）
+RESOURCE_TYPE_NAMES = {
+    'image': 'ResourceTypeImage',
+    'font': 'ResourceTypeFontResource',
+    'media': 'ResourceTypeMedia',
+    'stylesheet': 'ResourceTypeStylesheet',
+    'script': 'ResourceTypeScript',
+    'subframe': 'ResourceTypeSubFrame',
+    'favicon': 'ResourceTypeFavicon',
+    'object': 'ResourceTypeObject',
+    'ping': 'ResourceTypePing',
+    'prefetch': 'ResourceTypePrefetch',
+    'xhr': 'ResourceTypeXhr',
+    'worker': 'ResourceTypeWorker',
+    'csp_report': 'ResourceTypeCspReport',
+    'plugin': 'ResourceTypePluginResource',
+}
+
+# 只提取文本和链接时不需要的资源；样式表会影响innerText，脚本影响动态页面，默认不拦截
+DEFAULT_BLOCKED_TYPES = ('image', 'font', 'media', 'favicon', 'object', 'ping', 'prefetch', 'plugin')
+
+# 常见广告和统计服务（fnmatch模式，不带通配符的域名同时匹配其子域名）
+DEFAULT_BLOCKED_HOSTS = (
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googletagservices.com',
+    'adservice.google.*',
+    'facebook.net',
+    'connect.facebook.com',
+    'scorecardresearch.com',
+    'hm.baidu.com',
+    'cpro.baidu.com',
+    'pos.baidu.com',
+    'cnzz.com',
+    'tanx.com',
+    'mmstat.com',
+)
+
+# 按资源类型估算的平均大小（字节），拦截发生在请求发出前，实际大小无从得知
+ESTIMATED_BYTES = {
+    'image': 30 * 1024,
+    'font': 40 * 1024,
+    'media': 500 * 1024,
+    'stylesheet': 20 * 1024,
+    'script': 40 * 1024,
+    'subframe': 50 * 1024,
+    'favicon': 2 * 1024,
+    'object': 100 * 1024,
+    'xhr': 5 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 5 * 1024
+
+
+def resource_type_value(name):
+    """规则名称对应的Qt资源类型枚举值，当前Qt版本不支持时返回None"""
+    enum_name = RESOURCE_TYPE_NAMES.get(name)
+    if enum_name is None:
+        raise ValueError(f"未知的资源类型: {name}")
+    return getattr(QWebEngineUrlRequestInfo, enum_name, None)
+
+
+def load_block_rules(file_name):
+    """读取拦截规则文件，返回 (资源类型列表, 域名模式列表)
+
+    文件格式: {"block_types": ["image", "font"], "block_hosts": ["*.example.com"]}
+    未给出的字段使用默认规则
+    """
+    with open(file_name, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    blocked_types = rules.get('block_types', list(DEFAULT_BLOCKED_TYPES))
+    blocked_hosts = rules.get('block_hosts', list(DEFAULT_BLOCKED_HOSTS))
+    for name in blocked_types:
+        resource_type_value(name)  # 校验名称
+    return blocked_types, blocked_hosts
+
+
+def format_bytes(size):
+    """格式化字节数"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class ScrapeRequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """抓取模式的请求拦截器：按资源类型和域名模式拦截不需要的请求，并统计拦截数量和估算节省的流量"""
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_hosts=DEFAULT_BLOCKED_HOSTS,
+                 enabled=True, parent=None):
+        super().__init__(parent)
+        self.enabled = enabled
+        self.set_rules(blocked_types, blocked_hosts)
+        self.reset_counters()
+
+    def set_rules(self, blocked_types, blocked_hosts):
+        # 资源类型枚举值 -> 规则名称
+        self.blocked_types = {}
+        for name in blocked_types:
+            value = resource_type_value(name)
+            if value is not None:
+                self.blocked_types[int(value)] = name
+        self.blocked_hosts = [pattern.lower() for pattern in blocked_hosts]
+        self.host_cache = {}  # 域名 -> 是否拦截
+
+    def reset_counters(self):
+        self.total_requests = 0
+        self.blocked_requests = 0
+        self.bytes_saved = 0
+        self.blocked_by_type = {}
+
+    def is_blocked_host(self, host):
+        blocked = self.host_cache.get(host)
+        if blocked is None:
+            blocked = any(
+                fnmatch(host, pattern) or (
+                    '*' not in pattern and host.endswith('.' + pattern)
+                )
+                for pattern in self.blocked_hosts
+            )
+            self.host_cache[host] = blocked
+        return blocked
+
+    def interceptRequest(self, info):
+        self.total_requests += 1
+        if not self.enabled:
+            return
+
+        resource_type = int(info.resourceType())
+        if resource_type == int(QWebEngineUrlRequestInfo.ResourceTypeMainFrame):
+            return  # 不拦截页面本身
+
+        name = self.blocked_types.get(resource_type)
+        if name is None:
+            if not self.is_blocked_host(info.requestUrl().host().lower()):
+                return
+            name = 'host'
+
+        info.block(True)
+        self.blocked_requests += 1
+        self.bytes_saved += ESTIMATED_BYTES.get(name, DEFAULT_ESTIMATED_BYTES)
+        self.blocked_by_type[name] = self.blocked_by_type.get(name, 0) + 1
+
+    def summary(self):
+        """拦截统计摘要"""
+        return (f"已拦截 {self.blocked_requests}/{self.total_requests} 个请求，"
+                f"约节省 {format_bytes(self.bytes_saved)}")
+
+
+def install_interceptor(profile, blocked_types=DEFAULT_BLOCKED_TYPES,
+                        blocked_hosts=DEFAULT_BLOCKED_HOSTS, enabled=True):
+    """在profile上安装抓取模式的请求拦截器并返回"""
+    interceptor = ScrapeRequestInterceptor(blocked_types, blocked_hosts, enabled, profile)
+    profile.setUrlRequestInterceptor(interceptor)
+    return interceptor
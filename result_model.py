@@ -0,0 +1,497 @@
+import math
+from array import array
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from dedup import DedupIndex, NearDupIndex, simhash
+
+MAX_DISPLAY_LENGTH = 50
+SCORE_FIELDS = ('selectorSimilarity', 'classSimilarity', 'totalSimilarity')
+
+
+def truncate_text(text, max_length=MAX_DISPLAY_LENGTH):
+    """截断文本，保留指定长度"""
+    if len(text) <= max_length:
+        return text
+    return text[:max_length] + "..."
+
+
+def format_tooltip(text, selector_similarity, class_similarity, total_similarity):
+    """行的工具提示：完整文本和相似度（点击选择的元素没有相似度，只显示文本）"""
+    if total_similarity is None or math.isnan(total_similarity):
+        return text
+    return (
+        f"文本: {text}\n"
+        f"选择器相似度: {selector_similarity:.2%}\n"
+        f"类名相似度: {class_similarity:.2%}\n"
+        f"最大相似度: {total_similarity:.2%}"
+    )
+
+
+class ColumnRows:
+    """按列保存的行序列，切片时才组装为元组，供导出按批读取"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, rows):
+        if isinstance(rows, slice):
+            return list(zip(*(column[rows] for column in self.columns)))
+        return tuple(column[rows] for column in self.columns)
+
+
+class StringTable:
+    """字符串驻留表：大量行共用少数几种选择器和类名，每行只保存编号"""
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def intern(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[string] = string_id
+            self.strings.append(string)
+        return string_id
+
+    def clear(self):
+        self.strings.clear()
+        self.ids.clear()
+
+
+class ResultRecord:
+    """一行结果的只读视图；点击选择的元素没有相似度，相应字段为None，
+    fields为记录模式各字段的值（存储中没有字段列时为None）"""
+
+    __slots__ = ('text', 'selector', 'href', 'class_name',
+                 'selector_similarity', 'class_similarity', 'total_similarity', 'fields')
+
+    def __init__(self, text, selector, href='', class_name='',
+                 selector_similarity=None, class_similarity=None, total_similarity=None,
+                 fields=None):
+        self.text = text
+        self.selector = selector
+        self.href = href
+        self.class_name = class_name
+        self.selector_similarity = selector_similarity
+        self.class_similarity = class_similarity
+        self.total_similarity = total_similarity
+        self.fields = fields  # 记录模式各字段的值
+
+    def to_dict(self):
+        """转换为页面脚本使用的字段名（与匹配结果的JSON格式一致）"""
+        item = {
+            'text': self.text,
+            'selector': self.selector,
+            'href': self.href,
+            'className': self.class_name,
+        }
+        for field, value in zip(SCORE_FIELDS, (self.selector_similarity, self.class_similarity,
+                                               self.total_similarity)):
+            if value is not None:
+                item[field] = value
+        if self.fields:
+            item['fields'] = dict(self.fields)
+        return item
+
+
+class ResultStore:
+    """已选元素和匹配结果的列式存储，按行读取时返回ResultRecord。
+    选择器和类名驻留在字符串表中，各行只保存编号；去重索引与各列同步维护，点击选择和匹配结果共用。
+    追加时接受页面脚本返回的字典（text/selector/href/className及相似度字段）"""
+
+    def __init__(self, include_selector_in_dedup=False):
+        self.index = DedupIndex(include_selector_in_dedup)
+        self.keys = []  # 每行的去重摘要，删除时无需重新计算
+        self.texts = []
+        self.hrefs = []
+        self.strings = StringTable()
+        self.selector_ids = array('I')
+        self.class_ids = array('I')
+        # 相似度使用紧凑的浮点数组，点击选择的元素没有相似度，记为NaN
+        self.scores = {field: array('d') for field in SCORE_FIELDS}
+        # 记录模式的字段列（字段名 -> 各行的值），没有该字段的行为空字符串
+        self.field_names = []
+        self.field_values = {}
+        self.version = 0  # 每次修改后递增，批量操作据此判断撤销记录是否仍然有效
+        self.near_dup = None  # 近似去重索引（SimHash），启用时与各行同步
+        self.url = ''  # 当前页面的URL（内存存储不保存来源页面，SQLite存储写入url列）
+        self.exported = {}  # 文件路径 -> 本次会话中已导出的结果摘要，用于增量追加
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __bool__(self):
+        return bool(self.texts)
+
+    def __getitem__(self, row):
+        scores = [self.scores[field][row] for field in SCORE_FIELDS]
+        return ResultRecord(self.texts[row], self.strings[self.selector_ids[row]], self.hrefs[row],
+                            self.strings[self.class_ids[row]],
+                            *(None if math.isnan(value) else value for value in scores),
+                            fields=self.fields(row) if self.field_names else None)
+
+    def __iter__(self):
+        for row in range(len(self.texts)):
+            yield self[row]
+
+    def selector(self, row):
+        return self.strings[self.selector_ids[row]]
+
+    def new_field_names(self, items):
+        """items中出现、存储中还没有的字段名（按出现顺序）"""
+        names = {}
+        for item in items:
+            for name in item.get('fields') or ():
+                if name not in self.field_values:
+                    names[name] = None
+        return list(names)
+
+    def add_field_columns(self, names):
+        for name in names:
+            if name not in self.field_values:
+                self.field_names.append(name)
+                self.field_values[name] = [''] * len(self.texts)
+
+    def fields(self, row):
+        """某行记录模式各字段的值"""
+        return {name: self.field_values[name][row] for name in self.field_names}
+
+    def is_duplicate(self, item):
+        return self.index.contains(item['text'], item['selector'])
+
+    def set_near_dup_cutoff(self, cutoff):
+        """设置近似去重的相似度下限，None表示关闭；启用时按已有各行的文本建立索引"""
+        if cutoff is None:
+            self.near_dup = None
+            return
+        self.near_dup = NearDupIndex(cutoff)
+        self.near_dup.rebuild(simhash(text) for text in self.texts)
+
+    def append(self, item, key=None, fingerprint=None):
+        """追加一行，key为已计算好的去重摘要，fingerprint为已计算好的SimHash指纹"""
+        if key is None:
+            key = self.index.key(item['text'], item['selector'])
+        if self.near_dup is not None:
+            self.near_dup.append(simhash(item['text']) if fingerprint is None else fingerprint)
+        if item.get('fields'):
+            # 新字段的列先按已有行数补齐空值
+            self.add_field_columns(item['fields'])
+        self.index.add_key(key)
+        self.keys.append(key)
+        self.texts.append(item['text'])
+        self.hrefs.append(item.get('href', '') or '')
+        self.selector_ids.append(self.strings.intern(item['selector']))
+        class_name = item.get('className', '')
+        self.class_ids.append(self.strings.intern(class_name if isinstance(class_name, str) else ''))
+        for field in SCORE_FIELDS:
+            self.scores[field].append(item.get(field, math.nan))
+        fields = item.get('fields') or {}
+        for name in self.field_names:
+            self.field_values[name].append(fields.get(name) or '')
+        self.version += 1
+
+    def extend(self, items, keys=None, fingerprints=None):
+        if keys is None:
+            keys = [None] * len(items)
+        if fingerprints is None:
+            fingerprints = [None] * len(items)
+        for item, key, fingerprint in zip(items, keys, fingerprints):
+            self.append(item, key, fingerprint)
+
+    def pop(self, row):
+        record = self[row]
+        self.remove_rows([row])
+        return record
+
+    def remove_rows(self, rows):
+        """批量删除多行，只重建一次各列（字符串表保留，清空时才释放）"""
+        rows = set(rows)
+        if not rows:
+            return
+        for row in rows:
+            self.index.discard_key(self.keys[row])
+        self.keep_columns([row for row in range(len(self.texts)) if row not in rows])
+
+    def take_rows(self, keep):
+        """只保留keep中的行（按给定顺序），去重索引只减去删除的行的摘要"""
+        kept = set(keep)
+        for row, key in enumerate(self.keys):
+            if row not in kept:
+                self.index.discard_key(key)
+        self.keep_columns(keep)
+
+    def keep_columns(self, keep):
+        """按keep重建各列一次（不修改去重索引）"""
+        self.keys = [self.keys[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.hrefs = [self.hrefs[row] for row in keep]
+        self.selector_ids = array('I', (self.selector_ids[row] for row in keep))
+        self.class_ids = array('I', (self.class_ids[row] for row in keep))
+        for field in SCORE_FIELDS:
+            column = self.scores[field]
+            self.scores[field] = array('d', (column[row] for row in keep))
+        for name in self.field_names:
+            column = self.field_values[name]
+            self.field_values[name] = [column[row] for row in keep]
+        if self.near_dup is not None:
+            fingerprints = self.near_dup.fingerprints
+            self.near_dup.rebuild(fingerprints[row] for row in keep)
+        self.version += 1
+
+    def set_column(self, field, values):
+        """整列替换text、href或记录模式字段的值；修改文本时重新计算各行的去重摘要"""
+        values = list(values)
+        if len(values) != len(self.texts):
+            raise ValueError(f"列长度不一致: {len(values)} != {len(self.texts)}")
+        if field == 'text':
+            self.texts = values
+            self.keys = [self.index.key(text, self.strings[selector_id])
+                         for text, selector_id in zip(values, self.selector_ids)]
+            self.index.rebuild_keys(self.keys)
+            if self.near_dup is not None:
+                self.near_dup.rebuild(simhash(text) for text in values)
+        elif field == 'href':
+            self.hrefs = values
+        elif field in self.field_values:
+            self.field_values[field] = values
+        else:
+            raise ValueError(f"不能修改的列: {field}")
+        self.version += 1
+
+    def save_state(self, operation=None, *args):
+        """各列的副本，供撤销批量操作时恢复（operation为将要执行的修改，数据库存储据此只保存变化的部分）"""
+        return {
+            'keys': self.keys[:],
+            'texts': self.texts[:],
+            'hrefs': self.hrefs[:],
+            'strings': (self.strings.strings[:], dict(self.strings.ids)),
+            'selector_ids': array('I', self.selector_ids),
+            'class_ids': array('I', self.class_ids),
+            'scores': {field: array('d', column) for field, column in self.scores.items()},
+            'field_names': self.field_names[:],
+            'field_values': {name: column[:] for name, column in self.field_values.items()},
+            'fingerprints': array('Q', self.near_dup.fingerprints) if self.near_dup is not None else None,
+        }
+
+    def restore_state(self, state):
+        self.keys = state['keys']
+        self.texts = state['texts']
+        self.hrefs = state['hrefs']
+        self.strings.strings, self.strings.ids = state['strings']
+        self.selector_ids = state['selector_ids']
+        self.class_ids = state['class_ids']
+        self.scores = state['scores']
+        self.field_names = state['field_names']
+        self.field_values = state['field_values']
+        self.index.rebuild_keys(self.keys)
+        if self.near_dup is not None:
+            fingerprints = state['fingerprints']
+            self.near_dup.rebuild(fingerprints if fingerprints is not None
+                                  else (simhash(text) for text in self.texts))
+        self.version += 1
+
+    def clear(self):
+        self.index.clear()
+        self.keys.clear()
+        self.texts.clear()
+        self.hrefs.clear()
+        self.strings.clear()
+        self.selector_ids = array('I')
+        self.class_ids = array('I')
+        for field in SCORE_FIELDS:
+            self.scores[field] = array('d')
+        self.field_names = []
+        self.field_values = {}
+        if self.near_dup is not None:
+            self.near_dup.clear()
+        self.version += 1
+
+    def rows_with_keys(self, keys):
+        """去重摘要在keys中的所有行"""
+        return [row for row, key in enumerate(self.keys) if key in keys]
+
+    def selectors_info(self):
+        """去重后的 (选择器, 类名) 组合，作为匹配样例。
+        相似度取与所有样例的最大值，重复的组合不影响结果"""
+        pairs = dict.fromkeys(zip(self.selector_ids, self.class_ids))
+        return [{'selector': self.strings[selector_id], 'className': self.strings[class_id]}
+                for selector_id, class_id in pairs]
+
+    def column(self, field):
+        """按字段名取列（text/selector/href/className、相似度字段或记录模式的字段）；
+        选择器和类名按编号还原为新的列表"""
+        if field in self.scores:
+            return self.scores[field]
+        if field in self.field_values:
+            return self.field_values[field]
+        if field == 'selector':
+            return [self.strings[i] for i in self.selector_ids]
+        if field == 'className':
+            return [self.strings[i] for i in self.class_ids]
+        return {
+            'text': self.texts,
+            'href': self.hrefs,
+        }[field]
+
+    def snapshot(self, fields, rows=None):
+        """各列的浅拷贝，只复制引用，之后对存储的修改不影响快照；rows为要包含的行号（默认全部）"""
+        columns = []
+        for field in fields:
+            column = self.column(field)
+            if rows is not None:
+                columns.append([column[row] for row in rows])
+            else:
+                columns.append(column if field in ('selector', 'className') else column[:])
+        return ColumnRows(columns)
+
+    def unexported_rows(self, path):
+        """还没有导出到path的行号（按摘要判断），用于增量追加"""
+        exported = self.exported.get(path)
+        if not exported:
+            return list(range(len(self.keys)))
+        return [row for row, key in enumerate(self.keys) if key not in exported]
+
+    def export_marks(self, rows=None):
+        """导出开始时记下的行标识（摘要），导出成功后交给mark_exported"""
+        return self.keys[:] if rows is None else [self.keys[row] for row in rows]
+
+    def mark_exported(self, path, marks, append=False):
+        """记录已导出到path的行；覆盖保存时替换之前的记录"""
+        if append:
+            self.exported.setdefault(path, set()).update(marks)
+        else:
+            self.exported[path] = set(marks)
+
+    def tooltip(self, row):
+        """生成行的工具提示（完整文本和相似度）"""
+        return format_tooltip(self.texts[row], *(self.scores[field][row] for field in SCORE_FIELDS))
+
+    def text(self, row):
+        return self.texts[row]
+
+    def field_value(self, name, row):
+        return self.field_values[name][row]
+
+
+class ResultTableModel(QAbstractTableModel):
+    """基于ResultStore的结果表格模型，工具提示在data()中按需生成。
+    记录模式的字段在“内容”列之后各占一列"""
+
+    HEADERS = ['内容']
+
+    def __init__(self, store=None, parent=None):
+        super().__init__(parent)
+        self.store = store if store is not None else ResultStore()
+        self.near_duplicate_count = 0  # 累计跳过的近似重复行数
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS) + len(self.store.field_names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column() - len(self.HEADERS)
+        if column >= 0:
+            value = self.store.field_value(self.store.field_names[column], row)
+            if role == Qt.DisplayRole:
+                return truncate_text(value)
+            if role == Qt.ToolTipRole:
+                return value
+            return None
+        if role == Qt.DisplayRole:
+            return truncate_text(self.store.text(row))
+        if role == Qt.ToolTipRole:
+            return self.store.tooltip(row)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            if section < len(self.HEADERS):
+                return self.HEADERS[section]
+            return self.store.field_names[section - len(self.HEADERS)]
+        return super().headerData(section, orientation, role)
+
+    def append_rows(self, items, skip_duplicates=True, keys=None, skip_near_duplicates=True):
+        """批量追加多行，只通知视图一次，返回实际添加的行；keys为已计算好的去重摘要。
+        启用近似去重时，skip_near_duplicates还会跳过与已有结果（或同批之前的结果）近似重复的行"""
+        index = self.store.index
+        if keys is None:
+            keys = [index.key(item['text'], item['selector']) for item in items]
+        fingerprints = None
+        if skip_duplicates:
+            near_dup = self.store.near_dup if skip_near_duplicates else None
+            if near_dup is not None:
+                batch_near_dup = NearDupIndex(near_dup.cutoff)
+                fingerprints = []
+            batch_keys = set()
+            unique_items = []
+            unique_keys = []
+            for item, key in zip(items, keys):
+                if key in index or key in batch_keys:
+                    continue
+                if near_dup is not None:
+                    fingerprint = simhash(item['text'])
+                    if near_dup.find(fingerprint) is not None or batch_near_dup.find(fingerprint) is not None:
+                        self.near_duplicate_count += 1
+                        continue
+                    batch_near_dup.append(fingerprint)
+                    fingerprints.append(fingerprint)
+                batch_keys.add(key)
+                unique_items.append(item)
+                unique_keys.append(key)
+            items, keys = unique_items, unique_keys
+
+        if not items:
+            return []
+        new_names = self.store.new_field_names(items)
+        if new_names:
+            first = self.columnCount()
+            self.beginInsertColumns(QModelIndex(), first, first + len(new_names) - 1)
+            self.store.add_field_columns(new_names)
+            self.endInsertColumns()
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self.store.extend(items, keys, fingerprints)
+        self.endInsertRows()
+        return items
+
+    def remove_rows(self, rows):
+        """批量删除多行"""
+        rows = sorted(set(row for row in rows if 0 <= row < len(self.store)))
+        if not rows:
+            return
+        self.beginResetModel()
+        self.store.remove_rows(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def reset_with(self, func, *args):
+        """执行整表修改（列数可能变化），只通知视图一次，返回func的返回值"""
+        self.beginResetModel()
+        try:
+            return func(*args)
+        finally:
+            self.endResetModel()
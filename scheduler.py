@@ -0,0 +1,243 @@
+import logging
+import time
+from collections import Counter, deque
+from urllib.parse import urlsplit
+
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+from crawl_config import DEFAULT_DELAY, DEFAULT_PER_HOST, DEFAULT_RETRIES, default_concurrency
+from metrics import metrics
+from selector_compiler import build_recipe_match_js
+
+log = logging.getLogger(__name__)
+
+RETRY_BACKOFF = 2.0  # 第n次重试前等待 RETRY_BACKOFF * 2**(n-1) 秒
+
+
+class ScrapeTask:
+    """队列中的一个URL"""
+
+    __slots__ = ('url', 'host', 'attempts', 'not_before')
+
+    def __init__(self, url):
+        self.url = url
+        self.host = urlsplit(url).hostname or ''
+        self.attempts = 0
+        self.not_before = 0.0  # 重试退避：此时间（time.monotonic()）之前不加载
+
+
+class PageSlot:
+    """页面池中的一个离屏页面及其当前任务"""
+
+    def __init__(self, page, timer):
+        self.page = page
+        self.timer = timer
+        self.task = None
+        self.generation = 0  # 每次分配任务递增，忽略过期的加载和脚本回调
+        self.started = False  # 当前任务的加载是否已开始（停止上一次加载时的loadFinished不计入）
+        self.matching = False
+
+
+class ScrapeScheduler(QObject):
+    """多页面并发抓取：有限个离屏页面共用一个profile（拦截规则、HTTP缓存和Cookie），
+    从URL队列中按域名并发数和访问间隔取任务，加载完成后按配方匹配，失败或超时按退避重试"""
+
+    progress = pyqtSignal(str)
+    pageFailed = pyqtSignal(str, str)  # (URL, 失败原因)
+    finished = pyqtSignal(int, int)  # (成功页数, 失败页数)
+
+    def __init__(self, profile, recipe, result_handler, concurrency=None,
+                 per_host=DEFAULT_PER_HOST, delay=DEFAULT_DELAY, timeout=30.0,
+                 retries=DEFAULT_RETRIES, parent=None):
+        """result_handler(url, results) 处理每个页面的匹配结果并返回新增的条数"""
+        super().__init__(parent)
+        self.match_js = build_recipe_match_js(recipe, with_timings=True)
+        self.result_handler = result_handler
+        concurrency = concurrency or default_concurrency()
+        self.per_host = max(1, per_host or concurrency)
+        self.delay = max(0.0, delay)
+        self.retries = max(0, retries)
+
+        self.slots = []
+        for _ in range(concurrency):
+            page = QWebEnginePage(profile, self)
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(int(timeout * 1000))
+            slot = PageSlot(page, timer)
+            page.loadStarted.connect(lambda slot=slot: self.on_load_started(slot))
+            page.loadFinished.connect(lambda ok, slot=slot: self.on_load_finished(slot, ok))
+            timer.timeout.connect(lambda slot=slot: self.on_timeout(slot))
+            self.slots.append(slot)
+
+        # 没有可立即开始的任务时（访问间隔或重试退避），到最早可开始的时间再调度
+        self.wake_timer = QTimer(self)
+        self.wake_timer.setSingleShot(True)
+        self.wake_timer.timeout.connect(self.schedule)
+
+        self.queue = deque()
+        self.host_active = Counter()
+        self.host_last_start = {}
+        self.running = False
+        self.total = 0
+        self.ok_count = 0
+        self.failed_count = 0
+        self.result_count = 0
+
+    def is_running(self):
+        return self.running
+
+    def add_urls(self, urls):
+        for url in urls:
+            self.queue.append(ScrapeTask(url))
+        self.total += len(urls)
+        if self.running:
+            self.schedule()
+
+    def start(self):
+        self.running = True
+        QTimer.singleShot(0, self.schedule)
+
+    def cancel(self):
+        if self.running:
+            self.queue.clear()
+            for slot in self.slots:
+                if slot.task:
+                    slot.page.triggerAction(QWebEnginePage.Stop)
+                    self.release(slot)
+            self.finish()
+
+    def close(self):
+        """停止抓取并释放页面池（每个离屏页面都占用渲染进程），之后不能再使用"""
+        self.cancel()
+        for slot in self.slots:
+            slot.timer.stop()
+            slot.page.deleteLater()
+        self.slots = []
+        self.deleteLater()
+
+    def next_task(self, now):
+        """取出第一个可以立即开始的任务；没有时返回 (None, 最早可开始的时间)"""
+        earliest = None
+        for i, task in enumerate(self.queue):
+            ready_at = task.not_before
+            if task.host in self.host_last_start:
+                ready_at = max(ready_at, self.host_last_start[task.host] + self.delay)
+            if self.host_active[task.host] >= self.per_host:
+                continue  # 有页面完成时会重新调度
+            if ready_at <= now:
+                del self.queue[i]
+                return task, None
+            earliest = ready_at if earliest is None else min(earliest, ready_at)
+        return None, earliest
+
+    def schedule(self):
+        if not self.running:
+            return
+        now = time.monotonic()
+        earliest = None
+        for slot in self.slots:
+            if slot.task:
+                continue
+            task, earliest = self.next_task(now)
+            if task is None:
+                break
+            self.assign(slot, task, now)
+
+        if earliest is not None:
+            self.wake_timer.start(max(1, int((earliest - now) * 1000)))
+        elif not self.queue and not any(slot.task for slot in self.slots):
+            self.finish()
+
+    def assign(self, slot, task, now):
+        task.attempts += 1
+        slot.task = task
+        slot.generation += 1
+        slot.started = False
+        slot.matching = False
+        self.host_active[task.host] += 1
+        self.host_last_start[task.host] = now
+        log.debug("开始加载URL（第%d次）: %s", task.attempts, task.url)
+        metrics.start('page.load', (id(slot), slot.generation))
+        slot.timer.start()
+        slot.page.setUrl(QUrl(task.url))
+
+    def release(self, slot):
+        self.host_active[slot.task.host] -= 1
+        slot.timer.stop()
+        slot.task = None
+        slot.matching = False
+
+    def on_load_started(self, slot):
+        if slot.task is not None:
+            slot.started = True
+
+    def on_load_finished(self, slot, ok):
+        # 页面内跳转也会触发loadFinished，只处理每个任务的第一次
+        if not self.running or slot.task is None or not slot.started or slot.matching:
+            return
+        slot.timer.stop()
+        url = slot.task.url
+        generation = slot.generation
+        metrics.finish('page.load', (id(slot), generation), url=url, ok=ok)
+        if not ok:
+            self.fail(slot, "页面加载失败")
+            return
+
+        slot.matching = True
+        slot.timer.start()  # 匹配脚本同样受超时限制
+        metrics.start('match', (id(slot), generation))
+        slot.page.runJavaScript(self.match_js,
+                                lambda match: self.on_matched(slot, generation, match))
+
+    def on_timeout(self, slot):
+        if not self.running or slot.task is None:
+            return
+        if slot.matching:
+            metrics.cancel('match', (id(slot), slot.generation))
+            self.fail(slot, "匹配超时")
+        else:
+            slot.page.triggerAction(QWebEnginePage.Stop)
+            metrics.cancel('page.load', (id(slot), slot.generation))
+            self.fail(slot, "页面加载超时")
+
+    def on_matched(self, slot, generation, match):
+        if not self.running or slot.generation != generation or slot.task is None:
+            return
+        url = slot.task.url
+        match = match or {}
+        for phase, duration_ms in (match.get('timings') or {}).items():
+            metrics.record(f'match.js.{phase}', duration_ms, url=url)
+        results = match.get('results') or []
+        metrics.finish('match', (id(slot), generation), url=url, results=len(results))
+
+        self.release(slot)
+        self.ok_count += 1
+        self.result_count += self.result_handler(url, results)
+        self.report()
+        self.schedule()
+
+    def fail(self, slot, reason):
+        task = slot.task
+        self.release(slot)
+        if task.attempts <= self.retries:
+            task.not_before = time.monotonic() + RETRY_BACKOFF * 2 ** (task.attempts - 1)
+            log.info("%s，稍后重试: %s", reason, task.url)
+            self.queue.append(task)
+        else:
+            self.failed_count += 1
+            log.warning("%s: %s", reason, task.url)
+            self.pageFailed.emit(task.url, reason)
+            self.report()
+        QTimer.singleShot(0, self.schedule)
+
+    def report(self):
+        done = self.ok_count + self.failed_count
+        self.progress.emit(f"批量抓取: {done}/{self.total} 个页面，"
+                           f"失败 {self.failed_count} 个，新增 {self.result_count} 条")
+
+    def finish(self):
+        self.running = False
+        self.wake_timer.stop()
+        self.finished.emit(self.ok_count, self.failed_count)
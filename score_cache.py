@@ -0,0 +1,104 @@
+import hashlib
+import heapq
+import json
+from array import array
+from bisect import bisect_right
+
+SCORE_FLOOR = 0.3  # 扫描时使用的最低分数，低于此值的阈值需要重新扫描页面
+TOP_K = 20000  # 最多缓存的候选元素个数（按总相似度保留最高的）
+HISTOGRAM_BINS = 20
+
+
+def selectors_key(selectors_info, text_mode):
+    """选择器集合和文本提取策略的摘要"""
+    data = json.dumps([selectors_info, text_mode], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).digest()
+
+
+class ScoreCache:
+    """按 (DOM版本, 选择器集合) 缓存的候选元素及其相似度分数。
+    相似度与阈值无关，扫描一次后在本地按阈值过滤，不必重新遍历页面。
+    扫描时低于当时阈值的候选只有选择器和分数（text为None），调低阈值时再按选择器取文本"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.dom_version = None
+        self.selectors_key = None
+        self.floor = SCORE_FLOOR
+        self.text_mode = None
+        self.dropped_max = -1.0  # 因top-K被舍弃的候选中的最高分数
+        self.pending = []  # 扫描中按总相似度保留top-K的最小堆：(总相似度, 序号, 候选)
+        self.serial = 0
+        self.items = []  # 按总相似度从高到低排序
+        self.keys = []  # 与items对应的去重摘要
+        self.neg_totals = array('d')  # 总相似度取负，升序，用于二分查找
+        self.complete = False
+
+    def begin(self, dom_version, key, floor=SCORE_FLOOR, text_mode=None):
+        """开始接收一次扫描的结果"""
+        self.clear()
+        self.dom_version = dom_version
+        self.selectors_key = key
+        self.floor = floor
+        self.text_mode = text_mode
+
+    def add(self, items, top_k=TOP_K):
+        """扫描中只保留总相似度最高的top_k个候选，内存不随页面大小增长"""
+        pending = self.pending
+        for item in items:
+            # 分数相同时序号取负，先扫描到的排在前面，也先被保留
+            entry = (item['totalSimilarity'], -self.serial, item)
+            self.serial += 1
+            if len(pending) < top_k:
+                heapq.heappush(pending, entry)
+            else:
+                dropped = heapq.heappushpop(pending, entry)
+                self.dropped_max = max(self.dropped_max, dropped[0])
+
+    def finish(self, key_func):
+        """扫描完成：按总相似度排序并计算有文本的候选的去重摘要"""
+        items = [entry[2] for entry in sorted(self.pending, reverse=True)]
+        self.pending = []
+        self.items = items
+        self.keys = [None if item.get('text') is None else key_func(item) for item in items]
+        self.neg_totals = array('d', (-item['totalSimilarity'] for item in items))
+        self.complete = True
+
+    def missing_texts(self, threshold):
+        """达到阈值但还没有文本的候选的位置"""
+        return [row for row in range(self.count(threshold)) if self.items[row].get('text') is None]
+
+    def set_texts(self, rows, texts, key_func):
+        """写入按需取得的文本（元素已没有文本时为空字符串，过滤时跳过）"""
+        for row, text in zip(rows, texts):
+            item = self.items[row]
+            item['text'] = text or ''
+            self.keys[row] = key_func(item) if text else None
+
+    def matches(self, key):
+        return self.complete and self.selectors_key == key
+
+    def covers(self, threshold):
+        """阈值对应的全部结果是否都在缓存中"""
+        return self.complete and threshold >= self.floor and threshold > self.dropped_max
+
+    def count(self, threshold):
+        """总相似度不低于阈值的候选个数"""
+        return bisect_right(self.neg_totals, -threshold)
+
+    def filter(self, threshold):
+        """返回 (结果列表, 去重摘要列表)，跳过没有文本的候选"""
+        count = self.count(threshold)
+        rows = [row for row in range(count) if self.keys[row] is not None]
+        if len(rows) == count:
+            return self.items[:count], self.keys[:count]
+        return [self.items[row] for row in rows], [self.keys[row] for row in rows]
+
+    def histogram(self, bins=HISTOGRAM_BINS):
+        """总相似度在 [0, 1] 上的分布"""
+        counts = [0] * bins
+        for value in self.neg_totals:
+            counts[min(int(-value * bins), bins - 1)] += 1
+        return counts
@@ -0,0 +1,67 @@
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QPainter, QPen
+from PyQt5.QtWidgets import QWidget
+
+
+class ScoreHistogram(QWidget):
+    """候选元素总相似度的直方图，高于阈值的部分高亮，并标出阈值和缓存下限"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.counts = []
+        self.threshold = 0.0
+        self.floor = 0.0
+        self.setMinimumHeight(48)
+        self.setMaximumHeight(48)
+
+    def set_data(self, counts, floor):
+        self.counts = counts
+        self.floor = floor
+        self.update_tooltip()
+        self.update()
+
+    def set_threshold(self, threshold):
+        self.threshold = threshold
+        self.update_tooltip()
+        self.update()
+
+    def update_tooltip(self):
+        if not self.counts:
+            self.setToolTip("")
+            return
+        bins = len(self.counts)
+        above = sum(count for i, count in enumerate(self.counts) if (i + 1) / bins > self.threshold)
+        self.setToolTip(f"候选元素 {sum(self.counts)} 个，阈值 {self.threshold:.2f} 以上约 {above} 个\n"
+                        f"阈值低于 {self.floor:.2f} 时需要重新扫描页面")
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, QColor('white'))
+        painter.setPen(QColor('#ddd'))
+        painter.drawRect(rect)
+        if not self.counts:
+            painter.setPen(QColor('#999'))
+            painter.drawText(rect, Qt.AlignCenter, "匹配后显示相似度分布")
+            return
+
+        bins = len(self.counts)
+        peak = max(self.counts) or 1
+        width = rect.width() / bins
+        painter.setPen(Qt.NoPen)
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            height = max(1.0, (rect.height() - 2) * count / peak)
+            color = QColor('#4a90d9') if (i + 1) / bins > self.threshold else QColor('#ccc')
+            painter.fillRect(QRectF(rect.left() + i * width + 1, rect.bottom() - height,
+                                    max(width - 2, 1.0), height), color)
+
+        # 缓存下限以下的区域（需要重新扫描）
+        floor_x = rect.left() + rect.width() * self.floor
+        painter.fillRect(QRectF(rect.left(), rect.top(), floor_x - rect.left(), rect.height()),
+                         QColor(0, 0, 0, 20))
+        # 阈值线
+        x = rect.left() + rect.width() * self.threshold
+        painter.setPen(QPen(QColor('#e74c3c'), 2))
+        painter.drawLine(int(x), int(rect.top()), int(x), int(rect.bottom()))
@@ -0,0 +1,105 @@
+import json
+import re
+
+from page_scripts import build_css_match_js, build_match_js
+from record_mode import RecordSchema
+
+# 匹配方式：相似度打分遍历全部元素；CSS选择器把样例归纳为通用选择器后用querySelectorAll匹配
+MATCH_MODES = {
+    'auto': '自动',
+    'css': 'CSS选择器',
+    'similarity': '相似度',
+}
+DEFAULT_MATCH_MODE = 'auto'
+MIN_GROUP_EXAMPLES = 2  # 自动模式下每组至少需要的样例数，样例不足时无法判断哪些位置可变
+
+SEGMENT_RE = re.compile(r'^([^\s#:>]+)(?:#(.+)|:nth-of-type\((\d+)\))?$')
+IDENT_RE = re.compile(r'^-?[_a-zA-Z][_a-zA-Z0-9-]*$')
+UNIQUE_TAGS = ('html', 'head', 'body')
+
+
+def parse_segment(segment):
+    """解析getFullPath生成的路径段，返回 (标签, id, 同类型序号)"""
+    match = SEGMENT_RE.match(segment.strip())
+    if not match:
+        return segment.strip(), None, 1
+    tag, element_id, nth = match.groups()
+    return tag, element_id, int(nth) if nth else 1
+
+
+def format_segment(tag, element_id=None, nth=None, classes=()):
+    """nth为None表示该位置的序号在样例间不同，不限制序号"""
+    if element_id is not None:
+        # id不一定是合法的CSS标识符，使用属性选择器
+        return f'{tag}#{element_id}' if IDENT_RE.match(element_id) else f'{tag}[id={json.dumps(element_id)}]'
+    segment = tag + ''.join(f'.{name}' for name in classes)
+    if nth == 1 and tag not in UNIQUE_TAGS:
+        return f'{segment}:first-of-type'
+    if nth is not None and nth != 1:
+        return f'{segment}:nth-of-type({nth})'
+    return segment
+
+
+def group_examples(selectors_info):
+    """按路径结构（各段的标签和id）分组，同组样例只在同类型序号上不同"""
+    groups = {}
+    for info in selectors_info:
+        segments = [parse_segment(part) for part in info['selector'].split('>')]
+        structure = tuple((tag, element_id) for tag, element_id, _ in segments)
+        groups.setdefault(structure, []).append((segments, info.get('className') or ''))
+    return groups
+
+
+def common_classes(class_names):
+    """各样例共有的类名（按第一个样例中的顺序），只保留合法的CSS标识符；
+    有样例没有类名时交集为空，不加类名，否则归纳出的选择器匹配不到该样例"""
+    class_sets = [class_name.split() for class_name in class_names]
+    if not class_sets:
+        return []
+    shared = set(class_sets[0]).intersection(*class_sets[1:])
+    return [name for name in class_sets[0] if name in shared and IDENT_RE.match(name)]
+
+
+def compile_selectors(selectors_info):
+    """把样例路径归纳为通用CSS选择器：同组样例中序号不同的路径段去掉:nth-of-type，
+    最后一段加上样例共有的类名。返回 (选择器列表, 是否每组都归纳出了可变的位置)；
+    某组样例不足或各样例路径完全相同（如重复点击同一元素）时，选择器只是精确路径，不算归纳"""
+    selectors = []
+    generalized = True
+    for structure, examples in group_examples(selectors_info).items():
+        varying = False
+        classes = common_classes(class_name for _, class_name in examples)
+        parts = []
+        for position, (tag, element_id) in enumerate(structure):
+            nths = {segments[position][2] for segments, _ in examples}
+            nth = nths.pop() if len(nths) == 1 else None
+            varying = varying or nth is None
+            last = position == len(structure) - 1
+            parts.append(format_segment(tag, element_id, nth, classes if last else ()))
+        selectors.append(' > '.join(parts))
+        if len(examples) < MIN_GROUP_EXAMPLES or not varying:
+            generalized = False
+    return selectors, generalized
+
+
+def resolve_match_mode(mode, selectors_info):
+    """确定实际使用的匹配方式，返回 (匹配方式, CSS选择器列表)；
+    自动模式下只有每组样例都归纳出可变的位置时才使用CSS选择器，否则按相似度匹配（阈值生效）"""
+    if mode == 'similarity' or not selectors_info:
+        return 'similarity', []
+    selectors, generalized = compile_selectors(selectors_info)
+    if mode == 'css' or generalized:
+        return 'css', selectors
+    return 'similarity', []
+
+
+def build_recipe_match_js(recipe, with_timings=False):
+    """按配方生成匹配脚本：有记录定义时按记录提取多个字段；
+    保存了CSS选择器且未指定相似度匹配时使用querySelectorAll"""
+    if recipe.get('record'):
+        return RecordSchema.from_dict(recipe['record']).build_match_js(recipe['text_mode'], with_timings)
+    css_selectors = recipe.get('css_selectors') or []
+    if css_selectors and recipe.get('match_mode', DEFAULT_MATCH_MODE) != 'similarity':
+        return build_css_match_js(css_selectors, recipe['text_mode'], with_timings=with_timings)
+    return build_match_js(recipe['selectors_info'], recipe['threshold'], recipe['text_mode'],
+                          with_timings=with_timings)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import time
+
+from PyQt5.QtCore import QObject, QStandardPaths, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEngineDownloadItem, QWebEngineProfile
+
+INDEX_FILE = 'index.json'
+DEFAULT_SNAPSHOT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def default_cache_dir():
+    """默认缓存目录（系统缓存目录下）"""
+    base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache', 'web_scraper')
+    return base
+
+
+def configure_http_cache(profile, cache_dir, max_bytes=DEFAULT_HTTP_CACHE_MAX_BYTES):
+    """为profile启用持久的HTTP磁盘缓存"""
+    path = os.path.join(cache_dir, 'http')
+    os.makedirs(path, exist_ok=True)
+    profile.setCachePath(path)
+    profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+    profile.setHttpCacheMaximumSize(max_bytes)
+
+
+class SnapshotCache(QObject):
+    """页面快照缓存：以MHTML格式保存页面，按URL和时间戳建立索引，超过容量时按最近使用时间淘汰"""
+
+    saved = pyqtSignal(dict)  # 快照保存完成：索引条目
+    failed = pyqtSignal(str, str)  # 快照保存失败：(URL, 原因)
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_SNAPSHOT_MAX_BYTES, parent=None):
+        super().__init__(parent)
+        self.cache_dir = os.path.join(cache_dir, 'snapshots')
+        self.max_bytes = max_bytes
+        self.pending = {}  # 保存中的文件路径 -> (URL, 时间戳)
+        self.profiles = set()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.entries = self.load_index()
+
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def load_index(self):
+        try:
+            with open(self.index_path(), 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('entries', [])
+        except (OSError, ValueError):
+            return []
+        # 丢弃文件已不存在的条目
+        return [e for e in entries if os.path.exists(os.path.join(self.cache_dir, e['file']))]
+
+    def write_index(self):
+        tmp_path = self.index_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path())
+
+    def file_path(self, entry):
+        return os.path.join(self.cache_dir, entry['file'])
+
+    def total_size(self):
+        return sum(e['size'] for e in self.entries)
+
+    def save_page(self, page):
+        """异步保存页面快照，完成后发出saved信号"""
+        url = page.url().toString()
+        timestamp = time.time()
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        millis = int(timestamp * 1000) % 1000
+        file_name = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(timestamp))}{millis:03d}_{digest}.mhtml"
+        path = os.path.abspath(os.path.join(self.cache_dir, file_name))
+
+        profile = page.profile()
+        if profile not in self.profiles:
+            profile.downloadRequested.connect(self.on_download_requested)
+            self.profiles.add(profile)
+
+        self.pending[path] = (url, timestamp)
+        page.save(path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+        return path
+
+    def on_download_requested(self, item):
+        # page.save()发起的下载已被接受，这里只需跟踪完成状态
+        path = os.path.abspath(item.path())
+        if path in self.pending:
+            item.finished.connect(lambda: self.on_download_finished(item, path))
+
+    def on_download_finished(self, item, path):
+        url, timestamp = self.pending.pop(path)
+        if item.state() != QWebEngineDownloadItem.DownloadCompleted or not os.path.exists(path):
+            self.failed.emit(url, item.interruptReasonString() or "保存未完成")
+            return
+
+        entry = {
+            'url': url,
+            'file': os.path.basename(path),
+            'timestamp': timestamp,
+            'last_used': timestamp,
+            'size': os.path.getsize(path),
+        }
+        self.entries.append(entry)
+        self.evict(keep=entry)
+        self.write_index()
+        self.saved.emit(entry)
+
+    def evict(self, keep=None):
+        """超过容量时删除最久未使用的快照（keep指定的快照不删除）"""
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+        for entry in sorted(self.entries, key=lambda e: e['last_used']):
+            if entry is keep:
+                continue
+            self.remove_file(entry)
+            self.entries.remove(entry)
+            total -= entry['size']
+            if total <= self.max_bytes:
+                break
+
+    def remove_file(self, entry):
+        try:
+            os.remove(self.file_path(entry))
+        except OSError:
+            pass
+
+    def snapshots(self, url=None):
+        """按时间从新到旧列出快照，可按URL过滤"""
+        entries = [e for e in self.entries if url is None or e['url'] == url]
+        return sorted(entries, key=lambda e: e['timestamp'], reverse=True)
+
+    def latest(self, url):
+        entries = self.snapshots(url)
+        return entries[0] if entries else None
+
+    def open(self, entry):
+        """标记快照为最近使用并返回文件路径"""
+        entry['last_used'] = time.time()
+        self.write_index()
+        return self.file_path(entry)
+
+    def clear(self):
+        for entry in self.entries:
+            self.remove_file(entry)
+        self.entries = []
+        self.write_index()
@@ -0,0 +1,512 @@
+"""SQLite结果存储：长时间抓取时结果边匹配边写入本地数据库，界面表格按页读取
+
+与ResultStore接口一致，可以直接作为ResultTableModel的存储。数据库使用WAL模式，
+每批结果在一个事务中写入，后台导出线程用独立连接读取时不阻塞界面写入；
+url、selector和内容摘要列有索引，去重直接查询数据库，内存中只保存各行的id。
+"""
+import json
+import logging
+import math
+import sqlite3
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain
+
+from dedup import NearDupIndex, content_digest, simhash
+from metrics import metrics
+from result_model import SCORE_FIELDS, ResultRecord, format_tooltip
+
+log = logging.getLogger(__name__)
+
+PAGE_SIZE = 256  # 表格每次从数据库读取的行数
+CACHED_PAGES = 16  # 内存中保留的页数
+SQL_CHUNK = 500  # IN (...) 每次查询的参数个数
+MAX_UNDO_SNAPSHOTS = 20  # 批量操作撤销用的临时表个数（只保存删除的行或修改前的值），与批量操作的撤销步数一致
+
+# 结果字段名 -> 列名
+COLUMNS = {
+    'url': 'url',
+    'text': 'text',
+    'selector': 'selector',
+    'href': 'href',
+    'className': 'class_name',
+    'selectorSimilarity': 'selector_similarity',
+    'classSimilarity': 'class_similarity',
+    'totalSimilarity': 'total_similarity',
+}
+ROW_COLUMNS = ('text', 'selector', 'href', 'class_name',
+               'selector_similarity', 'class_similarity', 'total_similarity', 'fields')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    selector TEXT NOT NULL,
+    href TEXT NOT NULL DEFAULT '',
+    class_name TEXT NOT NULL DEFAULT '',
+    selector_similarity REAL,
+    class_similarity REAL,
+    total_similarity REAL,
+    hash BLOB NOT NULL,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS results_url ON results(url);
+CREATE INDEX IF NOT EXISTS results_selector ON results(selector);
+CREATE INDEX IF NOT EXISTS results_hash ON results(hash);
+CREATE TABLE IF NOT EXISTS field_names (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')  # WAL模式下每次提交不必等待写入磁盘
+    return conn
+
+
+def chunks(values, size=SQL_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def fetch_rows(conn, ids, columns):
+    """按id（升序）读取各行的指定列，id连续时只需一次范围查询；返回与ids对应的元组列表"""
+    if not len(ids):
+        return []
+    wanted = set(ids)
+    cursor = conn.execute(f"SELECT id, {', '.join(columns)} FROM results WHERE id BETWEEN ? AND ? ORDER BY id",
+                          (ids[0], ids[-1]))
+    return [row[1:] for row in cursor if row[0] in wanted]
+
+
+def load_fields(value):
+    return json.loads(value) if value else {}
+
+
+class SqliteDedupIndex:
+    """按结果表中有索引的内容摘要列去重，与DedupIndex接口一致；数据库本身就是索引，增删时无需维护"""
+
+    def __init__(self, conn, include_selector=False):
+        self.conn = conn
+        self.include_selector = include_selector
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(DISTINCT hash) FROM results').fetchone()[0]
+
+    def __contains__(self, key):
+        return self.conn.execute('SELECT 1 FROM results WHERE hash = ? LIMIT 1', (key,)).fetchone() is not None
+
+    def key(self, text, selector=''):
+        return content_digest(text, selector if self.include_selector else None)
+
+    def contains(self, text, selector=''):
+        return self.key(text, selector) in self
+
+    def add_key(self, key):
+        pass
+
+    def discard_key(self, key):
+        pass
+
+    def rebuild_keys(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class KeyColumn:
+    """按行号读取内容摘要列，支持切片（如最后n行），不在内存中保存全部摘要"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store.ids)
+
+    def __getitem__(self, rows):
+        if isinstance(rows, slice):
+            return [row[0] for row in fetch_rows(self.store.conn, self.store.ids[rows], ('hash',))]
+        return fetch_rows(self.store.conn, self.store.ids[rows:rows + 1 or None], ('hash',))[0][0]
+
+    def __iter__(self):
+        return (row[0] for row in self.store.conn.execute('SELECT hash FROM results ORDER BY id'))
+
+
+class QueryRows:
+    """导出快照：保存导出时刻的行id，切片时按id范围分批查询。
+    在读取线程中打开独立的连接并开启读事务，WAL模式下读取期间界面可以继续写入"""
+
+    def __init__(self, path, ids, fields):
+        self.path = path
+        self.ids = ids
+        self.fields = list(fields)
+        self.columns = [COLUMNS[field] for field in self.fields if field in COLUMNS]
+        if len(self.columns) < len(self.fields):
+            self.columns.append('fields')
+        self.conn = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, rows):
+        if self.conn is None:
+            self.conn = connect(self.path)
+            self.conn.execute('BEGIN')
+        if not isinstance(rows, slice):
+            return self[rows:rows + 1 or None][0]
+        result = []
+        for values in fetch_rows(self.conn, self.ids[rows], self.columns):
+            values = dict(zip(self.columns, values))
+            record_fields = load_fields(values.get('fields'))
+            result.append(tuple(values[COLUMNS[field]] if field in COLUMNS else record_fields.get(field, '')
+                                for field in self.fields))
+        return result
+
+    def close(self):
+        """结束读事务并关闭连接，否则WAL检查点无法越过这个快照"""
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+
+class SqliteResultStore:
+    """结果存储在SQLite数据库中，接口与ResultStore一致。内存中只保存各行的id（按行号排列）
+    和最近读取的若干页；打开已有的数据库时继续使用其中的结果"""
+
+    def __init__(self, path, include_selector_in_dedup=False):
+        self.path = path
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        # 本次会话中已导出到各文件的内容摘要，用于增量追加（临时表，关闭连接后删除）
+        self.conn.execute('CREATE TEMP TABLE exported (path TEXT NOT NULL, hash BLOB NOT NULL, '
+                          'PRIMARY KEY (path, hash))')
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('include_selector', ?)",
+                              (str(int(include_selector_in_dedup)),))
+        include_selector = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'include_selector'").fetchone()[0] == '1'
+        self.index = SqliteDedupIndex(self.conn, include_selector)
+        self.keys = KeyColumn(self)
+        self.ids = array('q', (row[0] for row in self.conn.execute('SELECT id FROM results ORDER BY id')))
+        self.field_names = [row[0] for row in
+                            self.conn.execute('SELECT name FROM field_names ORDER BY position')]
+        self.url = ''  # 当前页面的URL，结果中没有url时写入
+        self.version = 0
+        self.near_dup = None
+        self.pages = OrderedDict()  # 页号 -> 该页各行的元组
+        self.snapshots = []  # 撤销用的临时表名
+        self.undo_count = 0
+        log.info("打开结果数据库: %s（已有 %d 条结果）", path, len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __bool__(self):
+        return bool(self.ids)
+
+    def __getitem__(self, row):
+        text, selector, href, class_name, *scores, fields = self.row(row)
+        return ResultRecord(text, selector, href, class_name, *scores,
+                            fields=self.record_fields(fields) if self.field_names else None)
+
+    def __iter__(self):
+        for row in range(len(self.ids)):
+            yield self[row]
+
+    def changed(self):
+        self.version += 1
+        self.pages.clear()
+
+    def row(self, row):
+        """按行号读取一行（ROW_COLUMNS各列），按页缓存"""
+        number = row // PAGE_SIZE
+        page = self.pages.get(number)
+        if page is None:
+            start = number * PAGE_SIZE
+            page = fetch_rows(self.conn, self.ids[start:start + PAGE_SIZE], ROW_COLUMNS)
+            self.pages[number] = page
+            if len(self.pages) > CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return page[row % PAGE_SIZE]
+
+    def record_fields(self, value):
+        fields = load_fields(value)
+        return {name: fields.get(name, '') for name in self.field_names}
+
+    def text(self, row):
+        return self.row(row)[0]
+
+    def selector(self, row):
+        return self.row(row)[1]
+
+    def fields(self, row):
+        return self.record_fields(self.row(row)[-1])
+
+    def field_value(self, name, row):
+        return load_fields(self.row(row)[-1]).get(name, '')
+
+    def tooltip(self, row):
+        text, _, _, _, *scores, _ = self.row(row)
+        return format_tooltip(text, *scores)
+
+    def positions(self, ids):
+        """id对应的行号"""
+        return [bisect_left(self.ids, row_id) for row_id in ids]
+
+    def new_field_names(self, items):
+        names = {}
+        for item in items:
+            for name in item.get('fields') or ():
+                if name not in self.field_names:
+                    names[name] = None
+        return list(names)
+
+    def add_field_columns(self, names):
+        names = [name for name in names if name not in self.field_names]
+        if not names:
+            return
+        with self.conn:
+            self.conn.executemany('INSERT INTO field_names (position, name) VALUES (?, ?)',
+                                  enumerate(names, len(self.field_names)))
+        self.field_names.extend(names)
+
+    def is_duplicate(self, item):
+        return self.index.contains(item['text'], item['selector'])
+
+    def set_near_dup_cutoff(self, cutoff):
+        if cutoff is None:
+            self.near_dup = None
+            return
+        self.near_dup = NearDupIndex(cutoff)
+        self.near_dup.rebuild(simhash(text) for text in self.column('text'))
+
+    def append(self, item, key=None, fingerprint=None):
+        self.extend([item], [key], [fingerprint])
+
+    def extend(self, items, keys=None, fingerprints=None):
+        """一批结果在一个事务中写入"""
+        if not items:
+            return
+        if keys is None:
+            keys = [None] * len(items)
+        if fingerprints is None:
+            fingerprints = [None] * len(items)
+        self.add_field_columns(self.new_field_names(items))
+        rows = []
+        for item, key, fingerprint in zip(items, keys, fingerprints):
+            if key is None:
+                key = self.index.key(item['text'], item['selector'])
+            if self.near_dup is not None:
+                self.near_dup.append(simhash(item['text']) if fingerprint is None else fingerprint)
+            class_name = item.get('className', '')
+            fields = item.get('fields')
+            rows.append((item.get('url') or self.url, item['text'], item['selector'], item.get('href', '') or '',
+                         class_name if isinstance(class_name, str) else '',
+                         *(item.get(field) for field in SCORE_FIELDS), key,
+                         json.dumps(fields, ensure_ascii=False) if fields else None))
+        last_id = self.ids[-1] if self.ids else 0
+        with metrics.span('db.insert', rows=len(rows)), self.conn:
+            self.conn.executemany(
+                'INSERT INTO results (url, text, selector, href, class_name, selector_similarity, '
+                'class_similarity, total_similarity, hash, fields) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        # 单一写入者，新行的id都大于已有的行
+        self.ids.extend(row[0] for row in
+                        self.conn.execute('SELECT id FROM results WHERE id > ? ORDER BY id', (last_id,)))
+        self.changed()
+
+    def pop(self, row):
+        record = self[row]
+        self.remove_rows([row])
+        return record
+
+    def remove_rows(self, rows):
+        rows = set(rows)
+        if not rows:
+            return
+        self.take_rows([row for row in range(len(self.ids)) if row not in rows])
+
+    def take_rows(self, keep):
+        """只保留keep中的行（数据库中的行按id排列，忽略keep的顺序）"""
+        keep = sorted(keep)
+        kept = set(keep)
+        removed = [row_id for row, row_id in enumerate(self.ids) if row not in kept]
+        with self.conn:
+            for chunk in chunks(removed):
+                self.conn.execute(f"DELETE FROM results WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        if self.near_dup is not None:
+            fingerprints = self.near_dup.fingerprints
+            self.near_dup.rebuild(fingerprints[row] for row in keep)
+        self.ids = array('q', (self.ids[row] for row in keep))
+        self.changed()
+
+    def set_column(self, field, values):
+        values = list(values)
+        if len(values) != len(self.ids):
+            raise ValueError(f"列长度不一致: {len(values)} != {len(self.ids)}")
+        if field == 'text':
+            selectors = self.column('selector')
+            rows = [(text, self.index.key(text, selector), row_id)
+                    for text, selector, row_id in zip(values, selectors, self.ids)]
+            sql = 'UPDATE results SET text = ?, hash = ? WHERE id = ?'
+        elif field == 'href':
+            rows = list(zip(values, self.ids))
+            sql = 'UPDATE results SET href = ? WHERE id = ?'
+        elif field in self.field_names:
+            rows = []
+            for value, (fields, row_id) in zip(values, self.conn.execute('SELECT fields, id FROM results ORDER BY id')):
+                fields = load_fields(fields)
+                fields[field] = value
+                rows.append((json.dumps(fields, ensure_ascii=False), row_id))
+            sql = 'UPDATE results SET fields = ? WHERE id = ?'
+        else:
+            raise ValueError(f"不能修改的列: {field}")
+        with self.conn:
+            self.conn.executemany(sql, rows)
+        if field == 'text' and self.near_dup is not None:
+            self.near_dup.rebuild(simhash(text) for text in values)
+        self.changed()
+
+    def save_state(self, operation, *args):
+        """只把operation（take_rows或set_column）将要删除的行或修改前的值保存到临时表，
+        供撤销批量操作时恢复（超过上限时删除最早的）"""
+        table = f'undo_{self.version}_{self.undo_count}'
+        self.undo_count += 1
+        fingerprints = self.near_dup.fingerprints if self.near_dup is not None else None
+        if operation == 'take_rows':
+            kept = set(args[0])
+            rows = [row for row in range(len(self.ids)) if row not in kept]
+            column = None
+            create = f'CREATE TEMP TABLE {table} AS SELECT * FROM results WHERE 0'
+            insert = f'INSERT INTO temp.{table} SELECT * FROM results WHERE id IN ({{}})'
+        elif operation == 'set_column':
+            field, values = args
+            rows = [row for row, (old, new) in enumerate(zip(self.column(field), values)) if old != new]
+            column = COLUMNS[field] if field in COLUMNS else 'fields'
+            if field != 'text':
+                fingerprints = None  # 只有修改文本时近似去重的指纹才会变化
+            create = f'CREATE TEMP TABLE {table} (id INTEGER PRIMARY KEY, value, hash BLOB)'
+            insert = f'INSERT INTO temp.{table} SELECT id, {column}, hash FROM results WHERE id IN ({{}})'
+        else:
+            raise ValueError(f"不支持撤销的操作: {operation}")
+        ids = array('q', (self.ids[row] for row in rows))
+        with self.conn:
+            self.conn.execute(create)
+            for chunk in chunks(ids):
+                self.conn.execute(insert.format(','.join('?' * len(chunk))), chunk)
+        self.snapshots.append(table)
+        while len(self.snapshots) > MAX_UNDO_SNAPSHOTS:
+            self.conn.execute(f'DROP TABLE temp.{self.snapshots.pop(0)}')
+        return {
+            'table': table,
+            'column': column,
+            'rows': rows,
+            'ids': ids,
+            'fingerprints': array('Q', (fingerprints[row] for row in rows)) if fingerprints is not None else None,
+        }
+
+    def restore_state(self, state):
+        table = state['table']
+        column = state['column']
+        with self.conn:
+            if column is None:
+                self.conn.execute(f'INSERT INTO results SELECT * FROM temp.{table}')
+            else:
+                self.conn.execute(
+                    f'UPDATE results SET {column} = (SELECT value FROM temp.{table} u WHERE u.id = results.id), '
+                    f'hash = (SELECT hash FROM temp.{table} u WHERE u.id = results.id) '
+                    f'WHERE id IN (SELECT id FROM temp.{table})')
+            self.conn.execute(f'DROP TABLE temp.{table}')
+        if table in self.snapshots:
+            self.snapshots.remove(table)
+        fingerprints = state['fingerprints']
+        if column is None:
+            # 删除的行按id插回原来的位置
+            ids = array('q', sorted(chain(self.ids, state['ids'])))
+            if self.near_dup is not None and fingerprints is not None:
+                by_id = dict(zip(self.ids, self.near_dup.fingerprints))
+                by_id.update(zip(state['ids'], fingerprints))
+                fingerprints = (by_id[row_id] for row_id in ids)
+            self.ids = ids
+        elif self.near_dup is not None and fingerprints is not None:
+            restored = array('Q', self.near_dup.fingerprints)
+            for row, fingerprint in zip(state['rows'], fingerprints):
+                restored[row] = fingerprint
+            fingerprints = restored
+        if self.near_dup is not None and column in (None, 'text'):
+            # 保存状态之后才开启近似去重时没有旧指纹，按恢复后的文本重新计算
+            self.near_dup.rebuild(fingerprints if fingerprints is not None
+                                  else (simhash(text) for text in self.column('text')))
+        self.changed()
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM results')
+            self.conn.execute('DELETE FROM field_names')
+        self.ids = array('q')
+        self.field_names = []
+        if self.near_dup is not None:
+            self.near_dup.clear()
+        self.changed()
+
+    def rows_with_keys(self, keys):
+        keys = list(keys)
+        ids = []
+        for chunk in chunks(keys):
+            ids.extend(row[0] for row in self.conn.execute(
+                f"SELECT id FROM results WHERE hash IN ({','.join('?' * len(chunk))})", chunk))
+        return sorted(self.positions(ids))
+
+    def selectors_info(self):
+        """去重后的 (选择器, 类名) 组合（按首次出现的顺序）"""
+        return [{'selector': selector, 'className': class_name} for selector, class_name in self.conn.execute(
+            'SELECT selector, class_name FROM results GROUP BY selector, class_name ORDER BY MIN(id)')]
+
+    def column(self, field):
+        """按字段名读取整列（url/text/selector/href/className、相似度字段或记录模式的字段）"""
+        if field in self.field_names:
+            return [load_fields(value).get(field, '') for value, in
+                    self.conn.execute('SELECT fields FROM results ORDER BY id')]
+        values = [value for value, in self.conn.execute(f'SELECT {COLUMNS[field]} FROM results ORDER BY id')]
+        if field in SCORE_FIELDS:
+            return array('d', (math.nan if value is None else value for value in values))
+        return values
+
+    def snapshot(self, fields, rows=None):
+        """导出快照，后台线程中按批查询数据库；rows为要包含的行号（默认全部）"""
+        ids = array('q', self.ids) if rows is None else array('q', (self.ids[row] for row in rows))
+        return QueryRows(self.path, ids, fields)
+
+    def unexported_rows(self, path):
+        """还没有导出到path的行号，在数据库中按摘要筛选"""
+        return self.positions(row_id for row_id, in self.conn.execute(
+            'SELECT id FROM results WHERE hash NOT IN (SELECT hash FROM temp.exported WHERE path = ?) '
+            'ORDER BY id', (path,)))
+
+    def export_marks(self, rows=None):
+        """导出开始时记下的行id，导出成功后交给mark_exported"""
+        return array('q', self.ids) if rows is None else array('q', (self.ids[row] for row in rows))
+
+    def mark_exported(self, path, marks, append=False):
+        """记录已导出到path的行（导出期间被删除的行不再记录）；覆盖保存时替换之前的记录"""
+        with self.conn:
+            if not append:
+                self.conn.execute('DELETE FROM temp.exported WHERE path = ?', (path,))
+            for chunk in chunks(marks):
+                self.conn.execute('INSERT OR IGNORE INTO temp.exported SELECT ?, hash FROM results '
+                                  f"WHERE id IN ({','.join('?' * len(chunk))})", (path, *chunk))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+
+class StartupProfile(QObject):
+    """记录启动各阶段的耗时，窗口首次绘制完成后输出到标准错误"""
+
+    def __init__(self, start, enabled=False):
+        """start: 开始计时的time.perf_counter()值（通常在导入模块之前取得）"""
+        super().__init__()
+        self.start = start
+        self.last = start
+        self.enabled = enabled
+        self.phases = []  # (阶段名称, 耗时秒数)
+        self.painted = False
+
+    def mark(self, phase):
+        """记录从上一个标记到现在的阶段耗时"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def watch_first_paint(self, widget):
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.painted:
+            self.painted = True
+            obj.removeEventFilter(self)
+            # 在本次绘制完成后再记录
+            QTimer.singleShot(0, self.on_first_paint)
+        return False
+
+    def on_first_paint(self):
+        self.mark('首次绘制')
+        if self.enabled:
+            self.report()
+
+    def report(self, file=sys.stderr):
+        print("启动耗时:", file=file)
+        for phase, seconds in self.phases:
+            print(f"  {phase:<20} {seconds * 1000:8.1f} ms", file=file)
+        total = self.last - self.start
+        print(f"  {'合计':<20} {total * 1000:8.1f} ms", file=file)
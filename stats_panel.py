@@ -0,0 +1,61 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+
+from metrics import metrics
+
+REFRESH_INTERVAL_MS = 500
+
+
+class StatsPanel(QTableWidget):
+    """各计时区间的统计（次数、最近、平均、最大耗时），有新记录时定时刷新"""
+
+    HEADERS = ['阶段', '次数', '最近(ms)', '平均(ms)', '最大(ms)']
+
+    def __init__(self, parent=None):
+        super().__init__(0, len(self.HEADERS), parent)
+        self.setHorizontalHeaderLabels(self.HEADERS)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.verticalHeader().hide()
+        self.verticalHeader().setDefaultSectionSize(20)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setStyleSheet("font-size: 11px;")
+
+        # 区间记录可能很频繁（每批匹配结果一次），合并到定时刷新
+        self.dirty = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh)
+        metrics.recorded.connect(self.mark_dirty)
+
+    def mark_dirty(self, name, duration_ms):
+        self.dirty = True
+        if self.isVisible() and not self.timer.isActive():
+            self.timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.dirty = True
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def refresh(self):
+        if not self.dirty:
+            self.timer.stop()
+            return
+        self.dirty = False
+        stats = sorted(metrics.stats.items())
+        self.setRowCount(len(stats))
+        for row, (name, span) in enumerate(stats):
+            values = [name, str(span.count), f"{span.last_ms:.1f}",
+                      f"{span.mean_ms:.1f}", f"{span.max_ms:.1f}"]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.setItem(row, column, item)